@@ -0,0 +1,12 @@
+"""Performance benchmarks for the slot machine API.
+
+Run from the directory containing manage.py, e.g.::
+
+    python -m benchmarks run --output results.json
+    python -m benchmarks compare baseline.json results.json --threshold 0.10
+    python -m benchmarks.asgi_vs_wsgi --requests 2000 --concurrency 16
+
+``run`` covers three layers: ``micro`` (ReelService, no database),
+``service`` (SlotMachineService on SQLite) and ``http`` (DRF test client
+against --players/--spins seeded rows, e.g. --players 10000 --spins 10000000).
+"""
@@ -0,0 +1,74 @@
+"""Benchmark runner.
+
+    python -m benchmarks run --output results.json [--layers micro service http]
+    python -m benchmarks compare baseline.json results.json --threshold 0.10
+
+compare exits with status 1 when any metric is slower than the baseline by
+more than the threshold, so it can gate CI.
+"""
+import argparse
+import sys
+
+from benchmarks.environment import benchmark_database, setup_django
+from benchmarks.runner import compare, load_results, write_results
+
+LAYERS = ('micro', 'service', 'http')
+
+
+def run(options):
+    setup_django()
+    from benchmarks import http, micro, service
+
+    results = []
+    if 'micro' in options.layers:
+        results += micro.run()
+    if 'service' in options.layers:
+        with benchmark_database():
+            results += service.run()
+    if 'http' in options.layers:
+        with benchmark_database():
+            results += http.run(players=options.players, spins=options.spins)
+
+    for result in results:
+        print(f"{result['name']:<32} {result['mean'] * 1e6:12.1f} us  {result['ops_per_second']:12.1f} ops/s")
+    if options.output:
+        write_results(results, options.output)
+    return 0
+
+
+def run_compare(options):
+    rows, regressions = compare(load_results(options.baseline), load_results(options.current),
+                                threshold=options.threshold)
+    for name, before, after, change in rows:
+        flag = '  REGRESSION' if change > options.threshold else ''
+        print(f'{name:<32} {before * 1e6:12.1f} us -> {after * 1e6:12.1f} us  {change:+7.1%}{flag}')
+    if regressions:
+        print(f'{len(regressions)} metric(s) regressed by more than {options.threshold:.0%}')
+        return 1
+    return 0
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog='python -m benchmarks')
+    commands = parser.add_subparsers(dest='command', required=True)
+
+    run_parser = commands.add_parser('run', help='Run benchmarks')
+    run_parser.add_argument('--layers', nargs='+', choices=LAYERS, default=list(LAYERS))
+    run_parser.add_argument('--output', help='Write results as JSON to this file')
+    run_parser.add_argument('--players', type=int, default=1000, help='Players seeded for http benchmarks')
+    run_parser.add_argument('--spins', type=int, default=100_000, help='Spins seeded for http benchmarks')
+    run_parser.set_defaults(handler=run)
+
+    compare_parser = commands.add_parser('compare', help='Compare two result files')
+    compare_parser.add_argument('baseline')
+    compare_parser.add_argument('current')
+    compare_parser.add_argument('--threshold', type=float, default=0.10,
+                                help='Allowed slowdown as a fraction (default 0.10)')
+    compare_parser.set_defaults(handler=run_compare)
+
+    options = parser.parse_args(argv)
+    return options.handler(options)
+
+
+if __name__ == '__main__':
+    sys.exit(main())
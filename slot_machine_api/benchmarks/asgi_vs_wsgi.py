@@ -0,0 +1,105 @@
+"""Compare spin throughput of the sync WSGI path and the async ASGI path.
+
+Both stacks run in-process against the same file-backed SQLite database with
+the same level of concurrency: N threads driving the WSGI handler versus N
+concurrent tasks on one event loop driving the ASGI handler.
+"""
+import argparse
+import asyncio
+import json
+import statistics
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from benchmarks.environment import benchmark_database, seed_players, setup_django
+
+SYNC_URL = '/api/spins/spin/'
+ASYNC_URL = '/api/async/spins/spin/'
+BODY = json.dumps({'bet_size': '1.00'})
+
+
+def _summary(name, latencies, elapsed):
+    latencies = sorted(latencies)
+    return {
+        'name': name,
+        'requests': len(latencies),
+        'seconds': round(elapsed, 3),
+        'requests_per_second': round(len(latencies) / elapsed, 1),
+        'p50_ms': round(statistics.median(latencies) * 1000, 2),
+        'p99_ms': round(latencies[int(len(latencies) * 0.99) - 1] * 1000, 2),
+    }
+
+
+def run_wsgi(tokens, requests, concurrency):
+    from django.db import connection
+    from django.test import Client
+
+    def worker(index):
+        client = Client()
+        headers = {'Authorization': f'Token {tokens[index % len(tokens)]}'}
+        latencies = []
+        try:
+            for _ in range(index, requests, concurrency):
+                started = time.perf_counter()
+                response = client.post(SYNC_URL, BODY, content_type='application/json', headers=headers)
+                latencies.append(time.perf_counter() - started)
+                assert response.status_code == 200, response.content
+        finally:
+            connection.close()
+        return latencies
+
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as executor:
+        results = list(executor.map(worker, range(concurrency)))
+    elapsed = time.perf_counter() - started
+    return _summary('wsgi-sync', [latency for part in results for latency in part], elapsed)
+
+
+async def run_asgi(tokens, requests, concurrency):
+    from django.test import AsyncClient
+
+    async def worker(index):
+        client = AsyncClient()
+        headers = {'Authorization': f'Token {tokens[index % len(tokens)]}'}
+        latencies = []
+        for _ in range(index, requests, concurrency):
+            started = time.perf_counter()
+            response = await client.post(ASYNC_URL, BODY, content_type='application/json', headers=headers)
+            latencies.append(time.perf_counter() - started)
+            assert response.status_code == 200, response.content
+        return latencies
+
+    started = time.perf_counter()
+    results = await asyncio.gather(*(worker(index) for index in range(concurrency)))
+    elapsed = time.perf_counter() - started
+    return _summary('asgi-async', [latency for part in results for latency in part], elapsed)
+
+
+def run(tokens, requests, concurrency):
+    """Both benchmarks, with the spin throttles off: their 429s would cut the load short."""
+    from django.conf import settings
+    from django.test import override_settings
+
+    with override_settings(REST_FRAMEWORK={**settings.REST_FRAMEWORK, 'DEFAULT_THROTTLE_RATES': {}}):
+        return [
+            run_wsgi(tokens, requests, concurrency),
+            asyncio.run(run_asgi(tokens, requests, concurrency)),
+        ]
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--requests', type=int, default=1000)
+    parser.add_argument('--concurrency', type=int, default=8)
+    parser.add_argument('--players', type=int, default=8)
+    options = parser.parse_args(argv)
+
+    setup_django()
+    with benchmark_database():
+        tokens = seed_players(options.players)
+        results = run(tokens, options.requests, options.concurrency)
+    print(json.dumps(results, indent=2))
+
+
+if __name__ == '__main__':
+    main()
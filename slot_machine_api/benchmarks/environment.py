@@ -0,0 +1,50 @@
+import os
+import tempfile
+from contextlib import contextmanager
+from decimal import Decimal
+
+
+def setup_django():
+    os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'slot_machine_api.settings')
+    import django
+    django.setup()
+
+
+@contextmanager
+def benchmark_database():
+    """Create a throwaway file-backed copy of the schema and remove it afterwards.
+
+    A file (not in-memory) SQLite database lets several threads write
+    concurrently, waiting on the busy timeout like a deployed server would.
+    """
+    from django.db import connection
+    from django.test.utils import setup_test_environment, teardown_test_environment
+
+    setup_test_environment()
+    with tempfile.TemporaryDirectory() as directory:
+        connection.settings_dict['TEST']['NAME'] = os.path.join(directory, 'benchmark.sqlite3')
+        old_name = connection.creation.create_test_db(verbosity=0, autoclobber=True)
+        try:
+            load_symbols()
+            yield
+        finally:
+            connection.creation.destroy_test_db(old_name, verbosity=0)
+            teardown_test_environment()
+
+
+def load_symbols():
+    from django.core.management import call_command
+    call_command('loaddata', 'symbols', verbosity=0)
+
+
+def seed_players(count, balance=Decimal('1000000.00')):
+    """Create count users with players and auth tokens; return the token keys."""
+    from django.contrib.auth.models import User
+    from rest_framework.authtoken.models import Token
+    from slots.models import Player
+
+    User.objects.bulk_create(User(username=f'bench{i}') for i in range(count))
+    users = list(User.objects.filter(username__startswith='bench').order_by('id'))
+    Player.objects.bulk_create(Player(user=user, balance=balance) for user in users)
+    tokens = Token.objects.bulk_create(Token(user=user, key=Token.generate_key()) for user in users)
+    return [token.key for token in tokens]
@@ -0,0 +1,84 @@
+"""End-to-end request benchmarks through the DRF test client with seeded data."""
+import time
+from decimal import Decimal
+
+import numpy as np
+
+from benchmarks.runner import measure
+
+SEED_BATCH_SIZE = 5000
+
+
+def seed_spins(player_count, spin_count):
+    """Seed players and spins spread evenly across their games; returns token keys."""
+    from slots.models import Game, Player, Spin
+    from slots.paytable import get_paytable
+    from slots.services import ReelService
+    from benchmarks.environment import seed_players
+
+    tokens = seed_players(player_count)
+    players = list(Player.objects.order_by('id'))
+    Game.objects.bulk_create(Game(player=player) for player in players)
+    games = list(Game.objects.order_by('player_id').values_list('id', 'player_id'))
+    reel_service = ReelService(get_paytable())
+    rng = np.random.default_rng(0)
+
+    started = time.perf_counter()
+    created = 0
+    while created < spin_count:
+        size = min(SEED_BATCH_SIZE, spin_count - created)
+        grids = reel_service.generate_spins(size, rng=rng)
+        symbols, starts, lengths = reel_service.evaluate_wins(grids)
+        spins = []
+        for idx in range(size):
+            win_data = reel_service.decode_wins(symbols[idx], starts[idx], lengths[idx])
+            game_id, player_id = games[(created + idx) % len(games)]
+            spins.append(Spin(
+                game_id=game_id,
+                player_id=player_id,
+                bet_amount=Decimal('1.00'),
+                payout=reel_service.calculate_payout(win_data, Decimal('1.00')),
+                result=reel_service.decode_spin(grids[idx]),
+                win_data=win_data,
+            ))
+        Spin.objects.bulk_create(spins, batch_size=500)
+        created += size
+    print(f'Seeded {player_count} players and {spin_count} spins in {time.perf_counter() - started:.1f}s')
+    return tokens
+
+
+def run(players=1000, spins=100_000):
+    from django.conf import settings
+    from django.test import override_settings
+
+    # The benchmark times the spin path itself, not the throttles that would refuse its loop
+    with override_settings(REST_FRAMEWORK={**settings.REST_FRAMEWORK, 'DEFAULT_THROTTLE_RATES': {}}):
+        return _run(players, spins)
+
+
+def _run(players, spins):
+    from rest_framework.test import APIClient
+
+    tokens = seed_spins(players, spins)
+    client = APIClient()
+    client.credentials(HTTP_AUTHORIZATION=f'Token {tokens[0]}')
+
+    def spin():
+        response = client.post('/api/spins/spin/', {'bet_size': '1.00'}, format='json')
+        assert response.status_code == 200, response.content
+
+    def history(url='/api/spins/history/'):
+        response = client.get(url)
+        assert response.status_code == 200, response.content
+        return response
+
+    deep_page = '/api/spins/history/'
+    for _ in range(5):
+        deep_page = history(deep_page).data['next'] or '/api/spins/history/'
+
+    return [
+        measure('http.spin', spin, number=20),
+        measure('http.history_first_page', history, number=10),
+        measure('http.history_deep_page', lambda: history(deep_page), number=10),
+        measure('http.games', lambda: client.get('/api/games/'), number=10),
+    ]
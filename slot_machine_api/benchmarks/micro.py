@@ -0,0 +1,46 @@
+"""Microbenchmarks for the spin engine; no database access."""
+from decimal import Decimal
+
+import numpy as np
+
+from benchmarks.runner import measure
+
+BENCH_SYMBOLS = (
+    ('diamond', '5.00'), ('floppy', '2.50'), ('hourglass', '1.00'),
+    ('seven', '10.00'), ('telephone', '3.00'),
+)
+
+
+def _reel_service():
+    from slots.paytable import Paytable, PaytableSymbol
+    from slots.services import ReelService
+    symbols = [
+        PaytableSymbol(pk, name, f'{name}.png', Decimal(multiplier))
+        for pk, (name, multiplier) in enumerate(BENCH_SYMBOLS, start=1)
+    ]
+    return ReelService(Paytable(symbols))
+
+
+def run():
+    from slots.services import ReelService
+
+    reel_service = _reel_service()
+    rng = np.random.default_rng(0)
+    result = reel_service.generate_spin()
+    winning = {reel: ['seven', 'diamond', 'floppy'] for reel in range(5)}
+    win_data = reel_service.check_wins(winning)
+    row = ['seven', 'seven', 'seven', 'floppy', 'diamond']
+    hit = [0, 1, 2, 4]
+    batch = reel_service.generate_spins(10_000, rng=rng)
+
+    return [
+        measure('micro.generate_spin', reel_service.generate_spin, number=200),
+        measure('micro.flip_horizontal', lambda: ReelService.flip_horizontal(result), number=2000),
+        measure('micro.check_wins', lambda: reel_service.check_wins(result), number=500),
+        measure('micro.check_wins_winning', lambda: reel_service.check_wins(winning), number=500),
+        measure('micro.longest_seq', lambda: ReelService.longest_seq(hit), number=5000),
+        measure('micro.row_wins', lambda: reel_service._row_wins(row), number=5000),
+        measure('micro.calculate_payout', lambda: reel_service.calculate_payout(win_data, Decimal('1.00')), number=2000),
+        measure('micro.generate_spins_10k', lambda: reel_service.generate_spins(10_000, rng=rng), repeat=10),
+        measure('micro.evaluate_wins_10k', lambda: reel_service.evaluate_wins(batch), repeat=10),
+    ]
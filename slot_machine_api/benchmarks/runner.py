@@ -0,0 +1,57 @@
+import json
+import platform
+import statistics
+import time
+
+
+def measure(name, func, number=1, repeat=20, warmup=2):
+    """Time func() and return a result dict; durations are seconds per call."""
+    for _ in range(warmup):
+        func()
+    samples = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        for _ in range(number):
+            func()
+        samples.append((time.perf_counter() - started) / number)
+    samples.sort()
+    mean = statistics.fmean(samples)
+    return {
+        'name': name,
+        'mean': mean,
+        'p50': statistics.median(samples),
+        'p95': samples[max(int(len(samples) * 0.95) - 1, 0)],
+        'min': samples[0],
+        'ops_per_second': 1 / mean if mean else None,
+        'calls': number * repeat,
+    }
+
+
+def write_results(results, path):
+    document = {
+        'python': platform.python_version(),
+        'machine': platform.machine(),
+        'created': time.strftime('%Y-%m-%dT%H:%M:%S%z'),
+        'results': results,
+    }
+    with open(path, 'w') as fh:
+        json.dump(document, fh, indent=2)
+
+
+def load_results(path):
+    with open(path) as fh:
+        return {result['name']: result for result in json.load(fh)['results']}
+
+
+def compare(baseline, current, threshold=0.10, metric='mean'):
+    """Compare two result sets; return (rows, regressions) where a regression is slower by more than threshold."""
+    rows = []
+    regressions = []
+    for name in sorted(set(baseline) & set(current)):
+        before, after = baseline[name][metric], current[name][metric]
+        change = (after - before) / before if before else 0.0
+        row = (name, before, after, change)
+        rows.append(row)
+        if change > threshold:
+            regressions.append(row)
+    return rows, regressions
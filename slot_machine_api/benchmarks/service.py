@@ -0,0 +1,18 @@
+"""Service-level benchmarks: SlotMachineService against a SQLite database."""
+from decimal import Decimal
+
+from benchmarks.runner import measure
+
+
+def run():
+    from slots.models import Player
+    from slots.services import SlotMachineService
+    from benchmarks.environment import seed_players
+
+    seed_players(1)
+    player = Player.objects.get(user__username='bench0')
+    service = SlotMachineService()
+    return [
+        measure('service.play_spin', lambda: service.play_spin(player, Decimal('1.00')), number=20),
+        measure('service.play_batch_100', lambda: service.play_batch(player, Decimal('1.00'), 100), repeat=10),
+    ]
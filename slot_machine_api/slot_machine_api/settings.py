@@ -10,6 +10,7 @@ For the full list of settings and their values, see
 https://docs.djangoproject.com/en/5.0/ref/settings/
 """
 
+import os
 from pathlib import Path
 
 # Build paths inside the project like this: BASE_DIR / 'subdir'.
@@ -41,6 +42,7 @@ INSTALLED_APPS = [
 
     # Third-party apps
     'rest_framework',
+    'rest_framework.authtoken',
     'drf_spectacular',
 
     # Local apps
@@ -52,8 +54,67 @@ REST_FRAMEWORK = {
     'DEFAULT_SCHEMA_CLASS': 'drf_spectacular.openapi.AutoSchema',
     'DEFAULT_AUTHENTICATION_CLASSES': [
         'rest_framework.authentication.SessionAuthentication',
-        'rest_framework.authentication.TokenAuthentication',
+        'slots.authentication.CachedTokenAuthentication',
     ],
+    # Admission control for spin, batch and async spin (slots.throttling), per
+    # worker process. Rates are token buckets: "10/s" allows a burst of 10 spins,
+    # then 10 a second; a batch spends one token per spin.
+    # spin_concurrency sheds requests with 429 beyond that many in flight.
+    'DEFAULT_THROTTLE_RATES': {
+        'spin_player': '10/s',
+        'spin_global': '200/s',
+        'spin_concurrency': '16',
+    },
+}
+
+# Slot machine storage
+# Store new spins in the compact binary format (Spin.packed) instead of JSON.
+SLOTS_COMPACT_SPIN_STORAGE = False
+
+# Paylines as the visible row crossed on each reel, numbered from 1 in win_data.
+# None means one straight line per row. Payouts apply per winning line, e.g.
+# SLOTS_PAYLINES = [(1, 1, 1, 1, 1), (0, 0, 0, 0, 0), (2, 2, 2, 2, 2),
+#                   (0, 1, 2, 1, 0), (2, 1, 0, 1, 2), (0, 0, 1, 2, 2)]
+SLOTS_PAYLINES = None
+
+# Seed for the per-process spin RNG stream (slots.rng). Leave as None in
+# production: a fixed seed makes every worker process draw the same spins.
+SLOTS_RNG_SEED = None
+
+# Write-behind spin log: queue Spin inserts and bulk_create them on a background
+# thread. Balance updates stay synchronous. See slots.spinlog.DEFAULT_WRITE_BEHIND.
+SLOTS_SPIN_WRITE_BEHIND = {
+    'ENABLED': False,
+    'MAX_QUEUE': 10000,
+    'BATCH_SIZE': 500,
+    'FLUSH_INTERVAL_MS': 50,
+    'OVERFLOW': 'sync',
+}
+
+# Request metrics at /api/metrics/ (Prometheus text format) with per-stage
+# timings and query counts. Off by default; see slots.metrics.DEFAULT_METRICS.
+# PROFILE_SLOW_MS dumps cProfile stats of sampled slow requests to PROFILE_DIR.
+SLOTS_METRICS = {
+    'ENABLED': False,
+    'PROFILE_SLOW_MS': None,
+    'PROFILE_SAMPLE_RATE': 0.01,
+}
+
+# Progressive jackpot and house balance on sharded counters (slots.jackpot).
+# Each spin pays CONTRIBUTION_RATE of its bet into the pool and wins the whole
+# pool with TRIGGER_PROBABILITY. Run compact_counters after lowering SHARDS.
+SLOTS_JACKPOT = {
+    'ENABLED': False,
+    'SHARDS': 16,
+    'CONTRIBUTION_RATE': '0.01',
+    'TRIGGER_PROBABILITY': 0.0001,
+}
+
+# In-process cache of auth token -> (user, player id), so authenticated
+# requests skip the token and player lookups. See slots.authentication.
+SLOTS_AUTH_CACHE = {
+    'MAX_ENTRIES': 10000,
+    'TTL': 60,
 }
 
 # Configure drf-spectacular
@@ -65,6 +126,7 @@ SPECTACULAR_SETTINGS = {
 }
 
 MIDDLEWARE = [
+    'slots.metrics.MetricsMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
@@ -101,8 +163,38 @@ WSGI_APPLICATION = 'slot_machine_api.wsgi.application'
 DATABASES = {
     'default': {
         'ENGINE': 'django.db.backends.sqlite3',
-        'NAME': BASE_DIR / 'db.sqlite3',
+        'NAME': os.environ.get('SLOTS_DB_NAME', BASE_DIR / 'db.sqlite3'),
+        # Persistent connections; set SLOTS_DB_CONN_MAX_AGE=0 under ASGI
+        'CONN_MAX_AGE': int(os.environ.get('SLOTS_DB_CONN_MAX_AGE', '60')),
+        'CONN_HEALTH_CHECKS': True,
+        'OPTIONS': {
+            'timeout': 5,
+        },
+    }
+}
+
+# Optional read replica (e.g. a LiteFS/Litestream copy) for the read-only
+# endpoints; see slots.database for routing and read-your-writes pinning.
+if os.environ.get('SLOTS_DB_REPLICA_NAME'):
+    DATABASES['replica'] = {
+        **DATABASES['default'],
+        'NAME': os.environ['SLOTS_DB_REPLICA_NAME'],
+        'TEST': {'MIRROR': 'default'},
     }
+
+DATABASE_ROUTERS = ['slots.database.ReadReplicaRouter']
+
+# SQLite pragmas applied on every new connection, the replica alias and how
+# long a user's reads stay on the primary after a write. That pin lives in the
+# default cache, so with a replica configure CACHES shared by all workers.
+SLOTS_DATABASE = {
+    'READ_ALIAS': 'replica',
+    'PIN_SECONDS': 5,
+    'SQLITE_PRAGMAS': {
+        'journal_mode': 'WAL',
+        'synchronous': 'NORMAL',
+        'busy_timeout': 5000,
+    },
 }
 
 
@@ -1,5 +1,7 @@
 from django.contrib import admin
-from .models import Player, Game, Spin, Symbol
+from .models import (
+    Player, Game, Spin, ArchivedSpin, Symbol, LeaderboardEntry, ReelWeight, CounterShard, JackpotAward,
+)
 
 @admin.register(Player)
 class PlayerAdmin(admin.ModelAdmin):
@@ -18,7 +20,34 @@ class SpinAdmin(admin.ModelAdmin):
     list_filter = ('timestamp',)
     search_fields = ('game__player__user__username',)
 
+@admin.register(ArchivedSpin)
+class ArchivedSpinAdmin(admin.ModelAdmin):
+    list_display = ('id', 'game', 'bet_amount', 'payout', 'timestamp', 'archived_at')
+    list_filter = ('timestamp',)
+    search_fields = ('game__player__user__username',)
+
 @admin.register(Symbol)
 class SymbolAdmin(admin.ModelAdmin):
     list_display = ('name', 'image_path')
-    search_fields = ('name',)
\ No newline at end of file
+    search_fields = ('name',)
+
+@admin.register(ReelWeight)
+class ReelWeightAdmin(admin.ModelAdmin):
+    list_display = ('reel', 'symbol', 'weight')
+    list_filter = ('reel',)
+
+@admin.register(LeaderboardEntry)
+class LeaderboardEntryAdmin(admin.ModelAdmin):
+    list_display = ('window', 'period_start', 'player', 'total_won')
+    list_filter = ('window', 'period_start')
+
+@admin.register(CounterShard)
+class CounterShardAdmin(admin.ModelAdmin):
+    list_display = ('name', 'shard', 'value')
+    list_filter = ('name',)
+
+@admin.register(JackpotAward)
+class JackpotAwardAdmin(admin.ModelAdmin):
+    list_display = ('spin_id', 'player', 'game', 'amount', 'awarded_at')
+    list_filter = ('awarded_at',)
+    search_fields = ('player__user__username',)
@@ -1,6 +1,11 @@
 from django.apps import AppConfig
+from django.db.models.signals import post_migrate
 
 
 class SlotsConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'slots'
+
+    def ready(self):
+        from . import database, signals  # noqa: F401 (database registers the SQLite pragmas)
+        post_migrate.connect(signals.paytable_migrated, sender=self)
@@ -0,0 +1,88 @@
+"""Retention for the hot Spin table: old spins move to ArchivedSpin.
+
+Each batch is copied and deleted in its own short transaction, so archiving
+a large backlog never holds the write lock for long and can be interrupted
+and resumed at any point. History and export read both tables when asked
+with include_archived, and replay_spin finds archived spins too.
+"""
+import time
+
+from .encoding import pack_spin
+from .paytable import get_paytable
+
+# --- Налаштування архівації ---
+ARCHIVE_BATCH_SIZE = 1000
+_COPIED_FIELDS = ('id', 'game_id', 'bet_amount', 'payout', 'rng_seed', 'rng_position', 'timestamp')
+
+
+def _archived(spin, paytable):
+    from .models import ArchivedSpin
+    archived = ArchivedSpin(**{field: getattr(spin, field) for field in _COPIED_FIELDS})
+    if spin.packed is not None:
+        archived.packed = spin.packed
+    else:
+        try:
+            archived.packed = pack_spin(spin.result, spin.win_data, paytable)
+        except KeyError:
+            # Символ уже видалено: зберігаємо JSON як є
+            archived.result, archived.win_data = spin.result, spin.win_data
+    return archived
+
+
+def archive_spins(cutoff, batch_size=ARCHIVE_BATCH_SIZE, pause=0.0, progress=None):
+    """Move spins older than cutoff into ArchivedSpin, oldest first; returns how many moved.
+
+    pause sleeps between batches to leave the database to live traffic;
+    progress, if given, is called with the running total after each batch.
+    """
+    from django.db import transaction
+    from .models import ArchivedSpin, Spin
+    paytable = get_paytable()
+    moved = 0
+    while True:
+        with transaction.atomic():
+            spins = list(
+                Spin.objects.filter(timestamp__lt=cutoff).order_by('timestamp', 'id')
+                .only('packed', 'result', 'win_data', *_COPIED_FIELDS)[:batch_size]
+            )
+            if not spins:
+                break
+            # ignore_conflicts: a batch interrupted after the copy is simply copied again
+            ArchivedSpin.objects.bulk_create([_archived(spin, paytable) for spin in spins], ignore_conflicts=True)
+            Spin.objects.filter(id__in=[spin.id for spin in spins]).delete()
+        moved += len(spins)
+        if progress:
+            progress(moved)
+        if len(spins) < batch_size:
+            break
+        if pause:
+            time.sleep(pause)
+    return moved
+
+
+def player_spin_sources(player, include_archived=False):
+    """Querysets holding the player's spins: the hot table, plus the archive if asked."""
+    from .models import ArchivedSpin, Spin
+    sources = [Spin.objects.filter(player=player)]
+    if include_archived:
+        sources.append(ArchivedSpin.objects.filter(game__player=player))
+    return sources
+
+
+def game_spin_sources(game, include_archived=False):
+    """Querysets holding the spins of one game: the hot table, plus the archive if asked."""
+    from .models import ArchivedSpin, Spin
+    sources = [Spin.objects.filter(game=game)]
+    if include_archived:
+        sources.append(ArchivedSpin.objects.filter(game=game))
+    return sources
+
+
+def find_spin(spin_id):
+    """The Spin with spin_id, or the ArchivedSpin it was moved to; None if neither exists."""
+    from .models import ArchivedSpin, Spin
+    for model in (Spin, ArchivedSpin):
+        spin = model.objects.filter(pk=spin_id).first()
+        if spin is not None:
+            return spin
+    return None
@@ -0,0 +1,117 @@
+"""Async variants of the hot endpoints for ASGI deployments.
+
+DRF views are synchronous, so these are plain Django async views that mirror
+the DRF request/response shapes of SpinViewSet.spin and PlayerViewSet.me.
+"""
+from django.core.serializers.json import DjangoJSONEncoder
+from django.http import JsonResponse
+from django.views.decorators.csrf import csrf_exempt
+from django.views.decorators.http import require_GET, require_POST
+from rest_framework import exceptions
+from rest_framework.authentication import SessionAuthentication, get_authorization_header
+from rest_framework.parsers import JSONParser
+from .authentication import aload_token, cached_player
+from .database import pin_to_primary
+from .metrics import stage
+from .models import Player
+from .serializers import PlayerSerializer, SpinRequestSerializer
+from .services import SlotMachineService
+from .throttling import admit
+
+
+def _response(data, status=200):
+    return JsonResponse(data, status=status, encoder=DjangoJSONEncoder, safe=False)
+
+
+def _throttled(wait):
+    exc = exceptions.Throttled(wait)
+    response = _response({'detail': str(exc.detail)}, status=exc.status_code)
+    response['Retry-After'] = '%d' % exc.wait
+    return response
+
+
+async def _aauthenticate(request):
+    """Token or session authentication, as configured for the DRF views.
+
+    Returns (user, token) like a DRF authentication class; token is None for
+    session users. Tokens are resolved through the same cache as the DRF views.
+    """
+    auth = get_authorization_header(request).split()
+    if auth and auth[0].lower() == b'token':
+        if len(auth) != 2:
+            return None
+        try:
+            entry = await aload_token(auth[1].decode())
+        except UnicodeError:
+            return None
+        if entry is None or not entry.user.is_active:
+            return None
+        return entry.user, entry.token
+    user = await request.auser()
+    if not user.is_authenticated:
+        return None
+    # Сесійна автентифікація вимагає CSRF так само, як у DRF
+    SessionAuthentication().enforce_csrf(request)
+    return user, None
+
+
+def _async_endpoint(view):
+    async def wrapper(request, *args, **kwargs):
+        try:
+            with stage('auth'):
+                credentials = await _aauthenticate(request)
+        except exceptions.PermissionDenied as exc:
+            return _response({'detail': str(exc.detail)}, status=403)
+        if credentials is None:
+            return _response({'detail': 'Authentication credentials were not provided.'}, status=401)
+        return await view(request, *credentials, *args, **kwargs)
+    wrapper.__name__ = view.__name__
+    wrapper.__doc__ = view.__doc__
+    return csrf_exempt(wrapper)
+
+
+@require_POST
+@_async_endpoint
+async def spin(request, user, token):
+    """Async POST /api/async/spins/spin/, behind the same admission control as SpinViewSet.spin."""
+    wait, slot = admit(user.pk)
+    if wait:
+        return _throttled(wait)
+    try:
+        return await _spin(request, user, token)
+    finally:
+        if slot is not None:
+            slot.release()
+
+
+async def _spin(request, user, token):
+    try:
+        data = JSONParser().parse(request) if request.body else {}
+    except exceptions.ParseError as exc:
+        return _response({'detail': str(exc.detail)}, status=400)
+    serializer = SpinRequestSerializer(data=data)
+    if not serializer.is_valid():
+        return _response(serializer.errors, status=400)
+
+    with stage('player_lookup'):
+        player = cached_player(user, token) or await Player.objects.aget(user=user)
+    slot_machine = await SlotMachineService.acreate()
+    result = await slot_machine.aplay_spin(player, serializer.validated_data['bet_size'])
+
+    if not result['success']:
+        return _response({'detail': result['message']}, status=400)
+    pin_to_primary(user.pk)
+    return _response(result)
+
+
+@require_GET
+@_async_endpoint
+async def player_me(request, user, token):
+    """Async GET /api/async/players/me/."""
+    cached = cached_player(user, token)
+    if cached is not None:
+        player = await Player.objects.aget(pk=cached.pk)
+        player.user = user
+    else:
+        player = await Player.objects.select_related('user').aget(user=user)
+    return _response(PlayerSerializer(player).data)
@@ -0,0 +1,220 @@
+"""Token authentication backed by an in-process cache of token -> (user, player id).
+
+A cache hit authenticates without touching the database, and the player id
+stored alongside lets views resolve request.user's Player without a lookup.
+A miss costs one query that fetches the token, user and player together.
+Entries expire after TTL seconds; saving or deleting a token, changing a
+user or deleting a player invalidates them in this process at once and in
+other processes within AUTH_CACHE_VERSION_CHECK_INTERVAL, through a version
+kept in the Django cache like the paytable's. A user who had no player when
+the token was cached is looked up again, so creating one needs no invalidation.
+"""
+import threading
+import time
+from collections import OrderedDict, namedtuple
+
+from django.conf import settings
+from django.core.cache import cache
+from django.core.signals import setting_changed
+from django.dispatch import receiver
+from django.utils.translation import gettext_lazy as _
+from rest_framework import exceptions
+from rest_framework.authentication import TokenAuthentication
+
+# --- Налаштування кешу токенів ---
+DEFAULT_AUTH_CACHE = {
+    'MAX_ENTRIES': 10000,  # least recently used tokens are evicted beyond this
+    'TTL': 60,  # seconds a cached token is trusted before it is read again
+}
+AUTH_CACHE_VERSION_KEY = 'slots:auth_cache_version'
+AUTH_CACHE_VERSION_CHECK_INTERVAL = 1.0  # seconds between checks of the shared version
+
+CachedToken = namedtuple('CachedToken', ['token', 'user', 'player_id'])
+
+
+def auth_cache_settings():
+    return {**DEFAULT_AUTH_CACHE, **getattr(settings, 'SLOTS_AUTH_CACHE', {})}
+
+
+class TokenCache:
+    """Thread-safe LRU of token key -> CachedToken with a per-entry TTL."""
+
+    def __init__(self, max_entries=10000, ttl=60.0):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self._lock = threading.Lock()
+        self._entries = OrderedDict()  # key -> (expires_at, CachedToken)
+        self._generation = 0  # bumped by every invalidation, so in-flight loads can't cache stale rows
+        self._shared_version = cache.get(AUTH_CACHE_VERSION_KEY, 0)
+        self._last_shared_check = time.monotonic()
+
+    @property
+    def generation(self):
+        return self._generation
+
+    def _check_shared_version(self, now):
+        if now - self._last_shared_check < AUTH_CACHE_VERSION_CHECK_INTERVAL:
+            return
+        self._last_shared_check = now
+        shared = cache.get(AUTH_CACHE_VERSION_KEY, 0)
+        if shared != self._shared_version:
+            with self._lock:
+                self._shared_version = shared
+                self._entries.clear()
+                self._generation += 1
+
+    def get(self, key):
+        """Cached entry for key, or None when it is missing or expired."""
+        now = time.monotonic()
+        self._check_shared_version(now)
+        with self._lock:
+            item = self._entries.get(key)
+            if item is None:
+                return None
+            if item[0] <= now:
+                del self._entries[key]
+                return None
+            self._entries.move_to_end(key)
+            return item[1]
+
+    def put(self, key, entry, generation):
+        """Store entry unless an invalidation happened since generation was read."""
+        with self._lock:
+            if generation != self._generation:
+                return
+            self._entries[key] = (time.monotonic() + self.ttl, entry)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def invalidate(self, key=None, user_id=None):
+        """Drop the entry of key and/or every entry of user_id here, and in other processes."""
+        with self._lock:
+            self._generation += 1
+            if key is not None:
+                self._entries.pop(key, None)
+            if user_id is not None:
+                for cached_key in [k for k, (_, entry) in self._entries.items() if entry.user.pk == user_id]:
+                    del self._entries[cached_key]
+        try:
+            shared = cache.incr(AUTH_CACHE_VERSION_KEY)
+        except ValueError:
+            cache.add(AUTH_CACHE_VERSION_KEY, 1, timeout=None)
+            shared = cache.get(AUTH_CACHE_VERSION_KEY, 0)
+        with self._lock:
+            # Власна інвалідація не повинна скидати весь кеш при наступній перевірці
+            self._shared_version = shared
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._generation += 1
+
+    def __len__(self):
+        return len(self._entries)
+
+
+_token_cache = None
+_token_cache_lock = threading.Lock()
+
+
+def get_token_cache():
+    """Process-wide TokenCache configured from SLOTS_AUTH_CACHE."""
+    global _token_cache
+    if _token_cache is None:
+        with _token_cache_lock:
+            if _token_cache is None:
+                config = auth_cache_settings()
+                _token_cache = TokenCache(config['MAX_ENTRIES'], config['TTL'])
+    return _token_cache
+
+
+@receiver(setting_changed)
+def _reset_token_cache(setting, **kwargs):
+    global _token_cache
+    if setting == 'SLOTS_AUTH_CACHE':
+        _token_cache = None
+
+
+def _cached_token(token):
+    user = token.user
+    player = getattr(user, 'player', None)  # відсутній профіль гравця (адміністратор) -> None
+    return CachedToken(token, user, player.pk if player is not None else None)
+
+
+def load_token(key):
+    """CachedToken for key from the cache or with one query; None if the token doesn't exist."""
+    token_cache = get_token_cache()
+    entry = token_cache.get(key)
+    if entry is None:
+        from rest_framework.authtoken.models import Token
+        generation = token_cache.generation
+        try:
+            entry = _cached_token(Token.objects.select_related('user__player').get(key=key))
+        except Token.DoesNotExist:
+            return None
+        token_cache.put(key, entry, generation)
+    return entry
+
+
+async def aload_token(key):
+    """Async load_token(); a cache hit never leaves the event loop."""
+    token_cache = get_token_cache()
+    entry = token_cache.get(key)
+    if entry is None:
+        from rest_framework.authtoken.models import Token
+        generation = token_cache.generation
+        try:
+            entry = _cached_token(await Token.objects.select_related('user__player').aget(key=key))
+        except Token.DoesNotExist:
+            return None
+        token_cache.put(key, entry, generation)
+    return entry
+
+
+class CachedTokenAuthentication(TokenAuthentication):
+    """TokenAuthentication that serves repeat requests from the TokenCache."""
+
+    def authenticate_credentials(self, key):
+        entry = load_token(key)
+        if entry is None:
+            raise exceptions.AuthenticationFailed(_('Invalid token.'))
+        if not entry.user.is_active:
+            raise exceptions.AuthenticationFailed(_('User inactive or deleted.'))
+        return entry.user, entry.token
+
+
+def cached_player(user, token):
+    """user's Player from the player id cached with token, without a query.
+
+    Only id and user are loaded; other fields load on first access, and
+    play_spin refreshes the balance itself. None when the token isn't cached.
+    """
+    from .models import Player
+    if token is None:
+        return None
+    entry = get_token_cache().get(token.key)
+    if entry is None or entry.player_id is None or entry.user.pk != user.pk:
+        return None
+    player = Player.from_db(Player.objects.db, ['id', 'user_id'], [entry.player_id, user.pk])
+    player.user = user
+    return player
+
+
+def request_player(request, load=False):
+    """Player of request.user, resolved once per request.
+
+    Token requests take the player id from the TokenCache; other requests,
+    and load=True for a fully loaded Player, cost one query.
+    """
+    from .models import Player
+    player = getattr(request, '_slots_player', None)
+    if player is None or (load and player.get_deferred_fields()):
+        player = cached_player(request.user, getattr(request, 'auth', None))
+        if player is None:
+            player = Player.objects.get(user=request.user)
+        elif load:
+            player = Player.objects.get(pk=player.pk)
+        player.user = request.user
+        request._slots_player = player
+    return player
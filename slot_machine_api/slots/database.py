@@ -0,0 +1,160 @@
+"""Database tuning: SQLite pragmas on connect and read-replica routing.
+
+Read-only endpoints run their queries on SLOTS_DATABASE['READ_ALIAS'] when
+that alias is configured in DATABASES; everything else, and every write,
+goes to the primary. A user whose write request succeeded reads from the
+primary for PIN_SECONDS afterwards, so a spin always shows up in the next
+history page even when the replica lags, and primary_reads() forces the
+primary for a block of code. The pin is kept in the default cache, which
+every worker must share (e.g. Redis or Memcached): with a per-process cache
+such as LocMemCache a user's next request may land on a worker that never
+saw the pin and read the lagging replica, so the slots.W001 check warns.
+"""
+import contextvars
+from contextlib import contextmanager
+
+from django.conf import settings
+from django.core import checks
+from django.core.cache import cache, caches
+from django.core.signals import setting_changed
+from django.db import DEFAULT_DB_ALIAS
+from django.db.backends.signals import connection_created
+from django.dispatch import receiver
+from rest_framework.permissions import SAFE_METHODS
+
+# --- Налаштування бази даних ---
+DEFAULT_DATABASE = {
+    'READ_ALIAS': 'replica',  # alias for read-only endpoints; ignored unless it is in DATABASES
+    'PIN_SECONDS': 5,  # read from the primary this long after a user's write request
+    'SQLITE_PRAGMAS': {
+        'journal_mode': 'WAL',  # readers no longer block the writer, nor the writer readers
+        'synchronous': 'NORMAL',  # fsync at checkpoints only; safe against corruption in WAL mode
+        'busy_timeout': 5000,  # milliseconds a writer waits for the lock before failing
+    },
+}
+PIN_KEY = 'slots:db_pin:{}'
+# Кеші, що живуть в одному процесі й не бачать пінів інших воркерів
+PROCESS_LOCAL_CACHES = ('LocMemCache', 'DummyCache')
+
+_config = None
+
+
+def database_settings():
+    global _config
+    if _config is None:
+        _config = {**DEFAULT_DATABASE, **getattr(settings, 'SLOTS_DATABASE', {})}
+    return _config
+
+
+@receiver(setting_changed)
+def _reset_config(setting, **kwargs):
+    global _config
+    if setting in ('SLOTS_DATABASE', 'DATABASES'):
+        _config = None
+
+
+@receiver(connection_created)
+def apply_sqlite_pragmas(sender, connection, **kwargs):
+    if connection.vendor != 'sqlite':
+        return
+    with connection.cursor() as cursor:
+        for name, value in database_settings()['SQLITE_PRAGMAS'].items():
+            cursor.execute(f'PRAGMA {name} = {value}')
+
+
+# Аліас для читання в поточному запиті; None означає основну базу
+_read_alias = contextvars.ContextVar('slots_read_alias', default=None)
+
+
+def replica_alias():
+    """The configured read alias, or None when DATABASES has no such database."""
+    alias = database_settings()['READ_ALIAS']
+    return alias if alias and alias in settings.DATABASES else None
+
+
+@checks.register(checks.Tags.caches)
+def check_pin_cache(app_configs, **kwargs):
+    """Warn when replica reads are on but the read-your-writes pin cannot reach other workers."""
+    backend = type(caches['default']).__name__
+    if replica_alias() is None or backend not in PROCESS_LOCAL_CACHES:
+        return []
+    return [checks.Warning(
+        f"Reads go to the '{replica_alias()}' replica but the default cache is {backend}, "
+        "so a user pinned to the primary by one worker may read stale data from another.",
+        hint='Configure a cache shared by all workers, such as Redis or Memcached.',
+        id='slots.W001',
+    )]
+
+
+class ReadReplicaRouter:
+    """Routes reads to the alias selected for the current context and writes to the primary."""
+
+    def db_for_read(self, model, **hints):
+        return _read_alias.get()
+
+    def db_for_write(self, model, **hints):
+        if _read_alias.get() is not None:
+            # Після запису решта запиту читає з основної бази, щоб бачити власні зміни
+            _read_alias.set(None)
+        return DEFAULT_DB_ALIAS
+
+    def allow_relation(self, obj1, obj2, **hints):
+        return True
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        # Репліка отримує схему від основної бази, а не через migrate
+        return False if db == replica_alias() else None
+
+
+@contextmanager
+def replica_reads(alias):
+    """Send the reads of the block to alias (None means the primary)."""
+    token = _read_alias.set(alias)
+    try:
+        yield
+    finally:
+        _read_alias.reset(token)
+
+
+def primary_reads():
+    """Read-your-writes override: read from the primary inside the block."""
+    return replica_reads(None)
+
+
+def pin_to_primary(user_id):
+    """Keep user_id's reads on the primary for PIN_SECONDS, until the replica catches up."""
+    if replica_alias() is not None:
+        cache.set(PIN_KEY.format(user_id), True, database_settings()['PIN_SECONDS'])
+
+
+def read_alias_for(user_id):
+    """Alias for a read-only request of user_id: the replica unless the user was just pinned."""
+    alias = replica_alias()
+    if alias is None or (user_id is not None and cache.get(PIN_KEY.format(user_id))):
+        return None
+    return alias
+
+
+class ReplicaReadMixin:
+    """Runs the safe-method requests of a DRF view on the read replica.
+
+    Authentication still reads the primary; the alias is chosen once the user
+    is known and reset in finalize_response(). A successful unsafe request
+    pins its user to the primary.
+    """
+    _replica_token = None
+
+    def initial(self, request, *args, **kwargs):
+        super().initial(request, *args, **kwargs)
+        if request.method in SAFE_METHODS:
+            alias = read_alias_for(request.user.pk)
+            if alias is not None:
+                self._replica_token = _read_alias.set(alias)
+
+    def finalize_response(self, request, response, *args, **kwargs):
+        if self._replica_token is not None:
+            _read_alias.reset(self._replica_token)
+            self._replica_token = None
+        elif request.method not in SAFE_METHODS and response.status_code < 400 and request.user.is_authenticated:
+            pin_to_primary(request.user.pk)
+        return super().finalize_response(request, response, *args, **kwargs)
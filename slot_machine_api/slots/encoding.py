@@ -0,0 +1,80 @@
+import struct
+
+from .paytable import get_paytable
+
+# --- Компактний формат запису спіну ---
+# header:  version, num_reels, visible_rows, id width (bytes per symbol id)
+# grid:    num_reels * visible_rows symbol ids, reel by reel
+# wins:    count, then (row, symbol id, start, length) per winning row
+PACKED_FORMAT_VERSION = 1
+_HEADER = struct.Struct('>BBBB')
+_ID_FORMATS = {1: 'B', 2: 'H', 4: 'I'}
+
+
+def _id_width(ids):
+    largest = max(ids, default=0)
+    for width in (1, 2, 4):
+        if largest < 1 << (8 * width):
+            return width
+    raise ValueError(f'Symbol id {largest} does not fit the packed spin format')
+
+
+def pack_spin(result, win_data, paytable=None):
+    """Encode a spin result and its win data into the compact binary format."""
+    paytable = paytable or get_paytable()
+    by_name = paytable.by_name
+    reels = list(result.values())
+    grid = [by_name[name].id for reel in reels for name in reel]
+    wins = [
+        (int(row), by_name[name].id, indices[0], len(indices))
+        for row, (name, indices) in (win_data or {}).items()
+    ]
+    width = _id_width(grid + [symbol_id for _, symbol_id, _, _ in wins])
+    id_format = _ID_FORMATS[width]
+    visible_rows = len(reels[0]) if reels else 0
+    return b''.join((
+        _HEADER.pack(PACKED_FORMAT_VERSION, len(reels), visible_rows, width),
+        struct.pack(f'>{len(grid)}{id_format}', *grid),
+        struct.pack('>B', len(wins)),
+        b''.join(struct.pack(f'>B{id_format}BB', *win) for win in wins),
+    ))
+
+
+def unpack_spin(packed, paytable=None, strict=False):
+    """Decode packed bytes into (result, win_data) shaped like the stored JSON fields.
+
+    A symbol deleted since the spin was packed is shown as '#<id>', or raises
+    KeyError when strict.
+    """
+    paytable = paytable or get_paytable()
+    packed = bytes(packed)
+    version, num_reels, visible_rows, width = _HEADER.unpack_from(packed)
+    if version != PACKED_FORMAT_VERSION:
+        raise ValueError(f'Unsupported packed spin format {version}')
+    id_format = _ID_FORMATS[width]
+    by_id = paytable.by_id
+
+    def name(symbol_id):
+        # Символ могли видалити після запису спіну
+        symbol = by_id.get(symbol_id)
+        if symbol is None and strict:
+            raise KeyError(symbol_id)
+        return symbol.name if symbol else f'#{symbol_id}'
+
+    offset = _HEADER.size
+    cells = num_reels * visible_rows
+    grid = struct.unpack_from(f'>{cells}{id_format}', packed, offset)
+    offset += cells * width
+    result = {
+        str(reel): [name(symbol_id) for symbol_id in grid[reel * visible_rows:(reel + 1) * visible_rows]]
+        for reel in range(num_reels)
+    }
+    (win_count,) = struct.unpack_from('>B', packed, offset)
+    offset += 1
+    win_struct = struct.Struct(f'>B{id_format}BB')
+    win_data = {}
+    for _ in range(win_count):
+        row, symbol_id, start, length = win_struct.unpack_from(packed, offset)
+        offset += win_struct.size
+        win_data[str(row)] = [name(symbol_id), list(range(start, start + length))]
+    return result, win_data or None
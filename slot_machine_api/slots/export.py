@@ -0,0 +1,97 @@
+"""Streaming spin history export as CSV or NDJSON.
+
+Rows are read with values_list() over a chunked iterator() and written one
+line at a time, so memory stays constant however long the history is.
+"""
+import csv
+import heapq
+import json
+
+from django.core.serializers.json import DjangoJSONEncoder
+from rest_framework.renderers import BaseRenderer
+
+from .encoding import unpack_spin
+from .paytable import get_paytable
+
+# --- Налаштування експорту ---
+EXPORT_CHUNK_SIZE = 2000
+EXPORT_COLUMNS = ('id', 'game', 'player', 'timestamp', 'bet_amount', 'payout', 'result', 'win_data')
+_FIELDS = ('id', 'game_id', 'game__player_id', 'timestamp', 'bet_amount', 'payout', 'result', 'win_data', 'packed')
+
+
+def _order_key(row):
+    return row[3], row[0]  # (timestamp, id)
+
+
+def export_rows(queryset, chunk_size=EXPORT_CHUNK_SIZE):
+    """Yield one tuple of EXPORT_COLUMNS per spin, oldest first, decoding packed spins.
+
+    queryset may also be a list of querysets (hot and archived spins), whose
+    rows are merged in order.
+    """
+    paytable = get_paytable()
+    querysets = queryset if isinstance(queryset, (list, tuple)) else [queryset]
+    streams = [
+        queryset.order_by('timestamp', 'id').values_list(*_FIELDS).iterator(chunk_size=chunk_size)
+        for queryset in querysets
+    ]
+    rows = streams[0] if len(streams) == 1 else heapq.merge(*streams, key=_order_key)
+    for *fields, result, win_data, packed in rows:
+        if packed is not None:
+            result, win_data = unpack_spin(packed, paytable)
+        yield (*fields, result, win_data)
+
+
+class _Echo:
+    """File-like object whose write() returns the line, for csv.writer in a generator."""
+
+    def write(self, value):
+        return value
+
+
+def csv_lines(rows):
+    writer = csv.writer(_Echo())
+    yield writer.writerow(EXPORT_COLUMNS)
+    for spin_id, game, player, timestamp, bet, payout, result, win_data in rows:
+        yield writer.writerow((
+            spin_id, game, player, timestamp.isoformat(), bet, payout,
+            json.dumps(result, separators=(',', ':')),
+            json.dumps(win_data, separators=(',', ':')) if win_data else '',
+        ))
+
+
+def ndjson_lines(rows):
+    encoder = DjangoJSONEncoder(separators=(',', ':'))
+    for row in rows:
+        yield encoder.encode(dict(zip(EXPORT_COLUMNS, row))) + '\n'
+
+
+class CSVRenderer(BaseRenderer):
+    """Selects ?format=csv; the export streams its own body, this only renders errors."""
+    media_type = 'text/csv'
+    format = 'csv'
+    charset = 'utf-8'
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if not isinstance(data, dict):
+            return ''
+        writer = csv.writer(_Echo())
+        return writer.writerow(data.keys()) + writer.writerow(data.values())
+
+
+class NDJSONRenderer(BaseRenderer):
+    """Selects ?format=ndjson; the export streams its own body, this only renders errors."""
+    media_type = 'application/x-ndjson'
+    format = 'ndjson'
+    charset = 'utf-8'
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if data is None:
+            return ''
+        return json.dumps(data, cls=DjangoJSONEncoder) + '\n'
+
+
+EXPORT_FORMATS = {
+    'csv': (csv_lines, CSVRenderer.media_type),
+    'ndjson': (ndjson_lines, NDJSONRenderer.media_type),
+}
@@ -0,0 +1,38 @@
+"""Spin list filters shared by the history API and the export_spins command.
+
+Parameters arrive as a query dict or a plain dict of strings; bad values
+raise DRF's ValidationError, which the API returns as a 400.
+"""
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+from rest_framework.exceptions import ValidationError
+
+
+def parse_timestamp(params, name):
+    """The ISO 8601 timestamp in params[name] as an aware datetime, or None when absent."""
+    value = params.get(name)
+    if not value:
+        return None
+    timestamp = parse_datetime(value)
+    if timestamp is None:
+        raise ValidationError({name: 'Expected an ISO 8601 timestamp.'})
+    if timezone.is_naive(timestamp):
+        timestamp = timezone.make_aware(timestamp)
+    return timestamp
+
+
+def query_flag(params, name):
+    return params.get(name, '').lower() in ('1', 'true', 'yes')
+
+
+def filter_spins(queryset, params):
+    """Apply the since/until/winning_only query parameters to a Spin queryset."""
+    since = parse_timestamp(params, 'since')
+    until = parse_timestamp(params, 'until')
+    if since:
+        queryset = queryset.filter(timestamp__gte=since)
+    if until:
+        queryset = queryset.filter(timestamp__lt=until)
+    if query_flag(params, 'winning_only'):
+        queryset = queryset.filter(payout__gt=0)
+    return queryset
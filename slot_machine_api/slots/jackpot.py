@@ -0,0 +1,187 @@
+"""House balance and progressive jackpot pool on sharded counters.
+
+Every spin adds its jackpot contribution and the house's take to one shard
+of each counter, picked by hashing the spin id, so spins only contend when
+they hash to the same shard. Reads sum the shards. A triggered jackpot
+locks the pool's shards in shard order, empties them, credits the player
+and records a JackpotAward within the spin's transaction; spins that
+contribute lock the pool shard before the house shard, so a claim never
+deadlocks with them.
+"""
+import logging
+import random
+import threading
+import uuid
+import zlib
+from decimal import ROUND_DOWN, Decimal
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.core.signals import setting_changed
+from django.db.models import F, Sum
+from django.dispatch import receiver
+
+logger = logging.getLogger(__name__)
+
+# --- Налаштування джекпоту ---
+DEFAULT_JACKPOT = {
+    'ENABLED': False,
+    'SHARDS': 16,  # rows per counter; more shards, fewer spins waiting on the same row
+    'CONTRIBUTION_RATE': '0.01',  # share of every bet paid into the pool
+    'TRIGGER_PROBABILITY': 0.0001,  # chance that a spin wins the pool
+}
+JACKPOT_POOL = 'jackpot_pool'
+HOUSE_BALANCE = 'house_balance'
+CENT = Decimal('0.01')
+ZERO = Decimal('0.00')
+
+
+def jackpot_settings():
+    return {**DEFAULT_JACKPOT, **getattr(settings, 'SLOTS_JACKPOT', {})}
+
+
+class ShardedCounter:
+    """Decimal counter spread over CounterShard rows (name, 0..shards-1)."""
+
+    def __init__(self, name, shards=16):
+        if shards < 1:
+            raise ValueError('A sharded counter needs at least one shard')
+        self.name = name
+        self.shards = shards
+
+    def shard_for(self, key):
+        """Shard of key; spin ids are UUIDs, anything else is hashed by its text."""
+        if isinstance(key, uuid.UUID):
+            return key.int % self.shards
+        return zlib.crc32(str(key).encode()) % self.shards
+
+    def _rows(self):
+        from .models import CounterShard
+        return CounterShard.objects.filter(name=self.name)
+
+    def _create_shards(self):
+        from .models import CounterShard
+        CounterShard.objects.bulk_create(
+            [CounterShard(name=self.name, shard=shard) for shard in range(self.shards)], ignore_conflicts=True
+        )
+
+    def add(self, amount, key):
+        """Add amount to the shard of key with one UPDATE."""
+        if not amount:
+            return
+        shard = self._rows().filter(shard=self.shard_for(key))
+        if not shard.update(value=F('value') + amount):
+            # Перший запис лічильника створює всі його шарди
+            self._create_shards()
+            shard.update(value=F('value') + amount)
+
+    def value(self):
+        return self._rows().aggregate(total=Sum('value'))['total'] or ZERO
+
+    def _locked(self):
+        # Блокування в порядку шардів, щоб два скидання не заблокували одне одного
+        return list(self._rows().select_for_update().order_by('shard').values_list('shard', 'value'))
+
+    def take_all(self):
+        """Empty the counter atomically and return what it held."""
+        from django.db import transaction
+        with transaction.atomic():
+            total = sum((value for _, value in self._locked()), ZERO)
+            if total:
+                self._rows().update(value=ZERO)
+        return total
+
+    def compact(self):
+        """Fold every shard into shard 0 and drop shards beyond the configured count.
+
+        Run after lowering the shard count (or periodically) so the sum is
+        read from as few rows as possible and no row outside the ring keeps
+        a stale share. Returns the counter's value.
+        """
+        from django.db import transaction
+        with transaction.atomic():
+            rows = self._locked()
+            total = sum((value for _, value in rows), ZERO)
+            self._rows().filter(shard__gte=self.shards).delete()
+            self._rows().filter(shard__gt=0).update(value=ZERO)
+            if not self._rows().filter(shard=0).update(value=total):
+                self._create_shards()
+                self._rows().filter(shard=0).update(value=total)
+        return total
+
+
+class Jackpot:
+    """Progressive jackpot fed by a share of every bet, plus the house balance."""
+
+    def __init__(self, shards=16, contribution_rate='0.01', trigger_probability=0.0001, rng=None):
+        self.pool = ShardedCounter(JACKPOT_POOL, shards)
+        self.house = ShardedCounter(HOUSE_BALANCE, shards)
+        self.contribution_rate = Decimal(str(contribution_rate))
+        self.trigger_probability = trigger_probability
+        self.rng = rng or random.SystemRandom()
+
+    def contribution(self, wagered):
+        return (wagered * self.contribution_rate).quantize(CENT, rounding=ROUND_DOWN)
+
+    def _triggered(self, spins):
+        return any(self.rng.random() < self.trigger_probability for _ in range(spins))
+
+    def settle(self, spin, player, wagered, won, spins=1):
+        """Record the contributions of spins keyed by the first of them; returns the jackpot won.
+
+        Call inside the spin's transaction, after the bet has been settled. A
+        won jackpot is credited to the player and recorded as a JackpotAward
+        of spin's game, whose total_won it joins, in that same transaction.
+        """
+        from django.db import transaction
+        from .models import Game, JackpotAward, Player
+        contribution = self.contribution(wagered)
+        jackpot = ZERO
+        if self._triggered(spins):
+            # Окрема транзакція для асинхронного шляху, де спін не має власної
+            with transaction.atomic():
+                jackpot = self.pool.take_all()
+                if jackpot:
+                    Player.objects.filter(pk=player.pk).update(
+                        balance=F('balance') + jackpot, total_won=F('total_won') + jackpot,
+                    )
+                    JackpotAward.objects.create(
+                        spin_id=spin.id, game_id=spin.game_id, player_id=player.pk, amount=jackpot,
+                    )
+                    Game.objects.filter(pk=spin.game_id).update(total_won=F('total_won') + jackpot)
+            if jackpot:
+                player.refresh_from_db(fields=['balance', 'total_won'])
+                logger.info('Player %s won the jackpot of %s on spin %s', player.pk, jackpot, spin.id)
+        self.pool.add(contribution, spin.id)
+        self.house.add(wagered - won - contribution, spin.id)
+        return jackpot
+
+    async def asettle(self, spin, player, wagered, won, spins=1):
+        return await sync_to_async(self.settle)(spin, player, wagered, won, spins)
+
+    def balances(self):
+        return {'jackpot': self.pool.value(), 'house': self.house.value()}
+
+
+_jackpot = None
+_jackpot_lock = threading.Lock()
+
+
+def get_jackpot():
+    """Process-wide Jackpot from SLOTS_JACKPOT, or None when it is disabled."""
+    global _jackpot
+    if _jackpot is None:
+        with _jackpot_lock:
+            if _jackpot is None:
+                config = jackpot_settings()
+                _jackpot = Jackpot(
+                    config['SHARDS'], config['CONTRIBUTION_RATE'], config['TRIGGER_PROBABILITY'],
+                ) if config['ENABLED'] else False
+    return _jackpot or None
+
+
+@receiver(setting_changed)
+def _reset_jackpot(setting, **kwargs):
+    global _jackpot
+    if setting == 'SLOTS_JACKPOT':
+        _jackpot = None
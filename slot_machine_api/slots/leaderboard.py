@@ -0,0 +1,219 @@
+import bisect
+import logging
+import threading
+import time
+from datetime import datetime, timezone as dt_timezone
+
+from django.db.models import F, Q
+from django.utils import timezone
+
+logger = logging.getLogger(__name__)
+
+# --- Налаштування таблиці лідерів ---
+WINDOWS = ('all', 'daily', 'hourly')
+LEADERBOARD_SIZE = 100  # entries kept per window, the largest ?limit served
+LEADERBOARD_REFRESH_SECONDS = 5.0  # merge in wins recorded by other processes this often
+ALL_TIME_START = datetime(2000, 1, 1, tzinfo=dt_timezone.utc)
+
+
+def period_start(window, now):
+    """Start of the period of window that contains now."""
+    if window == 'all':
+        return ALL_TIME_START
+    now = now.astimezone(dt_timezone.utc)
+    if window == 'daily':
+        return now.replace(hour=0, minute=0, second=0, microsecond=0)
+    if window == 'hourly':
+        return now.replace(minute=0, second=0, microsecond=0)
+    raise ValueError(f'Unknown leaderboard window {window!r}, expected one of {WINDOWS}')
+
+
+class _Board:
+    """Scores of one window period and its top entries, sorted by (-score, player_id).
+
+    Scores only ever increase, so a player below the top can only enter it
+    and the list stays exact without re-sorting everything.
+    """
+    __slots__ = ('period', 'size', 'scores', 'top', 'refreshed')
+
+    def __init__(self, period, size):
+        self.period = period
+        self.size = size
+        self.scores = {}  # player_id -> score, for every player whose rollup row exists
+        self.top = []
+        self.refreshed = None
+
+    def forget(self, player_id):
+        old = self.scores.pop(player_id, None)
+        if old is not None:
+            index = bisect.bisect_left(self.top, (-old, player_id))
+            if index < len(self.top) and self.top[index] == (-old, player_id):
+                del self.top[index]
+
+    def raise_score(self, player_id, score):
+        old = self.scores.get(player_id)
+        if old is not None and score <= old:
+            return
+        self.forget(player_id)
+        self.scores[player_id] = score
+        if len(self.top) < self.size or (-score, player_id) < self.top[-1]:
+            bisect.insort(self.top, (-score, player_id))
+            del self.top[self.size:]
+
+
+class Leaderboard:
+    """Per-process top-K boards for each window, backed by LeaderboardEntry rollups.
+
+    record() runs inside the spin's transaction: it bumps the rollup rows with
+    one UPDATE and applies the win in memory once the transaction commits.
+    top() serves from memory and merges in the rollup table's top rows every
+    refresh_interval seconds, which picks up wins from other processes and
+    restores the boards after a restart.
+    """
+
+    def __init__(self, size=LEADERBOARD_SIZE, refresh_interval=LEADERBOARD_REFRESH_SECONDS):
+        self.size = size
+        self.refresh_interval = refresh_interval
+        self._lock = threading.Lock()
+        self._boards = {}
+
+    def _board(self, window, period):
+        # Новий період починає порожню дошку; запізнілі записи старого періоду ігноруються
+        board = self._boards.get(window)
+        if board is None or board.period < period:
+            board = self._boards[window] = _Board(period, self.size)
+        return board if board.period == period else None
+
+    @staticmethod
+    def _rows(periods, player_id):
+        from .models import LeaderboardEntry
+        match = Q()
+        for window, start in periods.items():
+            match |= Q(window=window, period_start=start)
+        return LeaderboardEntry.objects.filter(match, player_id=player_id)
+
+    def _unknown(self, periods, player_id):
+        """Windows whose rollup row this process has not seen for the player yet."""
+        with self._lock:
+            return {
+                window: start for window, start in periods.items()
+                if (board := self._board(window, start)) is None or player_id not in board.scores
+            }
+
+    @staticmethod
+    def _new_rows(periods, player_id):
+        from .models import LeaderboardEntry
+        return [LeaderboardEntry(window=window, period_start=start, player_id=player_id)
+                for window, start in periods.items()]
+
+    def record(self, player_id, amount, now=None):
+        """Add a win to the player's score in every window."""
+        from django.db import transaction
+        from .models import LeaderboardEntry
+        if amount <= 0:
+            return
+        periods = {window: period_start(window, now or timezone.now()) for window in WINDOWS}
+        unknown = self._unknown(periods, player_id)
+        if unknown:
+            LeaderboardEntry.objects.bulk_create(self._new_rows(unknown, player_id), ignore_conflicts=True)
+        updated = self._rows(periods, player_id).update(total_won=F('total_won') + amount)
+        if updated != len(periods):
+            present = set(self._rows(periods, player_id).values_list('window', flat=True))
+            missing = self._missing(periods, player_id, present)
+            if missing:
+                LeaderboardEntry.objects.bulk_create(self._new_rows(missing, player_id), ignore_conflicts=True)
+                self._rows(missing, player_id).update(total_won=F('total_won') + amount)
+                unknown = {**unknown, **missing}
+        scores = dict(self._rows(unknown, player_id).values_list('window', 'total_won')) if unknown else {}
+        transaction.on_commit(lambda: self._apply(player_id, amount, periods, scores))
+
+    async def arecord(self, player_id, amount, now=None):
+        """Async record(); applied in memory right away as there is no transaction to wait for."""
+        from .models import LeaderboardEntry
+        if amount <= 0:
+            return
+        periods = {window: period_start(window, now or timezone.now()) for window in WINDOWS}
+        unknown = self._unknown(periods, player_id)
+        if unknown:
+            await LeaderboardEntry.objects.abulk_create(self._new_rows(unknown, player_id), ignore_conflicts=True)
+        updated = await self._rows(periods, player_id).aupdate(total_won=F('total_won') + amount)
+        if updated != len(periods):
+            present = {window async for window in self._rows(periods, player_id).values_list('window', flat=True)}
+            missing = self._missing(periods, player_id, present)
+            if missing:
+                await LeaderboardEntry.objects.abulk_create(self._new_rows(missing, player_id), ignore_conflicts=True)
+                await self._rows(missing, player_id).aupdate(total_won=F('total_won') + amount)
+                unknown = {**unknown, **missing}
+        scores = {}
+        if unknown:
+            async for window, score in self._rows(unknown, player_id).values_list('window', 'total_won'):
+                scores[window] = score
+        self._apply(player_id, amount, periods, scores)
+
+    def _missing(self, periods, player_id, present):
+        """Windows of periods without a rollup row; their boards forget the player's stale score."""
+        # Рядок зник (видалений вручну): його створять знову з поточним виграшем
+        missing = {window: start for window, start in periods.items() if window not in present}
+        if missing:
+            logger.warning('Leaderboard rollup rows missing for player %s, re-creating: %s',
+                           player_id, ', '.join(missing))
+        with self._lock:
+            for window, start in missing.items():
+                board = self._board(window, start)
+                if board is not None:
+                    board.forget(player_id)
+        return missing
+
+    def _apply(self, player_id, amount, periods, scores):
+        with self._lock:
+            for window, start in periods.items():
+                board = self._board(window, start)
+                if board is None:
+                    continue
+                if window in scores:
+                    board.raise_score(player_id, scores[window])
+                elif player_id in board.scores:
+                    board.raise_score(player_id, board.scores[player_id] + amount)
+
+    def _refresh(self, window, start):
+        from .models import LeaderboardEntry
+        rows = list(
+            LeaderboardEntry.objects.filter(window=window, period_start=start)
+            .order_by('-total_won', 'player_id')
+            .values_list('player_id', 'total_won')[:self.size]
+        )
+        with self._lock:
+            board = self._board(window, start)
+            if board is None:
+                return
+            for player_id, score in rows:
+                board.raise_score(player_id, score)
+            board.refreshed = time.monotonic()
+
+    def top(self, window, limit=10, now=None):
+        """Top entries of the current period as (period_start, [(player_id, score), ...])."""
+        start = period_start(window, now or timezone.now())
+        with self._lock:
+            board = self._board(window, start)
+            if board is None:
+                return start, []
+            stale = board.refreshed is None or time.monotonic() - board.refreshed > self.refresh_interval
+        if stale:
+            self._refresh(window, start)
+        with self._lock:
+            entries = [(player_id, -score) for score, player_id in board.top[:min(limit, self.size)]]
+        return start, entries
+
+
+_leaderboard = None
+_leaderboard_lock = threading.Lock()
+
+
+def get_leaderboard():
+    """Process-wide Leaderboard."""
+    global _leaderboard
+    if _leaderboard is None:
+        with _leaderboard_lock:
+            if _leaderboard is None:
+                _leaderboard = Leaderboard()
+    return _leaderboard
@@ -0,0 +1,36 @@
+import re
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
+
+from slots.archive import ARCHIVE_BATCH_SIZE, archive_spins
+
+_UNITS = {'h': 'hours', 'd': 'days', 'w': 'weeks'}
+
+
+def parse_age(value):
+    """Parse an age such as 90d, 12h or 4w into a timedelta."""
+    match = re.fullmatch(r'(\d+)([hdw])', str(value).strip().lower())
+    if not match:
+        raise CommandError(f'Expected an age like 90d, 12h or 4w, got {value!r}')
+    return timedelta(**{_UNITS[match.group(2)]: int(match.group(1))})
+
+
+class Command(BaseCommand):
+    help = 'Move spins older than --older-than from the Spin table to the archive table'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--older-than', required=True, help='Age of the spins to archive, e.g. 90d, 12h or 4w')
+        parser.add_argument('--batch-size', type=int, default=ARCHIVE_BATCH_SIZE,
+                            help='Spins moved per transaction')
+        parser.add_argument('--pause-ms', type=int, default=0,
+                            help='Sleep between batches to leave the database to live traffic')
+
+    def handle(self, *args, **options):
+        cutoff = timezone.now() - parse_age(options['older_than'])
+        moved = archive_spins(
+            cutoff, batch_size=max(options['batch_size'], 1), pause=options['pause_ms'] / 1000,
+            progress=lambda total: self.stdout.write(f'Archived {total} spins', ending='\r'),
+        )
+        self.stdout.write(self.style.SUCCESS(f'Archived {moved} spins older than {cutoff:%Y-%m-%d %H:%M}'))
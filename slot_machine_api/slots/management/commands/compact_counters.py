@@ -0,0 +1,17 @@
+from django.core.management.base import BaseCommand
+
+from slots.jackpot import HOUSE_BALANCE, JACKPOT_POOL, ShardedCounter, jackpot_settings
+
+
+class Command(BaseCommand):
+    help = 'Fold the shards of the house balance and jackpot pool counters into one row each'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--shards', type=int, default=None,
+                            help='Shard count to keep (default: SLOTS_JACKPOT SHARDS)')
+
+    def handle(self, *args, **options):
+        shards = options['shards'] or jackpot_settings()['SHARDS']
+        for name in (JACKPOT_POOL, HOUSE_BALANCE):
+            total = ShardedCounter(name, shards).compact()
+            self.stdout.write(self.style.SUCCESS(f'{name}: {total}'))
@@ -0,0 +1,59 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from slots.encoding import pack_spin, unpack_spin
+from slots.models import Spin
+from slots.paytable import get_paytable
+
+
+class Command(BaseCommand):
+    help = 'Convert stored spins between the JSON and the compact binary format'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=1000)
+        parser.add_argument('--expand', action='store_true',
+                            help='Convert packed spins back to JSON instead')
+
+    def handle(self, *args, **options):
+        paytable = get_paytable()
+        batch_size = options['batch_size']
+        expand = options['expand']
+        if expand:
+            pending = Spin.objects.filter(packed__isnull=False)
+        else:
+            pending = Spin.objects.filter(packed__isnull=True, result__isnull=False)
+
+        converted = skipped = 0
+        last_id = None
+        while True:
+            batch = pending.order_by('id')
+            if last_id is not None:
+                batch = batch.filter(id__gt=last_id)
+            spins = list(batch.only('id', 'result', 'win_data', 'packed')[:batch_size])
+            if not spins:
+                break
+            changed = []
+            for spin in spins:
+                try:
+                    if expand:
+                        spin.result, spin.win_data = unpack_spin(spin.packed, paytable, strict=True)
+                        spin.packed = None
+                    else:
+                        spin.packed = pack_spin(spin.result, spin.win_data, paytable)
+                        spin.result = spin.win_data = None
+                except KeyError:
+                    # Символ уже видалено або перейменовано: спін лишається у поточному форматі
+                    skipped += 1
+                    continue
+                changed.append(spin)
+            if changed:
+                with transaction.atomic():
+                    Spin.objects.bulk_update(changed, ['result', 'win_data', 'packed'])
+            converted += len(changed)
+            last_id = spins[-1].id
+            self.stdout.write(f'Converted {converted} spins', ending='\r')
+        self.stdout.write(self.style.SUCCESS(f'Converted {converted} spins'))
+        if skipped:
+            self.stdout.write(self.style.WARNING(
+                f'Left {skipped} spins unchanged: they show symbols that no longer exist'
+            ))
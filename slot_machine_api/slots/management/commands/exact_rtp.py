@@ -0,0 +1,38 @@
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+from slots.paytable import get_paytable
+from slots.rtp import exact_rtp
+from slots.services import DEFAULT_NUM_REELS, DEFAULT_VISIBLE_ROWS
+
+
+class Command(BaseCommand):
+    help = 'Compute the exact RTP, hit probability and payout distribution of the current symbol set'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--reels', type=int, default=DEFAULT_NUM_REELS)
+        parser.add_argument('--rows', type=int, default=DEFAULT_VISIBLE_ROWS)
+        parser.add_argument('--distribution', action='store_true',
+                            help='Print the full payout distribution')
+
+    def handle(self, *args, **options):
+        paytable = get_paytable()
+        started = time.perf_counter()
+        try:
+            result = exact_rtp(paytable, num_reels=options['reels'], visible_rows=options['rows'])
+        except ValueError as exc:
+            raise CommandError(str(exc))
+        elapsed = time.perf_counter() - started
+
+        self.stdout.write(f'Computed in {elapsed:.2f}s')
+        self.stdout.write(f'RTP:              {float(result.rtp):.10f}  ({result.rtp})')
+        self.stdout.write(f'Hit probability:  {float(result.hit_probability):.10f}  ({result.hit_probability})')
+        self.stdout.write(f'Variance:         {float(result.variance):.10f}')
+        self.stdout.write('Per-symbol contribution:')
+        for name, rtp in result.symbol_contributions().items():
+            self.stdout.write(f'  {name:<20} {float(rtp):.10f}')
+        if options['distribution']:
+            self.stdout.write('Payout distribution (bet multiple: probability):')
+            for payout, probability in result.distribution.items():
+                self.stdout.write(f'  {float(payout):g}: {float(probability):.12g}')
@@ -0,0 +1,44 @@
+import gzip
+
+from django.core.management.base import BaseCommand, CommandError
+from rest_framework.exceptions import ValidationError
+
+from slots.export import EXPORT_CHUNK_SIZE, EXPORT_FORMATS, export_rows
+from slots.filters import filter_spins
+from slots.models import ArchivedSpin, Spin
+
+
+class Command(BaseCommand):
+    help = 'Export spin history to a gzip-compressed CSV or NDJSON file'
+
+    def add_arguments(self, parser):
+        parser.add_argument('output', help='Output file, e.g. spins.csv.gz')
+        parser.add_argument('--format', choices=list(EXPORT_FORMATS), default='csv')
+        parser.add_argument('--player', help='Only spins of this username')
+        parser.add_argument('--since', help='Only spins at or after this ISO 8601 timestamp')
+        parser.add_argument('--until', help='Only spins before this ISO 8601 timestamp')
+        parser.add_argument('--chunk-size', type=int, default=EXPORT_CHUNK_SIZE)
+        parser.add_argument('--include-archived', action='store_true',
+                            help='Also export spins moved to the archive')
+
+    def handle(self, *args, **options):
+        sources = [Spin.objects.all()]
+        if options['include_archived']:
+            sources.append(ArchivedSpin.objects.all())
+        if options['player']:
+            sources = [spins.filter(game__player__user__username=options['player']) for spins in sources]
+        params = {name: options[name] for name in ('since', 'until') if options[name]}
+        try:
+            spins = [filter_spins(queryset, params) for queryset in sources]
+        except ValidationError as exc:
+            raise CommandError(exc.detail)
+
+        lines, _ = EXPORT_FORMATS[options['format']]
+        exported = 0
+        with gzip.open(options['output'], 'wt', encoding='utf-8', newline='') as output:
+            for line in lines(export_rows(spins, options['chunk_size'])):
+                output.write(line)
+                exported += 1
+        if options['format'] == 'csv':
+            exported -= 1  # рядок заголовка
+        self.stdout.write(self.style.SUCCESS(f'Exported {exported} spins to {options["output"]}'))
@@ -0,0 +1,41 @@
+from django.core.exceptions import ValidationError
+from django.core.management.base import BaseCommand, CommandError
+
+from slots.archive import find_spin
+from slots.encoding import unpack_spin
+from slots.paytable import get_paytable
+from slots.rng import replay_spin
+from slots.services import ReelService
+
+
+class Command(BaseCommand):
+    help = ('Regenerate a recorded or archived spin from its RNG seed and stream position '
+            'and compare it with the stored result')
+
+    def add_arguments(self, parser):
+        parser.add_argument('spin_id')
+
+    def handle(self, *args, **options):
+        try:
+            spin = find_spin(options['spin_id'])
+        except (ValidationError, ValueError):
+            spin = None
+        if spin is None:
+            raise CommandError(f"Spin {options['spin_id']} does not exist")
+        if spin.rng_seed is None or spin.rng_position is None:
+            raise CommandError('Spin was recorded without an RNG seed and position')
+
+        stored = unpack_spin(spin.packed)[0] if spin.packed is not None else spin.result
+        stored_reels = list(stored.values())
+        reel_service = ReelService(get_paytable())
+        replayed = replay_spin(reel_service, spin.rng_seed, spin.rng_position,
+                               num_reels=len(stored_reels), visible_rows=len(stored_reels[0]))
+        replayed_reels = list(reel_service.decode_spin(replayed).values())
+
+        self.stdout.write(f'Seed {spin.rng_seed}, position {spin.rng_position}')
+        for reel, (recorded, regenerated) in enumerate(zip(stored_reels, replayed_reels)):
+            self.stdout.write(f'  reel {reel}: stored {recorded}  replayed {regenerated}')
+        if replayed_reels != stored_reels:
+            raise CommandError('Replayed spin does not match the stored result '
+                               '(was the symbol set changed since the spin was played?)')
+        self.stdout.write(self.style.SUCCESS('Replayed spin matches the stored result'))
@@ -0,0 +1,60 @@
+import os
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+from slots.paytable import get_paytable
+from slots.rtp import payout_decimal, simulate_rtp
+from slots.services import DEFAULT_NUM_REELS, DEFAULT_VISIBLE_ROWS
+
+
+class Command(BaseCommand):
+    help = 'Estimate RTP, hit rate and volatility of the current symbol set by Monte Carlo simulation'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--spins', type=int, default=1_000_000)
+        parser.add_argument('--workers', type=int, default=os.cpu_count() or 1)
+        parser.add_argument('--seed', type=int, default=None,
+                            help='Seed for reproducible runs; random if omitted')
+        parser.add_argument('--reels', type=int, default=DEFAULT_NUM_REELS)
+        parser.add_argument('--rows', type=int, default=DEFAULT_VISIBLE_ROWS)
+        parser.add_argument('--confidence', type=float, default=0.95)
+        parser.add_argument('--histogram', action='store_true',
+                            help='Print the full per-spin payout histogram')
+
+    def handle(self, *args, **options):
+        if options['spins'] <= 0:
+            raise CommandError('--spins must be positive')
+        paytable = get_paytable()
+        if not paytable.weighted and len(paytable) < options['rows']:
+            raise CommandError(f"At least {options['rows']} symbols are required, got {len(paytable)}")
+        seed = options['seed']
+        if seed is None:
+            seed = int.from_bytes(os.urandom(8), 'big')
+
+        started = time.perf_counter()
+        try:
+            result = simulate_rtp(
+                paytable, options['spins'], seed,
+                workers=max(options['workers'], 1),
+                num_reels=options['reels'],
+                visible_rows=options['rows'],
+            )
+        except ValueError as exc:
+            raise CommandError(str(exc))
+        elapsed = time.perf_counter() - started
+
+        confidence = options['confidence']
+        rtp_low, rtp_high = result.rtp_interval(confidence)
+        hit_low, hit_high = result.hit_rate_interval(confidence)
+        self.stdout.write(f'Spins:     {result.spins} in {elapsed:.1f}s (seed {seed})')
+        self.stdout.write(f'RTP:       {result.rtp:.6f}  [{rtp_low:.6f}, {rtp_high:.6f}] @ {confidence:.0%}')
+        self.stdout.write(f'Hit rate:  {result.hit_rate:.6f}  [{hit_low:.6f}, {hit_high:.6f}] @ {confidence:.0%}')
+        self.stdout.write(f'Variance:  {result.variance:.6f}  (std dev {result.variance ** 0.5:.6f})')
+        self.stdout.write('Per-symbol contribution:')
+        for name, (rtp, wins) in result.symbol_contributions().items():
+            self.stdout.write(f'  {name:<20} {rtp:.6f}  ({wins} winning rows)')
+        if options['histogram']:
+            self.stdout.write('Payout histogram (bet multiple: spins):')
+            for units, count in sorted(result.histogram.items()):
+                self.stdout.write(f'  {payout_decimal(units)}: {count}')
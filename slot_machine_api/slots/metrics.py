@@ -0,0 +1,327 @@
+"""In-process request and hot-path metrics, exposed in Prometheus text format.
+
+Everything here is off unless SLOTS_METRICS['ENABLED'] is set: the middleware
+removes itself from the chain and stage() hands back a shared no-op context
+manager, so the disabled cost is one function call per stage.
+"""
+import bisect
+import cProfile
+import contextvars
+import logging
+import os
+import random
+import re
+import tempfile
+import threading
+import time
+from contextlib import nullcontext
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+from django.core.signals import setting_changed
+from django.db import connections
+from django.db.backends.signals import connection_created
+from django.dispatch import receiver
+from django.http import Http404, HttpResponse
+
+logger = logging.getLogger(__name__)
+
+# --- Налаштування метрик ---
+DEFAULT_METRICS = {
+    'ENABLED': False,
+    'TOKEN': None,  # if set, /api/metrics/ requires "Authorization: Bearer <TOKEN>"
+    'SERVER_TIMING': True,  # add a Server-Timing header with the stage durations
+    'PROFILE_SLOW_MS': None,  # dump cProfile stats for sampled requests slower than this
+    'PROFILE_SAMPLE_RATE': 0.01,  # fraction of requests run under the profiler
+    'PROFILE_DIR': os.path.join(tempfile.gettempdir(), 'slots-profiles'),
+}
+LATENCY_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0)
+QUERY_COUNT_BUCKETS = (1, 2, 3, 5, 8, 13, 21, 34, 55, 89)
+CONTENT_TYPE = 'text/plain; version=0.0.4; charset=utf-8'
+
+_config = None
+
+
+def metrics_settings():
+    global _config
+    if _config is None:
+        _config = {**DEFAULT_METRICS, **getattr(settings, 'SLOTS_METRICS', {})}
+    return _config
+
+
+@receiver(setting_changed)
+def _reset_config(setting, **kwargs):
+    global _config
+    if setting == 'SLOTS_METRICS':
+        _config = None
+
+
+def _escape(value):
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def _label_pairs(labelnames, labels, extra=()):
+    pairs = [*zip(labelnames, labels), *extra]
+    if not pairs:
+        return ''
+    return '{' + ','.join(f'{name}="{_escape(value)}"' for name, value in pairs) + '}'
+
+
+class Histogram:
+    """Cumulative histogram keyed by a tuple of label values."""
+
+    def __init__(self, name, documentation, labelnames=(), buckets=LATENCY_BUCKETS):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self.buckets = tuple(buckets)
+        self._lock = threading.Lock()
+        self._series = {}
+        REGISTRY.append(self)
+
+    def observe(self, value, labels=()):
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            series = self._series.get(labels)
+            if series is None:
+                series = self._series[labels] = [[0] * (len(self.buckets) + 1), 0.0]
+            series[0][index] += 1
+            series[1] += value
+
+    def render(self):
+        lines = [f'# HELP {self.name} {self.documentation}', f'# TYPE {self.name} histogram']
+        with self._lock:
+            series = sorted((labels, list(counts), total) for labels, (counts, total) in self._series.items())
+        for labels, counts, total in series:
+            cumulative = 0
+            for bound, count in zip((*self.buckets, '+Inf'), counts):
+                cumulative += count
+                le = bound if bound == '+Inf' else repr(float(bound))
+                lines.append(f'{self.name}_bucket{_label_pairs(self.labelnames, labels, [("le", le)])} {cumulative}')
+            lines.append(f'{self.name}_sum{_label_pairs(self.labelnames, labels)} {total}')
+            lines.append(f'{self.name}_count{_label_pairs(self.labelnames, labels)} {cumulative}')
+        return lines
+
+
+class Counter:
+    def __init__(self, name, documentation, labelnames=()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._lock = threading.Lock()
+        self._values = {}
+        REGISTRY.append(self)
+
+    def inc(self, amount=1, labels=()):
+        with self._lock:
+            self._values[labels] = self._values.get(labels, 0) + amount
+
+    def render(self):
+        lines = [f'# HELP {self.name} {self.documentation}', f'# TYPE {self.name} counter']
+        with self._lock:
+            values = sorted(self._values.items())
+        lines += [f'{self.name}{_label_pairs(self.labelnames, labels)} {value}' for labels, value in values]
+        return lines
+
+
+REGISTRY = []
+REQUEST_SECONDS = Histogram(
+    'slots_request_duration_seconds', 'Request latency.', ('view', 'method', 'status'))
+REQUEST_QUERIES = Histogram(
+    'slots_request_db_queries', 'Database queries per request.', ('view',), QUERY_COUNT_BUCKETS)
+STAGE_SECONDS = Histogram(
+    'slots_stage_duration_seconds', 'Time spent in each hot-path stage.', ('stage',))
+PROFILED_REQUESTS = Counter(
+    'slots_profiled_requests_total', 'Slow requests whose cProfile stats were dumped.', ('view',))
+THROTTLED_REQUESTS = Counter(
+    'slots_throttled_requests_total', 'Spin requests refused by admission control.', ('scope',))
+
+
+class RequestStats:
+    __slots__ = ('queries', 'stages')
+
+    def __init__(self):
+        self.queries = 0
+        self.stages = {}
+
+
+# Статистика поточного запиту; contextvar переходить і в потоки sync_to_async
+_current = contextvars.ContextVar('slots_request_stats', default=None)
+
+
+class _Stage:
+    __slots__ = ('name', 'started')
+
+    def __init__(self, name):
+        self.name = name
+
+    def __enter__(self):
+        self.started = time.perf_counter()
+
+    def __exit__(self, *exc_info):
+        elapsed = time.perf_counter() - self.started
+        STAGE_SECONDS.observe(elapsed, (self.name,))
+        stats = _current.get()
+        if stats is not None:
+            stats.stages[self.name] = stats.stages.get(self.name, 0.0) + elapsed
+
+
+_NO_STAGE = nullcontext()
+
+
+def stage(name):
+    """Context manager timing one hot-path stage; a no-op when metrics are disabled."""
+    if not metrics_settings()['ENABLED']:
+        return _NO_STAGE
+    return _Stage(name)
+
+
+def _count_query(execute, sql, params, many, context):
+    stats = _current.get()
+    if stats is not None:
+        stats.queries += 1
+    return execute(sql, params, many, context)
+
+
+def _install_query_counter(connection):
+    if _count_query not in connection.execute_wrappers:
+        connection.execute_wrappers.append(_count_query)
+
+
+@receiver(connection_created)
+def _connection_created(sender, connection, **kwargs):
+    if metrics_settings()['ENABLED']:
+        _install_query_counter(connection)
+
+
+def _view_name(request):
+    match = getattr(request, 'resolver_match', None)
+    return match.view_name if match else 'unmatched'
+
+
+class MetricsMiddleware:
+    """Records request latency, query counts and stage timings for every request.
+
+    Query counting hooks every database connection (connection_created plus
+    the connections already open in this thread), so ORM calls made through
+    sync_to_async by the async views are counted too.
+    """
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        config = metrics_settings()
+        if not config['ENABLED']:
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+        self.server_timing = config['SERVER_TIMING']
+        self.profile_slow = config['PROFILE_SLOW_MS']
+        self.profile_rate = config['PROFILE_SAMPLE_RATE']
+        self.profile_dir = config['PROFILE_DIR']
+        self.async_mode = iscoroutinefunction(get_response)
+        if self.async_mode:
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if self.async_mode:
+            return self.__acall__(request)
+        for connection in connections.all(initialized_only=True):
+            _install_query_counter(connection)
+        stats = RequestStats()
+        token = _current.set(stats)
+        profiler = None
+        if self.profile_slow is not None and random.random() < self.profile_rate:
+            profiler = cProfile.Profile()
+        started = time.perf_counter()
+        try:
+            if profiler:
+                profiler.enable()
+            try:
+                response = self.get_response(request)
+            finally:
+                if profiler:
+                    profiler.disable()
+        finally:
+            _current.reset(token)
+        elapsed = time.perf_counter() - started
+        self._record(request, response, stats, elapsed)
+        if profiler and elapsed * 1000 >= self.profile_slow:
+            self._dump_profile(request, profiler, elapsed)
+        return response
+
+    async def __acall__(self, request):
+        stats = RequestStats()
+        token = _current.set(stats)
+        started = time.perf_counter()
+        try:
+            response = await self.get_response(request)
+        finally:
+            _current.reset(token)
+        self._record(request, response, stats, time.perf_counter() - started)
+        return response
+
+    def _record(self, request, response, stats, elapsed):
+        view = _view_name(request)
+        REQUEST_SECONDS.observe(elapsed, (view, request.method, str(response.status_code)))
+        REQUEST_QUERIES.observe(stats.queries, (view,))
+        if self.server_timing:
+            timings = [f'{name};dur={seconds * 1000:.3f}' for name, seconds in stats.stages.items()]
+            timings.append(f'db;desc="{stats.queries} queries"')
+            timings.append(f'total;dur={elapsed * 1000:.3f}')
+            response['Server-Timing'] = ', '.join(timings)
+
+    def _dump_profile(self, request, profiler, elapsed):
+        view = _view_name(request)
+        os.makedirs(self.profile_dir, exist_ok=True)
+        filename = f'{time.time_ns()}-{re.sub(r"[^A-Za-z0-9_.-]", "_", view)}-{elapsed * 1000:.0f}ms.prof'
+        path = os.path.join(self.profile_dir, filename)
+        profiler.dump_stats(path)
+        PROFILED_REQUESTS.inc(labels=(view,))
+        logger.info('Slow request %s %s took %.1fms, profile written to %s',
+                    request.method, request.path, elapsed * 1000, path)
+
+
+def _spinlog_lines():
+    from . import spinlog
+    writer = spinlog._writer
+    if writer is None:
+        return []
+    lines = []
+    for name, value in writer.metrics().items():
+        kind = 'gauge' if name in ('queue_depth', 'queue_capacity', 'flush_seconds_max') else 'counter'
+        metric = f'slots_spinlog_{name}' + ('_total' if kind == 'counter' and not name.endswith('_total') else '')
+        lines += [f'# TYPE {metric} {kind}', f'{metric} {value}']
+    return lines
+
+
+def _admission_lines():
+    from .throttling import admission_metrics
+    gauges = admission_metrics()
+    lines = [
+        '# TYPE slots_spin_requests_in_flight gauge', f'slots_spin_requests_in_flight {gauges["in_flight"]}',
+        '# TYPE slots_spin_concurrency_limit gauge', f'slots_spin_concurrency_limit {gauges["concurrency_limit"]}',
+        '# TYPE slots_throttle_buckets gauge',
+    ]
+    lines += [f'slots_throttle_buckets{_label_pairs(("scope",), (scope,))} {count}'
+              for scope, count in sorted(gauges['buckets'].items())]
+    return lines
+
+
+def render_metrics():
+    lines = []
+    for metric in REGISTRY:
+        lines += metric.render()
+    lines += _spinlog_lines()
+    lines += _admission_lines()
+    return '\n'.join(lines) + '\n'
+
+
+def metrics_view(request):
+    """GET /api/metrics/ in Prometheus text exposition format."""
+    config = metrics_settings()
+    if not config['ENABLED']:
+        raise Http404
+    if config['TOKEN'] and request.headers.get('Authorization') != f'Bearer {config["TOKEN"]}':
+        return HttpResponse('Forbidden\n', status=403, content_type='text/plain')
+    return HttpResponse(render_metrics(), content_type=CONTENT_TYPE)
@@ -0,0 +1,17 @@
+# Generated by Django 5.2.18 on 2026-10-18 20:20
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('slots', '0003_alter_symbol_payout_multiplier'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='spin',
+            index=models.Index(fields=['game', 'timestamp', 'id'], name='slots_spin_game_ts_idx'),
+        ),
+    ]
@@ -0,0 +1,23 @@
+# Generated by Django 5.2.18 on 2026-10-18 20:22
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('slots', '0004_spin_slots_spin_game_ts_idx'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='spin',
+            name='packed',
+            field=models.BinaryField(blank=True, null=True),
+        ),
+        migrations.AlterField(
+            model_name='spin',
+            name='result',
+            field=models.JSONField(blank=True, null=True),
+        ),
+    ]
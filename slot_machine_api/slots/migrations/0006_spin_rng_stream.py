@@ -0,0 +1,23 @@
+# Generated by Django 5.2.18 on 2026-10-18 20:27
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('slots', '0005_spin_packed'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='spin',
+            name='rng_position',
+            field=models.PositiveBigIntegerField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='spin',
+            name='rng_seed',
+            field=models.PositiveBigIntegerField(blank=True, null=True),
+        ),
+    ]
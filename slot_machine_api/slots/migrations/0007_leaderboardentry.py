@@ -0,0 +1,29 @@
+# Generated by Django 5.2.18 on 2026-10-18 20:35
+
+import django.db.models.deletion
+from decimal import Decimal
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('slots', '0006_spin_rng_stream'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='LeaderboardEntry',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('window', models.CharField(choices=[('all', 'All time'), ('daily', 'Daily'), ('hourly', 'Hourly')], max_length=10)),
+                ('period_start', models.DateTimeField()),
+                ('total_won', models.DecimalField(decimal_places=2, default=Decimal('0.00'), max_digits=12)),
+                ('player', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='leaderboard_entries', to='slots.player')),
+            ],
+            options={
+                'indexes': [models.Index(fields=['window', 'period_start', '-total_won'], name='slots_leaderboard_top_idx')],
+                'constraints': [models.UniqueConstraint(fields=('window', 'period_start', 'player'), name='slots_leaderboard_unique')],
+            },
+        ),
+    ]
@@ -0,0 +1,26 @@
+# Generated by Django 5.2.18 on 2026-10-18 20:39
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('slots', '0007_leaderboardentry'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ReelWeight',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('reel', models.PositiveSmallIntegerField()),
+                ('weight', models.PositiveIntegerField(default=1)),
+                ('symbol', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='reel_weights', to='slots.symbol')),
+            ],
+            options={
+                'constraints': [models.UniqueConstraint(fields=('reel', 'symbol'), name='slots_reelweight_unique')],
+            },
+        ),
+    ]
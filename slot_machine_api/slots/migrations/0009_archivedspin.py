@@ -0,0 +1,33 @@
+# Generated by Django 5.2.18 on 2026-10-18 20:57
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('slots', '0008_reelweight'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ArchivedSpin',
+            fields=[
+                ('id', models.UUIDField(editable=False, primary_key=True, serialize=False)),
+                ('bet_amount', models.DecimalField(decimal_places=2, max_digits=10)),
+                ('payout', models.DecimalField(decimal_places=2, max_digits=10)),
+                ('result', models.JSONField(blank=True, null=True)),
+                ('win_data', models.JSONField(blank=True, null=True)),
+                ('packed', models.BinaryField(blank=True, null=True)),
+                ('rng_seed', models.PositiveBigIntegerField(blank=True, null=True)),
+                ('rng_position', models.PositiveBigIntegerField(blank=True, null=True)),
+                ('timestamp', models.DateTimeField()),
+                ('archived_at', models.DateTimeField(auto_now_add=True)),
+                ('game', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='archived_spins', to='slots.game')),
+            ],
+            options={
+                'indexes': [models.Index(fields=['game', 'timestamp', 'id'], name='slots_archivedspin_game_ts_idx')],
+            },
+        ),
+    ]
@@ -0,0 +1,54 @@
+# Generated by Django 5.2.18 on 2026-10-18 21:03
+
+import django.db.models.deletion
+from django.db import migrations, models
+from django.db.models import OuterRef, Subquery
+
+
+def activate_latest_games(apps, schema_editor):
+    # До сесій спіни йшли в єдину гру гравця (get_or_create); найновіша стає активною
+    Game = apps.get_model('slots', 'Game')
+    Player = apps.get_model('slots', 'Player')
+    latest = Game.objects.filter(player=OuterRef('pk')).order_by('-created_at').values('pk')[:1]
+    Player.objects.update(active_game=Subquery(latest))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('slots', '0010_countershard'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='game',
+            name='ended_at',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='game',
+            name='last_spin_at',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='game',
+            name='spin_count',
+            field=models.PositiveIntegerField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='game',
+            name='total_wagered',
+            field=models.DecimalField(blank=True, decimal_places=2, max_digits=12, null=True),
+        ),
+        migrations.AddField(
+            model_name='game',
+            name='total_won',
+            field=models.DecimalField(blank=True, decimal_places=2, max_digits=12, null=True),
+        ),
+        migrations.AddField(
+            model_name='player',
+            name='active_game',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='+', to='slots.game'),
+        ),
+        migrations.RunPython(activate_latest_games, migrations.RunPython.noop),
+    ]
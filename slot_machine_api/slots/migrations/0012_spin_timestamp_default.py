@@ -0,0 +1,19 @@
+# Generated by Django 5.2.18 on 2026-10-18 21:20
+
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('slots', '0011_game_sessions'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='spin',
+            name='timestamp',
+            field=models.DateTimeField(default=django.utils.timezone.now, editable=False),
+        ),
+    ]
@@ -0,0 +1,26 @@
+# Generated by Django 5.2.18 on 2026-10-18 21:22
+
+import django.db.models.deletion
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('slots', '0012_spin_timestamp_default'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='JackpotAward',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('spin_id', models.UUIDField(unique=True)),
+                ('amount', models.DecimalField(decimal_places=2, max_digits=14)),
+                ('awarded_at', models.DateTimeField(default=django.utils.timezone.now)),
+                ('game', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='jackpot_awards', to='slots.game')),
+                ('player', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='jackpot_awards', to='slots.player')),
+            ],
+        ),
+    ]
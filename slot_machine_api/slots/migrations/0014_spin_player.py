@@ -0,0 +1,41 @@
+# Generated by Django 5.2.18 on 2026-10-18 23:40
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+def copy_game_player(apps, schema_editor):
+    Game = apps.get_model('slots', 'Game')
+    Spin = apps.get_model('slots', 'Spin')
+    Spin.objects.filter(player__isnull=True).update(
+        player=models.Subquery(Game.objects.filter(pk=models.OuterRef('game_id')).values('player_id')[:1])
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('slots', '0013_jackpotaward'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='spin',
+            name='player',
+            field=models.ForeignKey(db_index=False, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='spins', to='slots.player'),
+        ),
+        migrations.RunPython(copy_game_player, migrations.RunPython.noop),
+        migrations.AlterField(
+            model_name='spin',
+            name='player',
+            field=models.ForeignKey(db_index=False, on_delete=django.db.models.deletion.CASCADE, related_name='spins', to='slots.player'),
+        ),
+        migrations.AddIndex(
+            model_name='spin',
+            index=models.Index(fields=['player', 'timestamp', 'id'], name='slots_spin_player_ts_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='spin',
+            index=models.Index(condition=models.Q(('payout__gt', 0)), fields=['player', 'timestamp', 'id'], name='slots_spin_player_win_idx'),
+        ),
+    ]
@@ -0,0 +1,17 @@
+# Generated by Django 5.2.18 on 2026-10-19 00:20
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('slots', '0014_spin_player'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='spin',
+            index=models.Index(fields=['timestamp', 'id'], name='slots_spin_ts_idx'),
+        ),
+    ]
@@ -0,0 +1,52 @@
+# Generated by Django 5.2.18 on 2026-10-19 01:10
+
+from decimal import Decimal
+
+from django.db import migrations, models
+
+
+def count_active_games(apps, schema_editor):
+    # Завершені ігри вже мають підсумки; активним рахуємо їх зі спінів і виграних джекпотів
+    Game = apps.get_model('slots', 'Game')
+    zero = Decimal('0.00')
+    for game in Game.objects.filter(ended_at__isnull=True):
+        game.spin_count, game.total_wagered, game.total_won, game.last_spin_at = 0, zero, zero, None
+        for model in (apps.get_model('slots', 'Spin'), apps.get_model('slots', 'ArchivedSpin')):
+            totals = model.objects.filter(game_id=game.pk).aggregate(
+                spins=models.Count('id'), wagered=models.Sum('bet_amount'), won=models.Sum('payout'),
+                last=models.Max('timestamp'),
+            )
+            game.spin_count += totals['spins']
+            game.total_wagered += totals['wagered'] or zero
+            game.total_won += totals['won'] or zero
+            if totals['last'] and (game.last_spin_at is None or totals['last'] > game.last_spin_at):
+                game.last_spin_at = totals['last']
+        jackpots = apps.get_model('slots', 'JackpotAward').objects.filter(game_id=game.pk)
+        game.total_won += jackpots.aggregate(total=models.Sum('amount'))['total'] or zero
+        game.save(update_fields=['spin_count', 'total_wagered', 'total_won', 'last_spin_at'])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('slots', '0015_spin_slots_spin_ts_idx'),
+    ]
+
+    operations = [
+        migrations.RunPython(count_active_games, migrations.RunPython.noop),
+        migrations.AlterField(
+            model_name='game',
+            name='spin_count',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AlterField(
+            model_name='game',
+            name='total_wagered',
+            field=models.DecimalField(decimal_places=2, default=Decimal('0.00'), max_digits=12),
+        ),
+        migrations.AlterField(
+            model_name='game',
+            name='total_won',
+            field=models.DecimalField(decimal_places=2, default=Decimal('0.00'), max_digits=12),
+        ),
+    ]
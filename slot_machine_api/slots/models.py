@@ -1,5 +1,6 @@
 from django.db import models
 from django.contrib.auth.models import User
+from django.utils import timezone
 import uuid
 from decimal import Decimal
 
@@ -13,12 +14,33 @@ class Symbol(models.Model):
         return self.name
 
 
+class ReelWeight(models.Model):
+    """Weight of a symbol on one reel strip (reels are numbered from 0).
+
+    Weights take effect once every reel has at least one row: then every cell
+    is drawn independently by weight and symbols without a row on a reel never
+    appear on it. Until then the weights are ignored and reels stay shuffles.
+    """
+    reel = models.PositiveSmallIntegerField()
+    symbol = models.ForeignKey(Symbol, on_delete=models.CASCADE, related_name='reel_weights')
+    weight = models.PositiveIntegerField(default=1)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['reel', 'symbol'], name='slots_reelweight_unique'),
+        ]
+
+    def __str__(self):
+        return f"Reel {self.reel}: {self.symbol.name} x{self.weight}"
+
 
 class Player(models.Model):
     user = models.OneToOneField(User, on_delete=models.CASCADE, related_name='player')
     balance = models.DecimalField(max_digits=10, decimal_places=2, default=Decimal('1000.00'))
     total_won = models.DecimalField(max_digits=10, decimal_places=2, default=Decimal('0.00'))
     total_wager = models.DecimalField(max_digits=10, decimal_places=2, default=Decimal('0.00'))
+    # Гра, в яку записуються спіни; оновлюється під час старту і завершення сесії
+    active_game = models.ForeignKey('Game', null=True, blank=True, on_delete=models.SET_NULL, related_name='+')
 
     def __str__(self):
         return f"Player: {self.user.username}"
@@ -30,6 +52,12 @@ class Game(models.Model):
     machine_balance = models.DecimalField(max_digits=10, decimal_places=2, default=Decimal('10000.00'))
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
+    ended_at = models.DateTimeField(null=True, blank=True)
+    # Running totals, updated in the transaction that settles each spin's bet
+    spin_count = models.PositiveIntegerField(default=0)
+    total_wagered = models.DecimalField(max_digits=12, decimal_places=2, default=Decimal('0.00'))
+    total_won = models.DecimalField(max_digits=12, decimal_places=2, default=Decimal('0.00'))
+    last_spin_at = models.DateTimeField(null=True, blank=True)
 
     def __str__(self):
         return f"Game {self.id}"
@@ -38,11 +66,117 @@ class Game(models.Model):
 class Spin(models.Model):
     id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
     game = models.ForeignKey(Game, on_delete=models.CASCADE, related_name='spins')
+    # Копія game.player: історія гравця читається індексом без з'єднання з Game
+    player = models.ForeignKey(Player, on_delete=models.CASCADE, related_name='spins', db_index=False)
     bet_amount = models.DecimalField(max_digits=10, decimal_places=2)
     payout = models.DecimalField(max_digits=10, decimal_places=2, default=Decimal('0.00'))
-    result = models.JSONField()  # Store the spin result as JSON
+    result = models.JSONField(null=True, blank=True)  # Store the spin result as JSON
     win_data = models.JSONField(null=True, blank=True)  # Win information
-    timestamp = models.DateTimeField(auto_now_add=True)
+    packed = models.BinaryField(null=True, blank=True)  # Compact result + wins, replaces the JSON fields
+    rng_seed = models.PositiveBigIntegerField(null=True, blank=True)  # RNG stream seed, never exposed by the API
+    rng_position = models.PositiveBigIntegerField(null=True, blank=True)  # Spin index within the stream
+    # Час гри, а не вставки: спін із черги відкладеного запису пишеться пізніше
+    timestamp = models.DateTimeField(default=timezone.now, editable=False)
+
+    class Meta:
+        indexes = [
+            # Keyset pagination of a game's spins: WHERE game = ? ORDER BY timestamp, id
+            models.Index(fields=['game', 'timestamp', 'id'], name='slots_spin_game_ts_idx'),
+            # The same over all of a player's games, and only the winning spins for winning_only
+            models.Index(fields=['player', 'timestamp', 'id'], name='slots_spin_player_ts_idx'),
+            models.Index(fields=['player', 'timestamp', 'id'], condition=models.Q(payout__gt=0),
+                         name='slots_spin_player_win_idx'),
+            # Archiving walks the oldest spins of every game: WHERE timestamp < ? ORDER BY timestamp, id
+            models.Index(fields=['timestamp', 'id'], name='slots_spin_ts_idx'),
+        ]
+
+    def __str__(self):
+        return f"Spin {self.id} for Game {self.game.id}"
+
+
+class ArchivedSpin(models.Model):
+    """Spin moved out of the hot Spin table by the archive_spins command.
+
+    Keeps the spin's id, timestamp and RNG position; the grid is stored
+    packed unless one of its symbols no longer exists.
+    """
+    id = models.UUIDField(primary_key=True, editable=False)
+    game = models.ForeignKey(Game, on_delete=models.CASCADE, related_name='archived_spins')
+    bet_amount = models.DecimalField(max_digits=10, decimal_places=2)
+    payout = models.DecimalField(max_digits=10, decimal_places=2)
+    result = models.JSONField(null=True, blank=True)
+    win_data = models.JSONField(null=True, blank=True)
+    packed = models.BinaryField(null=True, blank=True)
+    rng_seed = models.PositiveBigIntegerField(null=True, blank=True)
+    rng_position = models.PositiveBigIntegerField(null=True, blank=True)
+    timestamp = models.DateTimeField()
+    archived_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['game', 'timestamp', 'id'], name='slots_archivedspin_game_ts_idx'),
+        ]
+
+    def __str__(self):
+        return f"Archived spin {self.id} for Game {self.game_id}"
+
+class JackpotAward(models.Model):
+    """Progressive jackpot credited to a player: the audit record of that payment.
+
+    Written by slots.jackpot in the transaction of the spin that won it.
+    """
+    # Без FK: виграшний спін може ще чекати в черзі відкладеного запису
+    spin_id = models.UUIDField(unique=True)
+    game = models.ForeignKey(Game, on_delete=models.CASCADE, related_name='jackpot_awards')
+    player = models.ForeignKey(Player, on_delete=models.CASCADE, related_name='jackpot_awards')
+    amount = models.DecimalField(max_digits=14, decimal_places=2)
+    awarded_at = models.DateTimeField(default=timezone.now)
+
+    def __str__(self):
+        return f"Jackpot {self.amount} to {self.player_id} on spin {self.spin_id}"
+
+
+class LeaderboardEntry(models.Model):
+    """Rollup of a player's winnings in one leaderboard window period.
+
+    Maintained incrementally by slots.leaderboard; the in-memory top-K boards
+    are rebuilt from these rows, so the Spin table is never scanned.
+    """
+    WINDOW_CHOICES = [('all', 'All time'), ('daily', 'Daily'), ('hourly', 'Hourly')]
+
+    window = models.CharField(max_length=10, choices=WINDOW_CHOICES)
+    period_start = models.DateTimeField()
+    player = models.ForeignKey(Player, on_delete=models.CASCADE, related_name='leaderboard_entries')
+    total_won = models.DecimalField(max_digits=12, decimal_places=2, default=Decimal('0.00'))
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['window', 'period_start', 'player'], name='slots_leaderboard_unique'),
+        ]
+        indexes = [
+            # Top-K of one period: WHERE window = ? AND period_start = ? ORDER BY total_won DESC
+            models.Index(fields=['window', 'period_start', '-total_won'], name='slots_leaderboard_top_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.window} {self.period_start:%Y-%m-%d %H:%M} {self.player_id}: {self.total_won}"
+
+
+class CounterShard(models.Model):
+    """One shard of a sharded counter (house balance, jackpot pool).
+
+    Writers add to a single shard picked by hashing the spin, so concurrent
+    spins rarely touch the same row; the counter's value is the sum of its
+    shards. Maintained by slots.jackpot.
+    """
+    name = models.CharField(max_length=50)
+    shard = models.PositiveSmallIntegerField()
+    value = models.DecimalField(max_digits=14, decimal_places=2, default=Decimal('0.00'))
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['name', 'shard'], name='slots_countershard_unique'),
+        ]
 
     def __str__(self):
-        return f"Spin {self.id} for Game {self.game.id}"
\ No newline at end of file
+        return f"{self.name}[{self.shard}]: {self.value}"
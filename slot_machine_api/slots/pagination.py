@@ -0,0 +1,86 @@
+import base64
+import uuid
+from urllib.parse import urlencode
+
+from django.db.models import Q
+from django.utils.dateparse import parse_datetime
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import BasePagination
+from rest_framework.response import Response
+
+
+class SpinCursorPagination(BasePagination):
+    """Keyset pagination over (timestamp, id), newest first.
+
+    Each page seeks directly to the last (timestamp, id) seen, so page N costs
+    the same index range scan as page 1.
+    """
+    page_size = 50
+    max_page_size = 500
+    cursor_query_param = 'cursor'
+    page_size_query_param = 'page_size'
+    invalid_cursor_message = 'Invalid cursor'
+
+    def paginate_queryset(self, queryset, request, view=None):
+        """Page of queryset, or of a list of querysets merged (hot and archived spins)."""
+        self.request = request
+        self.page_size = self.get_page_size(request)
+        cursor = request.query_params.get(self.cursor_query_param)
+        querysets = queryset if isinstance(queryset, (list, tuple)) else [queryset]
+        if cursor:
+            timestamp, pk = self.decode_cursor(cursor)
+            seek = Q(timestamp__lt=timestamp) | Q(timestamp=timestamp, id__lt=pk)
+            querysets = [queryset.filter(seek) for queryset in querysets]
+        page = []
+        for queryset in querysets:
+            page += queryset.order_by('-timestamp', '-id')[:self.page_size + 1]
+        if len(querysets) > 1:
+            page.sort(key=lambda spin: (spin.timestamp, spin.id), reverse=True)
+        self.has_next = len(page) > self.page_size
+        page = page[:self.page_size]
+        self.last = page[-1] if page else None
+        return page
+
+    def get_page_size(self, request):
+        try:
+            size = int(request.query_params[self.page_size_query_param])
+        except (KeyError, ValueError):
+            return self.page_size
+        return max(1, min(size, self.max_page_size))
+
+    def get_next_link(self):
+        if not self.has_next:
+            return None
+        params = self.request.query_params.copy()
+        params[self.cursor_query_param] = self.encode_cursor(self.last.timestamp, self.last.id)
+        return self.request.build_absolute_uri(f'{self.request.path}?{urlencode(params, doseq=True)}')
+
+    def get_paginated_response(self, data):
+        return Response({'next': self.get_next_link(), 'results': data})
+
+    def get_paginated_response_schema(self, schema):
+        return {
+            'type': 'object',
+            'required': ['results'],
+            'properties': {
+                'next': {'type': 'string', 'nullable': True, 'format': 'uri'},
+                'results': schema,
+            },
+        }
+
+    @staticmethod
+    def encode_cursor(timestamp, pk):
+        raw = f'{timestamp.isoformat()}|{pk}'.encode()
+        return base64.urlsafe_b64encode(raw).decode().rstrip('=')
+
+    def decode_cursor(self, cursor):
+        try:
+            raw = base64.urlsafe_b64decode(cursor + '=' * (-len(cursor) % 4)).decode()
+            timestamp, pk = raw.split('|', 1)
+            timestamp = parse_datetime(timestamp)
+            pk = uuid.UUID(pk)
+        except (ValueError, UnicodeDecodeError):
+            raise NotFound(self.invalid_cursor_message)
+        if timestamp is None:
+            raise NotFound(self.invalid_cursor_message)
+        return timestamp, pk
@@ -0,0 +1,53 @@
+"""Paylines as data, compiled into index arrays over the flattened reel grid.
+
+A payline lists the visible row it passes through on each reel, e.g.
+(0, 1, 2, 1, 0) for a V. The grid of a spin is flattened reel by reel, so
+cell (reel, row) sits at reel * visible_rows + row and a whole batch of spins
+is cut into lines with a single take().
+"""
+from functools import lru_cache
+
+import numpy as np
+from django.conf import settings
+from django.core.signals import setting_changed
+from django.dispatch import receiver
+
+
+def straight_rows(num_reels, visible_rows):
+    """The classic paylines: one straight line per visible row."""
+    return tuple((row,) * num_reels for row in range(visible_rows))
+
+
+_configured = None
+
+
+def get_paylines(num_reels, visible_rows):
+    """Paylines from SLOTS_PAYLINES, or the straight rows when it is not set."""
+    global _configured
+    if _configured is None:
+        lines = getattr(settings, 'SLOTS_PAYLINES', None)
+        _configured = (tuple(tuple(line) for line in lines),) if lines else ()
+    return _configured[0] if _configured else straight_rows(num_reels, visible_rows)
+
+
+@receiver(setting_changed)
+def _reset_paylines(setting, **kwargs):
+    global _configured
+    if setting == 'SLOTS_PAYLINES':
+        _configured = None
+
+
+@lru_cache(maxsize=32)
+def compile_paylines(paylines, num_reels, visible_rows):
+    """Flat grid indices of every payline as an (lines, num_reels) array."""
+    if not paylines:
+        raise ValueError('At least one payline is required')
+    for number, line in enumerate(paylines, start=1):
+        if len(line) != num_reels:
+            raise ValueError(f'Payline {number} has {len(line)} positions, expected {num_reels}')
+        if not all(0 <= row < visible_rows for row in line):
+            raise ValueError(f'Payline {number} leaves the {visible_rows} visible rows')
+    rows = np.array(paylines, dtype=np.intp)
+    index = rows + np.arange(num_reels, dtype=np.intp) * visible_rows
+    index.setflags(write=False)
+    return index
@@ -0,0 +1,189 @@
+import logging
+import math
+import threading
+import time
+from collections import namedtuple
+from itertools import permutations
+from types import MappingProxyType
+
+import numpy as np
+from asgiref.sync import sync_to_async
+from django.core.cache import cache
+
+logger = logging.getLogger(__name__)
+
+# --- Налаштування кешу таблиці виплат ---
+PAYTABLE_VERSION_KEY = 'slots:paytable_version'
+PAYTABLE_VERSION_CHECK_INTERVAL = 1.0  # seconds between checks of the shared version
+MAX_REEL_PERMUTATIONS = 1 << 16  # above this reels are shuffled instead of looked up
+
+PaytableSymbol = namedtuple('PaytableSymbol', ['id', 'name', 'image_path', 'payout_multiplier'])
+
+
+class Paytable:
+    """Immutable snapshot of the symbol set, their payout multipliers and reel weights.
+
+    reel_weights maps a reel index to {symbol id: weight}. When it is empty
+    every reel is a shuffle of the whole symbol set; otherwise every cell is
+    drawn independently from its reel's weights, and every reel must have
+    weights: a shuffled reel cannot share a spin with weighted ones.
+    """
+
+    def __init__(self, symbols, version=None, reel_weights=None):
+        self.version = version
+        self.symbols = tuple(
+            PaytableSymbol(s.id, s.name, s.image_path, s.payout_multiplier) for s in symbols
+        )
+        self.by_name = MappingProxyType({s.name: s for s in self.symbols})
+        self.by_id = MappingProxyType({s.id: s for s in self.symbols})
+        # Integer codes used by the batch engine: code == position in self.symbols
+        self.names = tuple(s.name for s in self.symbols)
+        self.codes = MappingProxyType({name: code for code, name in enumerate(self.names)})
+        self.code_dtype = np.min_scalar_type(max(len(self.symbols) - 1, 0))
+        self.reel_weights = {reel: dict(weights) for reel, weights in (reel_weights or {}).items()}
+        self.weighted = bool(self.reel_weights)
+        self._derived = {}
+
+    def derived(self, key, build):
+        """Return build(), computed once per paytable version and cached under key."""
+        if key not in self._derived:
+            self._derived[key] = build()
+        return self._derived[key]
+
+    def reel_permutations(self, visible_rows):
+        """Every ordered draw of visible_rows distinct symbol codes, or None if there are too many."""
+        def build():
+            num_symbols = len(self.symbols)
+            count = math.perm(num_symbols, visible_rows)
+            if count > MAX_REEL_PERMUTATIONS:
+                return None
+            table = np.array(list(permutations(range(num_symbols), visible_rows)), dtype=self.code_dtype)
+            return table.reshape(count, visible_rows)
+        return self.derived(('reel_permutations', visible_rows), build)
+
+    def reel_weight_vectors(self, num_reels):
+        """Integer weight of every symbol code on each of num_reels reels."""
+        vectors = []
+        for reel in range(num_reels):
+            weights = self.reel_weights.get(reel)
+            if weights is None:
+                raise ValueError(f'Reel {reel} has no weights, weighted reels need weights on every reel')
+            vector = tuple(weights.get(s.id, 0) for s in self.symbols)
+            if not any(vector):
+                raise ValueError(f'Reel {reel} has no symbol with a positive weight')
+            vectors.append(vector)
+        return vectors
+
+    def alias_tables(self, num_reels, visible_rows):
+        """Walker/Vose alias tables for drawing weighted reel columns.
+
+        Returns (outcomes, probability, alias). outcomes lists every column of
+        visible_rows codes when there are at most MAX_REEL_PERMUTATIONS of
+        them, so one draw fills a whole reel, and single cells otherwise.
+        probability and alias are flat arrays holding num_reels tables of
+        len(outcomes) entries: a draw picks an entry uniformly, keeps it with
+        its probability and otherwise takes its alias, so each draw is O(1).
+        """
+        def build():
+            vectors = self.reel_weight_vectors(num_reels)
+            num_symbols = len(self.symbols)
+            cells = visible_rows if num_symbols ** visible_rows <= MAX_REEL_PERMUTATIONS else 1
+            outcomes = np.indices((num_symbols,) * cells).reshape(cells, -1).T
+            size = len(outcomes)
+            probability = np.ones((num_reels, size))
+            alias = np.tile(np.arange(size), (num_reels, 1))
+            for reel, vector in enumerate(vectors):
+                weights = np.array(vector, dtype=np.float64)[outcomes].prod(axis=1)
+                scaled = (weights * size / weights.sum()).tolist()
+                small = [index for index, value in enumerate(scaled) if value < 1]
+                large = [index for index, value in enumerate(scaled) if value >= 1]
+                while small and large:
+                    low, high = small.pop(), large.pop()
+                    probability[reel, low] = scaled[low]
+                    alias[reel, low] = high
+                    scaled[high] -= 1 - scaled[low]
+                    (small if scaled[high] < 1 else large).append(high)
+                # Залишки мають імовірність 1 з точністю до похибки округлення
+            return outcomes.astype(self.code_dtype), probability.ravel(), alias.ravel()
+        return self.derived(('alias_tables', num_reels, visible_rows), build)
+
+    def __len__(self):
+        return len(self.symbols)
+
+    def __iter__(self):
+        return iter(self.symbols)
+
+
+_lock = threading.Lock()
+_local_version = 0
+_shared_version = None
+_last_shared_check = 0.0
+_paytable = None
+
+
+def _read_shared_version():
+    """Version stored in the Django cache, so other processes see admin edits."""
+    return cache.get(PAYTABLE_VERSION_KEY, 0)
+
+
+def _cached_paytable():
+    """Return the cached snapshot if it is still current, else None. Never queries the database."""
+    global _shared_version, _last_shared_check, _paytable
+    now = time.monotonic()
+    if now - _last_shared_check >= PAYTABLE_VERSION_CHECK_INTERVAL:
+        _last_shared_check = now
+        shared = _read_shared_version()
+        if shared != _shared_version:
+            with _lock:
+                _shared_version = shared
+                _paytable = None
+    paytable = _paytable
+    if paytable is not None and paytable.version == _local_version:
+        return paytable
+    return None
+
+
+def get_paytable():
+    """Return the current paytable snapshot, loading it only after a version bump."""
+    global _paytable
+    paytable = _cached_paytable()
+    if paytable is not None:
+        return paytable
+    with _lock:
+        if _paytable is None or _paytable.version != _local_version:
+            from .models import ReelWeight, Symbol
+            from .services import DEFAULT_NUM_REELS
+            reel_weights = {}
+            for reel, symbol_id, weight in ReelWeight.objects.values_list('reel', 'symbol_id', 'weight'):
+                reel_weights.setdefault(reel, {})[symbol_id] = weight
+            missing = sorted(set(range(DEFAULT_NUM_REELS)) - set(reel_weights))
+            if reel_weights and missing:
+                # Ваги вмикаються лише для всіх барабанів одразу, доти барабани тасуються
+                logger.warning('Reel weights ignored until every reel has one, missing reels %s', missing)
+                reel_weights = {}
+            _paytable = Paytable(Symbol.objects.order_by('id'), version=_local_version, reel_weights=reel_weights)
+        return _paytable
+
+
+async def aget_paytable():
+    """Async get_paytable(); only hops to a thread when the snapshot must be reloaded."""
+    paytable = _cached_paytable()
+    if paytable is not None:
+        return paytable
+    return await sync_to_async(get_paytable)()
+
+
+def invalidate_paytable():
+    """Bump the paytable version; the next get_paytable() reloads the symbols.
+
+    Called from the Symbol and ReelWeight save/delete signals and after migrations. Bulk
+    ``QuerySet.update()`` bypasses signals, so call this explicitly after one.
+    """
+    global _local_version, _shared_version
+    with _lock:
+        _local_version += 1
+        try:
+            _shared_version = cache.incr(PAYTABLE_VERSION_KEY)
+        except ValueError:
+            cache.add(PAYTABLE_VERSION_KEY, 1, timeout=None)
+            _shared_version = _read_shared_version()
@@ -0,0 +1,92 @@
+import os
+import secrets
+import threading
+
+import numpy as np
+from django.conf import settings
+
+# --- Налаштування генератора випадкових чисел ---
+# Spins are drawn in blocks of RNG_BLOCK_SIZE from a PCG64 generator seeded by
+# (stream seed, block index). Changing it changes how recorded (seed, position)
+# pairs replay, so treat it as part of the spin record format.
+RNG_BLOCK_SIZE = 1024
+MAX_SEED = (1 << 63) - 1  # fits Spin.rng_seed
+
+
+def block_generator(seed, block):
+    """Independent PCG64 generator for one block of a stream."""
+    return np.random.Generator(np.random.PCG64(np.random.SeedSequence(seed, spawn_key=(block,))))
+
+
+class SpinStream:
+    """Seeded stream of spins, pre-generated a block at a time.
+
+    Position n of a stream is spin n % RNG_BLOCK_SIZE of block
+    n // RNG_BLOCK_SIZE, so any recorded (seed, position) can be regenerated
+    with replay_spin() as long as the symbols and reel weights are unchanged.
+    """
+
+    def __init__(self, seed=None):
+        self.seed = secrets.randbelow(MAX_SEED) if seed is None else seed
+        self.position = 0
+        self._lock = threading.Lock()
+        self._paytable = None
+        self._block_key = None
+        self._spins = None
+
+    def _spins_for(self, reel_service, block, num_reels, visible_rows):
+        # Блок генерується заново, якщо змінилась таблиця символів або розмір сітки
+        key = (block, num_reels, visible_rows)
+        if self._paytable is not reel_service.paytable or self._block_key != key:
+            rng = block_generator(self.seed, block)
+            self._spins = reel_service.generate_spins(RNG_BLOCK_SIZE, num_reels, visible_rows, rng=rng)
+            self._paytable = reel_service.paytable
+            self._block_key = key
+        return self._spins
+
+    def next_spins(self, reel_service, count, num_reels, visible_rows):
+        """Take count spins; returns (spins array, seed, position of the first spin)."""
+        with self._lock:
+            start = self.position
+            parts = []
+            position = start
+            while position < start + count:
+                block, offset = divmod(position, RNG_BLOCK_SIZE)
+                take = min(RNG_BLOCK_SIZE - offset, start + count - position)
+                spins = self._spins_for(reel_service, block, num_reels, visible_rows)
+                parts.append(spins[offset:offset + take])
+                position += take
+            self.position = position
+        spins = parts[0] if len(parts) == 1 else np.concatenate(parts)
+        return spins, self.seed, start
+
+
+def replay_spin(reel_service, seed, position, num_reels, visible_rows):
+    """Regenerate the (num_reels, visible_rows) spin recorded at (seed, position)."""
+    block, offset = divmod(position, RNG_BLOCK_SIZE)
+    spins = reel_service.generate_spins(RNG_BLOCK_SIZE, num_reels, visible_rows,
+                                        rng=block_generator(seed, block))
+    return spins[offset]
+
+
+_server_stream = None
+_server_stream_lock = threading.Lock()
+
+
+def get_server_stream():
+    """Process-wide spin stream, seeded from SLOTS_RNG_SEED or fresh entropy."""
+    global _server_stream
+    if _server_stream is None:
+        with _server_stream_lock:
+            if _server_stream is None:
+                _server_stream = SpinStream(getattr(settings, 'SLOTS_RNG_SEED', None))
+    return _server_stream
+
+
+def _reset_after_fork():
+    # Дочірні процеси (gunicorn --preload) не повинні ділити потік з батьком
+    global _server_stream
+    _server_stream = None
+
+
+os.register_at_fork(after_in_child=_reset_after_fork)
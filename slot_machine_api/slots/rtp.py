@@ -0,0 +1,360 @@
+import math
+from collections import Counter
+from concurrent.futures import ProcessPoolExecutor
+from decimal import Decimal
+from fractions import Fraction
+from statistics import NormalDist
+
+import numpy as np
+
+from .paylines import get_paylines, straight_rows
+from .paytable import Paytable, PaytableSymbol
+from .services import DEFAULT_NUM_REELS, DEFAULT_VISIBLE_ROWS, MIN_WIN_COUNT, ReelService
+
+# --- Налаштування симуляції ---
+SIMULATION_CHUNK_SIZE = 1_000_000  # spins per task; fixed so results don't depend on workers
+SIMULATION_BATCH_SIZE = 200_000  # spins generated at once inside a task, bounds memory
+PAYOUT_SCALE = 100  # payouts are counted in hundredths of the bet
+
+
+def _multiplier_units(paytable):
+    """Payout multipliers as integers in hundredths, so histograms stay exact."""
+    return np.array([int(s.payout_multiplier * PAYOUT_SCALE) for s in paytable.symbols], dtype=np.int64)
+
+
+def simulate_chunk(symbols, spins, seed, chunk_index,
+                   num_reels=DEFAULT_NUM_REELS, visible_rows=DEFAULT_VISIBLE_ROWS, reel_weights=None,
+                   paylines=None):
+    """Play spins without touching the database and return their payout histogram.
+
+    symbols is a sequence of PaytableSymbol tuples, reel_weights a plain dict
+    and paylines a tuple of row tuples so the task can be pickled into a
+    worker process. The RNG stream is
+    derived from (seed, chunk_index).
+    """
+    paytable = Paytable(symbols, reel_weights=reel_weights)
+    reel_service = ReelService(paytable)
+    multipliers = _multiplier_units(paytable)
+    rng = np.random.default_rng(np.random.SeedSequence(seed, spawn_key=(chunk_index,)))
+
+    histogram = Counter()
+    hits = 0
+    symbol_units = np.zeros(len(paytable), dtype=np.int64)
+    symbol_wins = np.zeros(len(paytable), dtype=np.int64)
+    remaining = spins
+    while remaining:
+        batch = min(remaining, SIMULATION_BATCH_SIZE)
+        remaining -= batch
+        grid = reel_service.generate_spins(batch, num_reels, visible_rows, rng=rng)
+        win_symbols, _, lengths = reel_service.evaluate_wins(grid, paylines)
+        row_units = lengths.astype(np.int64) * multipliers[win_symbols]
+        spin_units = row_units.sum(axis=1)
+        counts = np.bincount(spin_units)
+        values = np.flatnonzero(counts)
+        histogram.update(dict(zip(values.tolist(), counts[values].tolist())))
+        won = lengths > 0
+        hits += int(won.any(axis=1).sum())
+        won_symbols = win_symbols[won]
+        symbol_units += np.bincount(won_symbols, weights=row_units[won], minlength=len(paytable)).astype(np.int64)
+        symbol_wins += np.bincount(won_symbols, minlength=len(paytable))
+    return {
+        'spins': spins,
+        'hits': hits,
+        'histogram': histogram,
+        'symbol_units': symbol_units.tolist(),
+        'symbol_wins': symbol_wins.tolist(),
+    }
+
+
+class SimulationResult:
+    """Merged outcome of a Monte Carlo run; payouts are in multiples of the bet."""
+
+    def __init__(self, paytable, spins, hits, histogram, symbol_units, symbol_wins):
+        self.paytable = paytable
+        self.spins = spins
+        self.hits = hits
+        self.histogram = histogram
+        self.symbol_units = symbol_units
+        self.symbol_wins = symbol_wins
+
+    @property
+    def rtp(self):
+        total = sum(units * count for units, count in self.histogram.items())
+        return total / self.spins / PAYOUT_SCALE
+
+    @property
+    def hit_rate(self):
+        return self.hits / self.spins
+
+    @property
+    def variance(self):
+        mean = self.rtp
+        second_moment = sum((units / PAYOUT_SCALE) ** 2 * count for units, count in self.histogram.items())
+        return second_moment / self.spins - mean ** 2
+
+    def rtp_interval(self, confidence=0.95):
+        """Normal-approximation confidence interval for the RTP."""
+        half_width = NormalDist().inv_cdf(0.5 + confidence / 2) * math.sqrt(self.variance / self.spins)
+        return self.rtp - half_width, self.rtp + half_width
+
+    def hit_rate_interval(self, confidence=0.95):
+        """Wilson score interval for the hit rate."""
+        z = NormalDist().inv_cdf(0.5 + confidence / 2)
+        n, p = self.spins, self.hit_rate
+        centre = (p + z * z / (2 * n)) / (1 + z * z / n)
+        half_width = z * math.sqrt(p * (1 - p) / n + z * z / (4 * n * n)) / (1 + z * z / n)
+        return centre - half_width, centre + half_width
+
+    def symbol_contributions(self):
+        """RTP contributed by each symbol, as {name: (rtp share, winning rows)}."""
+        return {
+            symbol.name: (units / self.spins / PAYOUT_SCALE, wins)
+            for symbol, units, wins in zip(self.paytable.symbols, self.symbol_units, self.symbol_wins)
+        }
+
+
+def simulate_rtp(paytable, spins, seed, workers=1,
+                 num_reels=DEFAULT_NUM_REELS, visible_rows=DEFAULT_VISIBLE_ROWS, paylines=None):
+    """Run a Monte Carlo RTP simulation split into fixed chunks over a process pool.
+
+    The same seed gives the same result regardless of the number of workers.
+    paylines defaults to the configured ones, see get_paylines().
+    """
+    if paylines is None:
+        paylines = get_paylines(num_reels, visible_rows)
+    symbols = [PaytableSymbol(*s) for s in paytable.symbols]
+    chunks = [
+        (index, min(SIMULATION_CHUNK_SIZE, spins - start))
+        for index, start in enumerate(range(0, spins, SIMULATION_CHUNK_SIZE))
+    ]
+    args = (
+        [symbols] * len(chunks),
+        [size for _, size in chunks],
+        [seed] * len(chunks),
+        [index for index, _ in chunks],
+        [num_reels] * len(chunks),
+        [visible_rows] * len(chunks),
+        [paytable.reel_weights] * len(chunks),
+        [tuple(map(tuple, paylines))] * len(chunks),
+    )
+    if workers > 1:
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            parts = list(executor.map(simulate_chunk, *args))
+    else:
+        parts = list(map(simulate_chunk, *args))
+
+    histogram = Counter()
+    symbol_units = [0] * len(symbols)
+    symbol_wins = [0] * len(symbols)
+    for part in parts:
+        histogram.update(part['histogram'])
+        for code in range(len(symbols)):
+            symbol_units[code] += part['symbol_units'][code]
+            symbol_wins[code] += part['symbol_wins'][code]
+    return SimulationResult(
+        paytable,
+        spins=sum(part['spins'] for part in parts),
+        hits=sum(part['hits'] for part in parts),
+        histogram=histogram,
+        symbol_units=symbol_units,
+        symbol_wins=symbol_wins,
+    )
+
+
+def payout_decimal(units):
+    """Convert histogram payout units back to a bet multiple."""
+    return Decimal(units) / PAYOUT_SCALE
+
+
+def _advance_run(row, code, remaining, min_count):
+    """Feed one cell into a row state; return (new state, locked run or None).
+
+    A row state is (symbol, run length) while a win is still possible, or
+    None once the row has locked its first win or can no longer win.
+    """
+    if row is None:
+        return None, None
+    sym, run = row
+    if code == sym:
+        run += 1
+    elif run >= min_count:
+        return None, (sym, run)
+    else:
+        sym, run = code, 1
+    if run < min_count and run + remaining < min_count:
+        return None, None
+    return (sym, run), None
+
+
+def _row_win_counts(num_symbols, num_reels, min_count):
+    """Count the rows, out of num_symbols ** num_reels, winning with each (symbol, length)."""
+    states = {(-1, 0): 1}
+    wins = Counter()
+    for reel in range(num_reels):
+        remaining = num_reels - reel - 1
+        next_states = Counter()
+        for row, count in states.items():
+            for code in range(num_symbols):
+                new_row, locked = _advance_run(row, code, remaining, min_count)
+                if locked:
+                    wins[locked] += count * num_symbols ** remaining
+                elif new_row is not None:
+                    next_states[new_row] += count
+        states = next_states
+    for (sym, run), count in states.items():
+        if run >= min_count:
+            wins[(sym, run)] += count
+    return wins
+
+
+def _row_win_probabilities(reel_probabilities, min_count):
+    """Probability of a row winning with each (symbol, length) when cells are drawn independently."""
+    num_reels = len(reel_probabilities)
+    states = {(-1, 0): Fraction(1)}
+    wins = Counter()
+    for reel, probabilities in enumerate(reel_probabilities):
+        remaining = num_reels - reel - 1
+        next_states = Counter()
+        for row, probability in states.items():
+            for code, cell_probability in enumerate(probabilities):
+                if not cell_probability:
+                    continue
+                new_row, locked = _advance_run(row, code, remaining, min_count)
+                if locked:
+                    wins[locked] += probability * cell_probability
+                elif new_row is not None:
+                    next_states[new_row] += probability * cell_probability
+        states = next_states
+    for (sym, run), probability in states.items():
+        if run >= min_count:
+            wins[(sym, run)] += probability
+    return wins
+
+
+class ExactResult:
+    """Exact payout distribution of one spin; payouts are in multiples of the bet."""
+
+    def __init__(self, paytable, distribution, hit_probability, symbol_contributions):
+        self.paytable = paytable
+        self.distribution = distribution
+        self.hit_probability = hit_probability
+        self._symbol_contributions = symbol_contributions
+
+    @property
+    def rtp(self):
+        return sum(payout * probability for payout, probability in self.distribution.items())
+
+    @property
+    def variance(self):
+        return sum(payout ** 2 * probability for payout, probability in self.distribution.items()) - self.rtp ** 2
+
+    def symbol_contributions(self):
+        """RTP contributed by each symbol, as {name: rtp share}."""
+        return dict(self._symbol_contributions)
+
+
+def exact_rtp(paytable, num_reels=DEFAULT_NUM_REELS, visible_rows=DEFAULT_VISIBLE_ROWS,
+              min_count=MIN_WIN_COUNT, paylines=None):
+    """Compute the exact RTP, hit probability and payout distribution of the paytable.
+
+    Walks the grid cell by cell (reel by reel, row by row) keeping, for each
+    reachable state, the number of reel outcomes that lead to it. A state is
+    the payout locked so far, whether any row has won, each row's run state
+    and the symbols already used on the current reel, so identical futures
+    are merged instead of enumerating every reel permutation. Weighted reels
+    draw cells independently and take the simpler per-row path instead.
+
+    Only straight-row paylines are supported: other shapes share cells
+    between lines, so use simulate_rtp() for them.
+    """
+    if paylines is None:
+        paylines = get_paylines(num_reels, visible_rows)
+    if tuple(map(tuple, paylines)) != straight_rows(num_reels, visible_rows):
+        raise ValueError('Exact RTP only supports straight-row paylines, use simulate_rtp instead')
+    if paytable.weighted:
+        return _exact_weighted_rtp(paytable, num_reels, visible_rows, min_count)
+    num_symbols = len(paytable)
+    if num_symbols < visible_rows:
+        raise ValueError(f'At least {visible_rows} symbols are required, got {num_symbols}')
+    multipliers = _multiplier_units(paytable).tolist()
+
+    states = {(0, False, ((-1, 0),) * visible_rows, 0): 1}
+    for reel in range(num_reels):
+        remaining = num_reels - reel - 1
+        for row_index in range(visible_rows):
+            last_row = row_index == visible_rows - 1
+            next_states = Counter()
+            for (units, hit, rows, used), count in states.items():
+                for code in range(num_symbols):
+                    bit = 1 << code
+                    if used & bit:
+                        continue
+                    new_row, locked = _advance_run(rows[row_index], code, remaining, min_count)
+                    new_units, new_hit = units, hit
+                    if locked:
+                        new_units += locked[1] * multipliers[locked[0]]
+                        new_hit = True
+                    new_rows = rows[:row_index] + (new_row,) + rows[row_index + 1:]
+                    next_states[(new_units, new_hit, new_rows, 0 if last_row else used | bit)] += count
+            states = next_states
+
+    outcomes = Counter()
+    hits = 0
+    for (units, hit, rows, _), count in states.items():
+        for row in rows:
+            if row is not None and row[1] >= min_count:
+                units += row[1] * multipliers[row[0]]
+                hit = True
+        outcomes[units] += count
+        if hit:
+            hits += count
+    total = sum(outcomes.values())
+    distribution = {
+        Fraction(units, PAYOUT_SCALE): Fraction(count, total)
+        for units, count in sorted(outcomes.items())
+    }
+
+    # Кожна клітинка рядка рівномірна на множині символів, тож внесок
+    # символу рахується по одному рядку і множиться на кількість рядків.
+    row_total = num_symbols ** num_reels
+    contributions = {symbol.name: Fraction(0) for symbol in paytable.symbols}
+    for (code, length), count in _row_win_counts(num_symbols, num_reels, min_count).items():
+        contributions[paytable.names[code]] += Fraction(
+            visible_rows * count * length * multipliers[code], row_total * PAYOUT_SCALE
+        )
+    return ExactResult(paytable, distribution, Fraction(hits, total), contributions)
+
+
+def _exact_weighted_rtp(paytable, num_reels, visible_rows, min_count):
+    """exact_rtp() for weighted reels, where every cell is an independent draw.
+
+    Rows are then independent too, so one row's payout distribution is
+    computed once and convolved visible_rows times.
+    """
+    multipliers = _multiplier_units(paytable).tolist()
+    reel_probabilities = [
+        [Fraction(weight, sum(vector)) for weight in vector]
+        for vector in paytable.reel_weight_vectors(num_reels)
+    ]
+    wins = _row_win_probabilities(reel_probabilities, min_count)
+    row_outcomes = Counter()
+    contributions = {symbol.name: Fraction(0) for symbol in paytable.symbols}
+    for (code, length), probability in wins.items():
+        units = length * multipliers[code]
+        row_outcomes[units] += probability
+        contributions[paytable.names[code]] += visible_rows * probability * Fraction(units, PAYOUT_SCALE)
+    row_miss = 1 - sum(wins.values())
+    row_outcomes[0] += row_miss
+
+    outcomes = Counter({0: Fraction(1)})
+    for _ in range(visible_rows):
+        combined = Counter()
+        for units, probability in outcomes.items():
+            for row_units, row_probability in row_outcomes.items():
+                combined[units + row_units] += probability * row_probability
+        outcomes = combined
+    distribution = {
+        Fraction(units, PAYOUT_SCALE): probability
+        for units, probability in sorted(outcomes.items()) if probability
+    }
+    return ExactResult(paytable, distribution, 1 - row_miss ** visible_rows, contributions)
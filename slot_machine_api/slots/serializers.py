@@ -1,5 +1,7 @@
 from rest_framework import serializers
 from .models import Player, Game, Spin, Symbol
+from .services import MAX_BATCH_SPINS
+from .encoding import unpack_spin
 from django.contrib.auth.models import User
 
 
@@ -15,8 +17,8 @@ class PlayerSerializer(serializers.ModelSerializer):
 
     class Meta:
         model = Player
-        fields = ['id', 'user', 'balance', 'total_won', 'total_wager']
-        read_only_fields = ['id', 'total_won', 'total_wager']
+        fields = ['id', 'user', 'balance', 'total_won', 'total_wager', 'active_game']
+        read_only_fields = ['id', 'total_won', 'total_wager', 'active_game']
 
 
 class SymbolSerializer(serializers.ModelSerializer):
@@ -31,20 +33,51 @@ class SpinSerializer(serializers.ModelSerializer):
         fields = ['id', 'game', 'bet_amount', 'payout', 'result', 'win_data', 'timestamp']
         read_only_fields = ['id', 'game', 'payout', 'result', 'win_data', 'timestamp']
 
+    def to_representation(self, instance):
+        data = super().to_representation(instance)
+        if instance.packed is not None:
+            data['result'], data['win_data'] = unpack_spin(instance.packed)
+        return data
+
 
 class GameSerializer(serializers.ModelSerializer):
-    spins = SpinSerializer(many=True, read_only=True)
+    total_paid = serializers.DecimalField(source='total_won', max_digits=12, decimal_places=2, read_only=True)
 
     class Meta:
         model = Game
-        fields = ['id', 'player', 'machine_balance', 'created_at', 'updated_at', 'spins']
-        read_only_fields = ['id', 'created_at', 'updated_at']
+        fields = ['id', 'player', 'machine_balance', 'created_at', 'updated_at', 'ended_at',
+                  'spin_count', 'total_wagered', 'total_paid', 'last_spin_at']
+        read_only_fields = ['id', 'created_at', 'updated_at', 'ended_at', 'spin_count', 'total_wagered', 'last_spin_at']
 
 
 class SpinRequestSerializer(serializers.Serializer):
     bet_size = serializers.DecimalField(max_digits=10, decimal_places=2, min_value=0.01)
 
 
+class BatchSpinRequestSerializer(SpinRequestSerializer):
+    count = serializers.IntegerField(min_value=1, max_value=MAX_BATCH_SPINS)
+    stop_loss = serializers.DecimalField(max_digits=10, decimal_places=2, min_value=0.01, required=False)
+    stop_win = serializers.DecimalField(max_digits=10, decimal_places=2, min_value=0.01, required=False)
+
+
+class PaylineSerializer(serializers.Serializer):
+    line = serializers.IntegerField()
+    rows = serializers.ListField(child=serializers.IntegerField())
+
+
+class LeaderboardRowSerializer(serializers.Serializer):
+    rank = serializers.IntegerField()
+    player_id = serializers.IntegerField()
+    username = serializers.CharField()
+    total_won = serializers.DecimalField(max_digits=12, decimal_places=2)
+
+
+class LeaderboardSerializer(serializers.Serializer):
+    window = serializers.CharField()
+    period_start = serializers.DateTimeField()
+    results = LeaderboardRowSerializer(many=True)
+
+
 class RegistrationSerializer(serializers.ModelSerializer):
     password = serializers.CharField(write_only=True)
 
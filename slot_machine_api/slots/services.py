@@ -1,5 +1,15 @@
-import random
 from decimal import Decimal
+from functools import partial
+
+import numpy as np
+
+from .jackpot import get_jackpot
+from .leaderboard import get_leaderboard
+from .metrics import stage
+from .paylines import compile_paylines, get_paylines
+from .paytable import Paytable, aget_paytable, get_paytable
+from .rng import get_server_stream
+from .spinlog import get_spin_writer
 
 # --- Константи для слот-машини ---
 DEFAULT_NUM_REELS = 5
@@ -8,18 +18,146 @@ MIN_WIN_COUNT = 3
 INITIAL_PLAYER_BALANCE = Decimal('1000.00')
 INITIAL_MACHINE_BALANCE = Decimal('10000.00')
 ZERO_DECIMAL = Decimal('0.00')
+CENT = Decimal('0.01')
+MAX_BATCH_SPINS = 1000
+MAX_ROW_OUTCOMES = 1 << 20  # найбільша таблиця результатів рядка (symbols ** reels)
+SETTLED_PLAYER_FIELDS = ['balance', 'total_won', 'total_wager', 'active_game']
 
 class ReelService:
     def __init__(self, symbols):
-        self.symbols = symbols
+        if not isinstance(symbols, Paytable):
+            symbols = Paytable(symbols)
+        self.paytable = symbols
+        self.symbols = symbols.symbols
+
+    def generate_spins(self, count, num_reels=DEFAULT_NUM_REELS, visible_rows=DEFAULT_VISIBLE_ROWS, rng=None):
+        """Generate count spins as a (count, num_reels, visible_rows) array of symbol codes.
+
+        Without reel weights every reel is an independent shuffle of the
+        symbol set, of which the first visible_rows symbols are shown. With
+        weights every reel column is drawn from that reel's alias table.
+        """
+        num_symbols = len(self.symbols)
+        if rng is None:
+            rng = np.random.default_rng()
+        if self.paytable.weighted:
+            outcomes, probability, alias = self.paytable.alias_tables(num_reels, visible_rows)
+            size = len(outcomes)
+            scaled = rng.random((count, num_reels, visible_rows // outcomes.shape[1])) * size
+            column = scaled.astype(np.intp)
+            index = column + (np.arange(num_reels) * size)[:, None]
+            chosen = np.where(scaled - column < probability[index], column, alias[index])
+            return outcomes.take(chosen, axis=0).reshape(count, num_reels, visible_rows)
+        if num_symbols < visible_rows:
+            raise ValueError(f'At least {visible_rows} symbols are required, got {num_symbols}')
+        permutations = self.paytable.reel_permutations(visible_rows)
+        if permutations is not None:
+            return permutations.take(rng.integers(len(permutations), size=(count, num_reels)), axis=0)
+        keys = rng.random((count, num_reels, num_symbols))
+        return keys.argsort(axis=-1)[..., :visible_rows].astype(self.paytable.code_dtype)
+
+    @staticmethod
+    def find_runs(lines, min_count=MIN_WIN_COUNT):
+        """Find the first run of at least min_count equal codes along the last axis.
+
+        Returns (symbols, starts, lengths) arrays shaped like lines without the
+        last axis; lengths is 0 where a line has no winning run.
+        """
+        width = lines.shape[-1]
+        same = lines[..., 1:] == lines[..., :-1]
+        # Довжина серії, що починається в кожній позиції (прохід справа наліво)
+        remaining = np.ones(lines.shape, dtype=np.min_scalar_type(width))
+        for col in range(width - 2, -1, -1):
+            remaining[..., col] += same[..., col] * remaining[..., col + 1]
+        run_starts = np.ones(lines.shape, dtype=bool)
+        run_starts[..., 1:] = ~same
+        qualifies = run_starts & (remaining >= min_count)
+        starts = qualifies.argmax(axis=-1)
+        lengths = np.take_along_axis(remaining, starts[..., None], axis=-1)[..., 0]
+        lengths = np.where(qualifies.any(axis=-1), lengths, 0)
+        symbols = np.take_along_axis(lines, starts[..., None], axis=-1)[..., 0]
+        return symbols, starts, lengths
+
+    def row_outcome_table(self, num_reels, min_count=MIN_WIN_COUNT):
+        """Precomputed find_runs result for every possible row, or None if too large.
+
+        A row of codes c0..cn is looked up at index sum(ci * S ** (n - i)).
+        Built once per paytable version.
+        """
+        def build():
+            num_symbols = len(self.symbols)
+            if num_symbols ** num_reels > MAX_ROW_OUTCOMES:
+                return None
+            rows = np.indices((num_symbols,) * num_reels).reshape(num_reels, -1).T
+            symbols, starts, lengths = self.find_runs(rows.astype(self.paytable.code_dtype), min_count)
+            weights = num_symbols ** np.arange(num_reels - 1, -1, -1, dtype=np.int64)
+            return weights, symbols, starts.astype(np.uint8), lengths.astype(np.uint8)
+        return self.paytable.derived(('row_outcomes', num_reels, min_count), build)
+
+    def payline_matrix(self, paylines, num_reels, visible_rows):
+        """Matrix taking a flattened spin to the row outcome index of every payline.
+
+        Column l holds reel k's table weight at the cell payline l crosses on
+        reel k, so spins @ matrix evaluates all paylines in one BLAS call.
+        float32 is exact here: every index is below MAX_ROW_OUTCOMES < 2 ** 24.
+        Built once per paytable version and payline set.
+        """
+        def build():
+            weights = self.row_outcome_table(num_reels)[0]
+            index = compile_paylines(paylines, num_reels, visible_rows)
+            matrix = np.zeros((num_reels * visible_rows, len(paylines)), dtype=np.float32)
+            for reel in range(num_reels):
+                matrix[index[:, reel], np.arange(len(paylines))] = weights[reel]
+            return matrix
+        return self.paytable.derived(('payline_matrix', paylines, num_reels, visible_rows), build)
+
+    def evaluate_wins(self, spins, paylines=None):
+        """Evaluate every payline of a (count, num_reels, visible_rows) batch of spins.
+
+        paylines defaults to get_paylines(), the straight rows unless
+        SLOTS_PAYLINES is set. Returns (symbols, starts, lengths), each shaped
+        (count, number of paylines).
+        """
+        count, num_reels, visible_rows = spins.shape
+        if paylines is None:
+            paylines = get_paylines(num_reels, visible_rows)
+        else:
+            paylines = tuple(map(tuple, paylines))
+        cells = spins.reshape(count, -1)
+        table = self.row_outcome_table(num_reels)
+        if table is None:
+            return self.find_runs(cells.take(compile_paylines(paylines, num_reels, visible_rows), axis=1))
+        _, symbols, starts, lengths = table
+        outcome = (cells.astype(np.float32) @ self.payline_matrix(paylines, num_reels, visible_rows)).astype(np.intp)
+        return symbols.take(outcome), starts.take(outcome), lengths.take(outcome)
+
+    def encode_spin(self, result):
+        """Convert a {reel: [symbol names]} spin result into a (num_reels, visible_rows) code array."""
+        codes = self.paytable.codes
+        return np.array([[codes[name] for name in reel] for reel in result.values()],
+                        dtype=self.paytable.code_dtype)
+
+    def decode_spin(self, spin):
+        """Convert a (num_reels, visible_rows) code array into a {reel: [symbol names]} result."""
+        names = self.paytable.names
+        return {reel: [names[code] for code in column] for reel, column in enumerate(spin.tolist())}
+
+    def decode_wins(self, symbols, starts, lengths):
+        """Convert one spin's evaluated paylines into the {line_number: (name, indices)} win format.
+
+        Line numbers start at 1; with the default straight rows they are the
+        row numbers. indices are reel positions along the line.
+        """
+        names = self.paytable.names
+        hits = {}
+        for line in np.flatnonzero(lengths).tolist():
+            start, length = int(starts[line]), int(lengths[line])
+            hits[line + 1] = (names[symbols[line]], list(range(start, start + length)))
+        return hits if hits else None
 
     def generate_spin(self, num_reels=DEFAULT_NUM_REELS, visible_rows=DEFAULT_VISIBLE_ROWS):
         """Generate a random spin result with num_reels and visible_rows per reel."""
-        result = {}
-        for reel in range(num_reels):
-            shuffled_symbols = random.sample(list(self.symbols), len(self.symbols))
-            result[reel] = [shuffled_symbols[i].name for i in range(visible_rows)]
-        return result
+        return self.decode_spin(self.generate_spins(1, num_reels, visible_rows)[0])
 
     @staticmethod
     def flip_horizontal(result):
@@ -65,50 +203,114 @@ class ReelService:
         return wins
 
     def check_wins(self, result):
-        """Check for winning combinations in the spin result."""
-        hits = {}
-        horizontal = self.flip_horizontal(result)
-        for idx, row in enumerate(horizontal):
-            row_wins = self._row_wins(row)
-            if row_wins:
-                hits[idx + 1] = row_wins[0]  # Підтримка лише першого виграшу на рядок
-        return hits if hits else None
+        """Check every payline of the spin result for winning combinations."""
+        spin = self.encode_spin(result)
+        symbols, starts, lengths = self.evaluate_wins(spin[None])
+        return self.decode_wins(symbols[0], starts[0], lengths[0])
 
     def calculate_payout(self, win_data, bet_size):
         """Calculate payout based on win data and bet size."""
         if not win_data:
             return ZERO_DECIMAL
-        from .models import Symbol
         total_payout = ZERO_DECIMAL
         for row_number, win_info in win_data.items():
             sym_name, indices = win_info
-            symbol = Symbol.objects.get(name=sym_name)
+            symbol = self.paytable.by_name[sym_name]
             combo_length = len(indices)
             total_payout += Decimal(bet_size) * combo_length * symbol.payout_multiplier
-        return total_payout
+        return total_payout.quantize(CENT)
 
 class SlotMachineService:
-    def __init__(self):
-        from .models import Symbol
-        symbols = Symbol.objects.all()
-        self.reel_service = ReelService(symbols)
+    def __init__(self, paytable=None, stream=None, leaderboard=None, jackpot=None):
+        with stage('paytable'):
+            self.reel_service = ReelService(paytable or get_paytable())
+        self.stream = stream or get_server_stream()
+        self.leaderboard = leaderboard or get_leaderboard()
+        self.jackpot = jackpot or get_jackpot()  # None while SLOTS_JACKPOT is disabled
+
+    @classmethod
+    async def acreate(cls):
+        """Build the service from async code without a blocking paytable load."""
+        return cls(await aget_paytable())
+
+    def _draw_spin(self):
+        """Take the next spin from the RNG stream as (result, win_data, seed, position)."""
+        with stage('rng'):
+            spins, seed, position = self.stream.next_spins(
+                self.reel_service, 1, DEFAULT_NUM_REELS, DEFAULT_VISIBLE_ROWS
+            )
+        with stage('wins'):
+            symbols, starts, lengths = self.reel_service.evaluate_wins(spins)
+            result = self.reel_service.decode_spin(spins[0])
+            win_data = self.reel_service.decode_wins(symbols[0], starts[0], lengths[0])
+        return result, win_data, seed, position
 
     def play_spin(self, player, bet_size):
         """Process a single spin of the slot machine."""
-        if player.balance < Decimal(bet_size):
+        from django.db import transaction
+        bet_size = Decimal(bet_size)
+        result, win_data, seed, position = self._draw_spin()
+        with stage('payout'):
+            payout = self.reel_service.calculate_payout(win_data, bet_size)
+        with transaction.atomic():
+            with stage('settle'):
+                settled = self._settle_balance(player, bet_size, bet_size, payout)
+            if not settled:
+                return {
+                    'success': False,
+                    'message': 'Insufficient balance'
+                }
+            with stage('spin_insert'):
+                spin = self._create_spin_record(player, bet_size, payout, result, win_data, seed, position)
+            jackpot = ZERO_DECIMAL
+            if self.jackpot:
+                with stage('jackpot'):
+                    jackpot = self.jackpot.settle(spin, player, bet_size, payout)
+            with stage('leaderboard'):
+                self.leaderboard.record(player.pk, payout + jackpot)
+        response = {
+            'success': True,
+            'spin_id': spin.id,
+            'result': result,
+            'win_data': win_data,
+            'payout': payout,
+            'current_balance': player.balance
+        }
+        if self.jackpot:
+            response['jackpot'] = jackpot
+        return response
+
+    async def aplay_spin(self, player, bet_size):
+        """Async play_spin on the async ORM.
+
+        The balance UPDATE is the atomic money-moving step. Django has no async
+        transactions, so if recording the spin fails afterwards the bet is
+        reverted with a compensating UPDATE before the error propagates.
+        """
+        bet_size = Decimal(bet_size)
+        result, win_data, seed, position = self._draw_spin()
+        with stage('payout'):
+            payout = self.reel_service.calculate_payout(win_data, bet_size)
+        with stage('settle'):
+            settled = await self._asettle_balance(player, bet_size, bet_size, payout)
+        if not settled:
             return {
                 'success': False,
                 'message': 'Insufficient balance'
             }
-        self._update_player_balance_on_bet(player, bet_size)
-        result = self.reel_service.generate_spin()
-        win_data = self.reel_service.check_wins(result)
-        payout = ZERO_DECIMAL
-        if win_data:
-            payout = self.reel_service.calculate_payout(win_data, bet_size)
-            self._update_player_balance_on_win(player, payout)
-        spin = self._create_spin_record(player, bet_size, payout, result, win_data)
-        return {
+        try:
+            with stage('spin_insert'):
+                spin = await self._acreate_spin_record(player, bet_size, payout, result, win_data, seed, position)
+        except Exception:
+            await self._asettle_balance(player, ZERO_DECIMAL, -bet_size, -payout)
+            raise
+        jackpot = ZERO_DECIMAL
+        if self.jackpot:
+            with stage('jackpot'):
+                jackpot = await self.jackpot.asettle(spin, player, bet_size, payout)
+        with stage('leaderboard'):
+            await self.leaderboard.arecord(player.pk, payout + jackpot)
+        response = {
             'success': True,
             'spin_id': spin.id,
             'result': result,
@@ -116,24 +318,252 @@ class SlotMachineService:
             'payout': payout,
             'current_balance': player.balance
         }
+        if self.jackpot:
+            response['jackpot'] = jackpot
+        return response
 
-    def _update_player_balance_on_bet(self, player, bet_size):
-        player.balance -= Decimal(bet_size)
-        player.total_wager += Decimal(bet_size)
-        player.save()
-
-    def _update_player_balance_on_win(self, player, payout):
-        player.balance += payout
-        player.total_won += payout
-        player.save()
-
-    def _create_spin_record(self, player, bet_size, payout, result, win_data):
-        from .models import Spin, Game
-        game, _ = Game.objects.get_or_create(player=player)
-        return Spin.objects.create(
-            game=game,
-            bet_amount=bet_size,
-            payout=payout,
-            result=result,
-            win_data=win_data
+    def play_batch(self, player, bet_size, count, stop_loss=None, stop_win=None):
+        """Process up to count spins in one transaction with a single balance update.
+
+        Autoplay stops early when the balance can't cover the bet, when the net
+        loss reaches stop_loss or when the net win reaches stop_win.
+        """
+        from django.db import transaction
+        from .models import Player, Spin
+        bet_size = Decimal(bet_size)
+        balance = Player.objects.values_list('balance', flat=True).get(pk=player.pk)
+        with stage('rng'):
+            grids, seed, first_position = self.stream.next_spins(
+                self.reel_service, count, DEFAULT_NUM_REELS, DEFAULT_VISIBLE_ROWS
+            )
+        with stage('wins'):
+            symbols, starts, lengths = self.reel_service.evaluate_wins(grids)
+        wagered = won = ZERO_DECIMAL
+        required = bet_size  # найменший баланс, за якого вистачає на кожну ставку серії
+        outcomes = []
+        stop_reason = None
+        for idx in range(count):
+            if balance + won - wagered < bet_size:
+                stop_reason = 'insufficient_balance'
+                break
+            required = max(required, bet_size + wagered - won)
+            result = self.reel_service.decode_spin(grids[idx])
+            win_data = self.reel_service.decode_wins(symbols[idx], starts[idx], lengths[idx])
+            payout = self.reel_service.calculate_payout(win_data, bet_size)
+            wagered += bet_size
+            won += payout
+            outcomes.append((result, win_data, payout, first_position + idx))
+            if stop_loss is not None and wagered - won >= stop_loss:
+                stop_reason = 'stop_loss'
+                break
+            if stop_win is not None and won - wagered >= stop_win:
+                stop_reason = 'stop_win'
+                break
+        with transaction.atomic():
+            with stage('settle'):
+                settled = bool(outcomes) and self._settle_balance(player, required, wagered, won)
+            if not settled:
+                return {
+                    'success': False,
+                    'message': 'Insufficient balance'
+                }
+            with stage('spin_insert'):
+                game_id = player.active_game_id or GameSessionService.activate(player)
+                spins = Spin.objects.bulk_create([
+                    Spin(game_id=game_id, player_id=player.pk, **self._spin_fields(bet_size, payout, result, win_data, seed, position))
+                    for result, win_data, payout, position in outcomes
+                ])
+                GameSessionService.count_spins(game_id, len(spins), wagered, won, spins[-1].timestamp)
+            jackpot = ZERO_DECIMAL
+            if self.jackpot:
+                with stage('jackpot'):
+                    jackpot = self.jackpot.settle(spins[0], player, wagered, won, spins=len(spins))
+            with stage('leaderboard'):
+                self.leaderboard.record(player.pk, won + jackpot)
+        response = {
+            'success': True,
+            'spins': [
+                {'spin_id': spin.id, 'result': result, 'win_data': win_data, 'payout': payout}
+                for spin, (result, win_data, payout, _) in zip(spins, outcomes)
+            ],
+            'total_wagered': wagered,
+            'total_won': won,
+            'stop_reason': stop_reason,
+            'current_balance': player.balance
+        }
+        if self.jackpot:
+            response['jackpot'] = jackpot
+        return response
+
+    def _settle_balance(self, player, required, wagered, won):
+        """Apply a bet and its win in one conditional UPDATE.
+
+        The row is only updated while its balance is at least required, so
+        concurrent spins can neither lose updates nor overdraw the player.
+        Returns False when the balance was insufficient.
+        """
+        from django.db.models import F
+        from .models import Player
+        updated = Player.objects.filter(pk=player.pk, balance__gte=required).update(
+            balance=F('balance') - wagered + won,
+            total_wager=F('total_wager') + wagered,
+            total_won=F('total_won') + won,
+        )
+        if not updated:
+            return False
+        # active_game приходить тим самим запитом, тож спін не шукає гру окремо
+        player.refresh_from_db(fields=SETTLED_PLAYER_FIELDS)
+        return True
+
+    async def _asettle_balance(self, player, required, wagered, won):
+        from django.db.models import F
+        from .models import Player
+        updated = await Player.objects.filter(pk=player.pk, balance__gte=required).aupdate(
+            balance=F('balance') - wagered + won,
+            total_wager=F('total_wager') + wagered,
+            total_won=F('total_won') + won,
         )
+        if not updated:
+            return False
+        await player.arefresh_from_db(fields=SETTLED_PLAYER_FIELDS)
+        return True
+
+    async def _acreate_spin_record(self, player, bet_size, payout, result, win_data, seed, position):
+        from .models import Spin
+        game_id = player.active_game_id or await GameSessionService.aactivate(player)
+        spin = Spin(game_id=game_id, player_id=player.pk, **self._spin_fields(bet_size, payout, result, win_data, seed, position))
+        await GameSessionService.acount_spins(game_id, 1, bet_size, payout, spin.timestamp)
+        try:
+            writer = get_spin_writer()
+            if writer is None or not writer.offer(spin):
+                await spin.asave(force_insert=True)
+        except Exception:
+            await GameSessionService.acount_spins(game_id, -1, -bet_size, -payout)
+            raise
+        return spin
+
+    def _create_spin_record(self, player, bet_size, payout, result, win_data, seed, position):
+        """Insert the spin into the player's active game, or queue it for the write-behind SpinWriter.
+
+        A queued spin is handed over once the spin's transaction commits, so a
+        rolled-back bet leaves no record and the request never waits on the
+        writer while it holds the database's write lock.
+        """
+        from django.db import transaction
+        from .models import Spin
+        game_id = player.active_game_id or GameSessionService.activate(player)
+        spin = Spin(game_id=game_id, player_id=player.pk, **self._spin_fields(bet_size, payout, result, win_data, seed, position))
+        GameSessionService.count_spins(game_id, 1, bet_size, payout, spin.timestamp)
+        writer = get_spin_writer()
+        if writer is None:
+            spin.save(force_insert=True)
+        else:
+            transaction.on_commit(partial(writer.submit, spin))
+        return spin
+
+    def _spin_fields(self, bet_size, payout, result, win_data, seed, position):
+        """Spin model fields, packed when SLOTS_COMPACT_SPIN_STORAGE is enabled."""
+        from django.conf import settings
+        fields = {'bet_amount': bet_size, 'payout': payout, 'rng_seed': seed, 'rng_position': position}
+        if getattr(settings, 'SLOTS_COMPACT_SPIN_STORAGE', False):
+            from .encoding import pack_spin
+            fields['packed'] = pack_spin(result, win_data, self.reel_service.paytable)
+        else:
+            fields['result'] = result
+            fields['win_data'] = win_data
+        return fields
+
+
+class GameSessionService:
+    """Game session lifecycle: spins go into the player's active game.
+
+    The active game id travels on the Player row that every spin already
+    re-reads after settling its bet, so the spin path never looks games up;
+    it only adds itself to the game's running totals. A spin without an
+    active game starts one.
+    """
+
+    @staticmethod
+    def _new_game(player):
+        from .models import Game
+        return Game(player_id=player.pk, machine_balance=INITIAL_MACHINE_BALANCE)
+
+    @staticmethod
+    def activate(player):
+        """Make a new game active unless another request just did; returns the active game id."""
+        from .models import Player
+        game = GameSessionService._new_game(player)
+        game.save(force_insert=True)
+        if not Player.objects.filter(pk=player.pk, active_game__isnull=True).update(active_game=game):
+            game.delete()
+            player.refresh_from_db(fields=['active_game'])
+            return player.active_game_id
+        player.active_game_id = game.pk
+        return game.pk
+
+    @staticmethod
+    async def aactivate(player):
+        from .models import Player
+        game = GameSessionService._new_game(player)
+        await game.asave(force_insert=True)
+        if not await Player.objects.filter(pk=player.pk, active_game__isnull=True).aupdate(active_game=game):
+            await game.adelete()
+            await player.arefresh_from_db(fields=['active_game'])
+            return player.active_game_id
+        player.active_game_id = game.pk
+        return game.pk
+
+    @staticmethod
+    def start(player):
+        """End the player's active game, if any, and start a new one; returns its id."""
+        from django.db import transaction
+        with transaction.atomic():
+            GameSessionService.end(player)
+            return GameSessionService.activate(player)
+
+    @staticmethod
+    def end(player):
+        """End the active game; returns the ended game id or None.
+
+        The game's totals are kept up to date by its spins, so ending only
+        clears the active pointer. Spins that read the pointer before it was
+        cleared still count in the ended game.
+        """
+        from django.db import transaction
+        from django.utils import timezone
+        from .models import Game, Player
+        with transaction.atomic():
+            game_id = Player.objects.select_for_update().values_list('active_game', flat=True).get(pk=player.pk)
+            if game_id is None:
+                return None
+            Player.objects.filter(pk=player.pk).update(active_game=None)
+            Game.objects.filter(pk=game_id).update(ended_at=timezone.now())
+        player.active_game_id = None
+        return game_id
+
+    @staticmethod
+    def _totals(spins, wagered, won, played_at):
+        from django.db.models import F
+        totals = {
+            'spin_count': F('spin_count') + spins,
+            'total_wagered': F('total_wagered') + wagered,
+            'total_won': F('total_won') + won,
+        }
+        if played_at is not None:
+            totals['last_spin_at'] = played_at
+        return totals
+
+    @staticmethod
+    def count_spins(game_id, spins, wagered, won, played_at=None):
+        """Add spins to the game's running totals with one UPDATE.
+
+        Call in the transaction that settles their bets; negative amounts
+        take back spins that were not recorded.
+        """
+        from .models import Game
+        Game.objects.filter(pk=game_id).update(**GameSessionService._totals(spins, wagered, won, played_at))
+
+    @staticmethod
+    async def acount_spins(game_id, spins, wagered, won, played_at=None):
+        from .models import Game
+        await Game.objects.filter(pk=game_id).aupdate(**GameSessionService._totals(spins, wagered, won, played_at))
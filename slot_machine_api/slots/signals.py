@@ -0,0 +1,54 @@
+from django.contrib.auth import get_user_model
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+from rest_framework.authtoken.models import Token
+
+from .authentication import get_token_cache
+from .models import Player, ReelWeight, Symbol
+from .paytable import invalidate_paytable
+
+
+@receiver(post_save, sender=Symbol)
+@receiver(post_delete, sender=Symbol)
+@receiver(post_save, sender=ReelWeight)
+@receiver(post_delete, sender=ReelWeight)
+def symbol_changed(sender, **kwargs):
+    # Як і з токенами: одразу і після коміту, щоб паралельне завантаження не закешувало старі рядки
+    invalidate_paytable()
+    transaction.on_commit(invalidate_paytable)
+
+
+def paytable_migrated(sender, **kwargs):
+    invalidate_paytable()
+
+
+def _invalidate_tokens(**lookup):
+    # Одразу і ще раз після коміту, щоб паралельний запит не закешував старий рядок
+    token_cache = get_token_cache()
+    token_cache.invalidate(**lookup)
+    transaction.on_commit(lambda: token_cache.invalidate(**lookup))
+
+
+@receiver(post_save, sender=Token)
+@receiver(post_delete, sender=Token)
+def token_changed(sender, instance, **kwargs):
+    _invalidate_tokens(key=instance.key)
+
+
+@receiver(post_save, sender=get_user_model())
+def user_changed(sender, instance, created, update_fields=None, **kwargs):
+    # Вхід через сесію оновлює лише last_login, кешованих токенів це не стосується
+    if created or (update_fields is not None and set(update_fields) <= {'last_login'}):
+        return
+    _invalidate_tokens(user_id=instance.pk)
+
+
+@receiver(post_delete, sender=get_user_model())
+def user_deleted(sender, instance, **kwargs):
+    _invalidate_tokens(user_id=instance.pk)
+
+
+@receiver(post_delete, sender=Player)
+def player_deleted(sender, instance, **kwargs):
+    _invalidate_tokens(user_id=instance.user_id)
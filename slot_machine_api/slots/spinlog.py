@@ -0,0 +1,247 @@
+import atexit
+import logging
+import queue
+import threading
+import time
+
+from django.conf import settings
+from django.db import InterfaceError, OperationalError, close_old_connections, connection
+
+logger = logging.getLogger(__name__)
+
+# --- Налаштування відкладеного запису спінів ---
+DEFAULT_WRITE_BEHIND = {
+    'ENABLED': False,
+    'MAX_QUEUE': 10000,  # spins waiting to be written before backpressure applies
+    'BATCH_SIZE': 500,  # flush once this many spins are queued...
+    'FLUSH_INTERVAL_MS': 50,  # ...or after this long, whichever comes first
+    'OVERFLOW': 'sync',  # when the queue is full: 'sync' write inline, 'block' wait, 'drop' discard
+    'BLOCK_TIMEOUT_MS': 1000,  # how long 'block' waits before falling back to an inline write
+}
+OVERFLOW_POLICIES = ('sync', 'block', 'drop')
+WRITE_ATTEMPTS = 6  # tries of a batch insert that failed on a transient error (locked or lost database)
+RETRY_BACKOFF = 0.05  # seconds before the first retry, doubled after each one
+TRANSIENT_ERRORS = (OperationalError, InterfaceError)
+
+
+def write_behind_settings():
+    return {**DEFAULT_WRITE_BEHIND, **getattr(settings, 'SLOTS_SPIN_WRITE_BEHIND', {})}
+
+
+class SpinWriter:
+    """Buffers Spin audit records and inserts them with bulk_create on a background thread.
+
+    Balance updates stay synchronous in play_spin; only the Spin insert is
+    deferred, so a crash can lose at most the queued audit rows. A batch that
+    fails on a transient error is retried with backoff; one that still fails
+    is inserted row by row, so only rows the database rejects are lost, and
+    each of them is logged in full. Call flush() to wait for everything
+    queued so far; stop() flushes and ends the thread.
+    """
+
+    def __init__(self, max_queue=10000, batch_size=500, flush_interval=0.05,
+                 overflow='sync', block_timeout=1.0):
+        if overflow not in OVERFLOW_POLICIES:
+            raise ValueError(f'Unknown overflow policy {overflow!r}, expected one of {OVERFLOW_POLICIES}')
+        self.queue = queue.Queue(maxsize=max_queue)
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.overflow = overflow
+        self.block_timeout = block_timeout
+        self._thread = None
+        self._start_lock = threading.Lock()
+        self._stopping = threading.Event()
+        self._metrics_lock = threading.Lock()
+        self.written = 0
+        self.dropped = 0
+        self.written_inline = 0
+        self.failed = 0
+        self.retries = 0
+        self.flushes = 0
+        self.flush_seconds_total = 0.0
+        self.flush_seconds_max = 0.0
+
+    def start(self):
+        with self._start_lock:
+            if self._thread is None or not self._thread.is_alive():
+                self._stopping.clear()
+                self._thread = threading.Thread(target=self._run, name='spin-writer', daemon=True)
+                self._thread.start()
+
+    def submit(self, spin):
+        """Queue an unsaved Spin for insertion, applying the overflow policy when full."""
+        self.start()
+        try:
+            self.queue.put_nowait(spin)
+            return
+        except queue.Full:
+            pass
+        if self.overflow == 'block':
+            try:
+                self.queue.put(spin, timeout=self.block_timeout)
+                return
+            except queue.Full:
+                pass
+        elif self.overflow == 'drop':
+            with self._metrics_lock:
+                self.dropped += 1
+            logger.warning('Spin write-behind queue full, dropped spin %s', spin.id)
+            return
+        spin.save(force_insert=True)
+        with self._metrics_lock:
+            self.written_inline += 1
+
+    def offer(self, spin):
+        """Non-blocking submit for async callers.
+
+        Returns False when the queue is full and the policy is not 'drop'; the
+        caller must then insert the spin itself.
+        """
+        self.start()
+        try:
+            self.queue.put_nowait(spin)
+            return True
+        except queue.Full:
+            pass
+        with self._metrics_lock:
+            if self.overflow == 'drop':
+                self.dropped += 1
+                return True
+            self.written_inline += 1
+        return False
+
+    def flush(self, timeout=None):
+        """Block until every spin queued before this call has been written."""
+        if self._thread is None:
+            return True
+        deadline = None if timeout is None else time.monotonic() + timeout
+        with self.queue.all_tasks_done:
+            while self.queue.unfinished_tasks:
+                remaining = None if deadline is None else deadline - time.monotonic()
+                if remaining is not None and remaining <= 0:
+                    return False
+                self.queue.all_tasks_done.wait(remaining)
+        return True
+
+    def stop(self, timeout=None):
+        """Flush the queue and stop the background thread."""
+        if self._thread is None:
+            return
+        self._stopping.set()
+        self._thread.join(timeout)
+
+    def metrics(self):
+        with self._metrics_lock:
+            return {
+                'queue_depth': self.queue.qsize(),
+                'queue_capacity': self.queue.maxsize,
+                'written': self.written,
+                'written_inline': self.written_inline,
+                'dropped': self.dropped,
+                'failed': self.failed,
+                'retries': self.retries,
+                'flushes': self.flushes,
+                'flush_seconds_total': self.flush_seconds_total,
+                'flush_seconds_max': self.flush_seconds_max,
+            }
+
+    def _collect(self):
+        batch = []
+        deadline = time.monotonic() + self.flush_interval
+        while len(batch) < self.batch_size:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            try:
+                batch.append(self.queue.get(timeout=remaining))
+            except queue.Empty:
+                break
+        return batch
+
+    def _run(self):
+        try:
+            while True:
+                batch = self._collect()
+                if batch:
+                    self._write(batch)
+                elif self._stopping.is_set():
+                    break
+        finally:
+            connection.close()
+
+    def _with_retries(self, insert):
+        delay = RETRY_BACKOFF
+        for attempt in range(1, WRITE_ATTEMPTS + 1):
+            try:
+                return insert()
+            except TRANSIENT_ERRORS as exc:
+                if attempt == WRITE_ATTEMPTS:
+                    raise
+                logger.warning('Spin write failed (%s), retrying in %.2fs', exc, delay)
+                with self._metrics_lock:
+                    self.retries += 1
+                time.sleep(delay)
+                delay *= 2
+                close_old_connections()  # зламане з'єднання перевідкривається при наступній спробі
+
+    def _insert_rows(self, batch):
+        """Insert spins one at a time, retrying transient errors; returns how many were rejected."""
+        failed = 0
+        for spin in batch:
+            try:
+                self._with_retries(lambda: spin.save(force_insert=True))
+            except Exception:
+                failed += 1
+                logger.exception(
+                    'Failed to write spin %s (game %s, bet %s, payout %s, at %s, rng %s/%s)',
+                    spin.id, spin.game_id, spin.bet_amount, spin.payout, spin.timestamp,
+                    spin.rng_seed, spin.rng_position,
+                )
+        return failed
+
+    def _write(self, batch):
+        from .models import Spin
+        close_old_connections()
+        started = time.perf_counter()
+        failed = 0
+        try:
+            try:
+                self._with_retries(lambda: Spin.objects.bulk_create(batch))
+            except Exception:
+                # bulk_create атомарний: після помилки жоден рядок пакета не записано
+                logger.exception('Bulk insert of %d queued spins failed, inserting them one by one', len(batch))
+                failed = self._insert_rows(batch)
+            elapsed = time.perf_counter() - started
+            with self._metrics_lock:
+                self.written += len(batch) - failed
+                self.failed += failed
+                self.flushes += 1
+                self.flush_seconds_total += elapsed
+                self.flush_seconds_max = max(self.flush_seconds_max, elapsed)
+        finally:
+            for _ in batch:
+                self.queue.task_done()
+
+
+_writer = None
+_writer_lock = threading.Lock()
+
+
+def get_spin_writer():
+    """Process-wide SpinWriter configured from SLOTS_SPIN_WRITE_BEHIND, or None if disabled."""
+    global _writer
+    config = write_behind_settings()
+    if not config['ENABLED']:
+        return None
+    if _writer is None:
+        with _writer_lock:
+            if _writer is None:
+                _writer = SpinWriter(
+                    max_queue=config['MAX_QUEUE'],
+                    batch_size=config['BATCH_SIZE'],
+                    flush_interval=config['FLUSH_INTERVAL_MS'] / 1000,
+                    overflow=config['OVERFLOW'],
+                    block_timeout=config['BLOCK_TIMEOUT_MS'] / 1000,
+                )
+                atexit.register(_writer.stop)
+    return _writer
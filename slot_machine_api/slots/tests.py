@@ -1,19 +1,95 @@
-from django.test import TestCase
+from django.test import TestCase, TransactionTestCase, override_settings
+from django.test.utils import CaptureQueriesContext
 from django.contrib.auth.models import User
+from django.conf import settings
+from django.core.management import CommandError, call_command
+from django.utils import timezone
+from django.core.cache import cache
+from django.apps import apps
+from django.db import OperationalError, connection, connections, transaction
+from django.db.backends.sqlite3.base import DatabaseWrapper
+from rest_framework.authtoken.models import Token
 from rest_framework.test import APIClient
 from rest_framework import status
 from decimal import Decimal
-from .models import Player, Symbol, Game, Spin
-from .services import SlotMachineService, ReelService
+from collections import Counter
+from contextlib import redirect_stdout
+from fractions import Fraction
+from io import StringIO
+from itertools import islice, permutations, product
+from datetime import timedelta
+from unittest import mock
+import csv
+import gzip
+import json
+import math
+import os
+import re
+import tempfile
+import threading
+import time
+import uuid
+import numpy as np
+from asgiref.sync import async_to_sync
+from .models import Player, Symbol, Game, Spin, ArchivedSpin, LeaderboardEntry, ReelWeight, CounterShard, JackpotAward
+from .services import DEFAULT_NUM_REELS, MAX_BATCH_SPINS, GameSessionService, SlotMachineService, ReelService
+from .paytable import Paytable, PaytableSymbol, get_paytable, invalidate_paytable
+from .rtp import exact_rtp, simulate_rtp
+from .encoding import pack_spin, unpack_spin
+from .serializers import SpinSerializer
+from .spinlog import SpinWriter, get_spin_writer
+from .rng import RNG_BLOCK_SIZE, SpinStream, replay_spin
+from . import leaderboard, metrics
+from .paylines import compile_paylines, straight_rows
+from .jackpot import JACKPOT_POOL, Jackpot, ShardedCounter
+from .authentication import CachedToken, TokenCache, get_token_cache
+from .database import (
+    DEFAULT_DATABASE, ReadReplicaRouter, check_pin_cache, primary_reads, read_alias_for, replica_reads,
+)
+from .throttling import TokenBuckets, get_concurrency_limiter, reset_throttles
+
+class SlotsFixtureMixin:
+    """The player and symbols most tests play with, created in setUp().
+
+    username names self.user and self.player (None creates neither) and
+    symbols lists the (name, payout multiplier) pairs of the paytable.
+    """
+    username = None
+    symbols = (('Cherry', '2.5'), ('Lemon', '1.5'), ('Diamond', '3.0'))
+    SEVEN = ('Seven', '5.0')
+
+    def setUp(self):
+        super().setUp()
+        # Стан процесу переживає відкат бази між тестами
+        leaderboard._leaderboard = None
+        reset_throttles()
+        for name, multiplier in self.symbols:
+            Symbol.objects.create(name=name, image_path=f'{name}.png', payout_multiplier=Decimal(multiplier))
+        if self.username:
+            self.player = self.create_player(self.username)
+            self.user = self.player.user
+
+    @staticmethod
+    def create_player(username, balance='1000.00'):
+        user = User.objects.create_user(username=username, password='testpass')
+        return Player.objects.create(user=user, balance=Decimal(balance))
+
+    @staticmethod
+    def query_plan(queries, table):
+        """SQLite's EXPLAIN QUERY PLAN of the first captured SELECT from table, as one string."""
+        sql = next(query['sql'] for query in queries if query['sql'].startswith('SELECT') and f'FROM "{table}"' in query['sql'])
+        with connection.cursor() as cursor:
+            cursor.execute(f'EXPLAIN QUERY PLAN {sql}')
+            return ' '.join(str(row) for row in cursor.fetchall())
+
+
+class SlotMachineTests(SlotsFixtureMixin, TestCase):
+    username = 'testuser'
 
-class SlotMachineTests(TestCase):
     def setUp(self):
         """Set up test user, player, and at least 3 symbols for all tests."""
-        self.user = User.objects.create_user(username='testuser', password='testpass')
-        self.player = Player.objects.create(user=self.user, balance=Decimal('1000.00'))
-        self.symbol1 = Symbol.objects.create(name='Cherry', image_path='cherry.png', payout_multiplier=Decimal('2.5'))
-        self.symbol2 = Symbol.objects.create(name='Lemon', image_path='lemon.png', payout_multiplier=Decimal('1.5'))
-        self.symbol3 = Symbol.objects.create(name='Diamond', image_path='diamond.png', payout_multiplier=Decimal('3.0'))
+        super().setUp()
+        self.symbol1, self.symbol2, self.symbol3 = Symbol.objects.order_by('id')
         self.client = APIClient()
 
     def test_registration_api(self):
@@ -45,7 +121,7 @@ class SlotMachineTests(TestCase):
     def test_spin_str(self):
         """Test string representation of Spin."""
         game = Game.objects.create(player=self.player)
-        spin = Spin.objects.create(game=game, bet_amount=Decimal('10.00'), payout=Decimal('0.00'), result={})
+        spin = Spin.objects.create(game=game, player=self.player, bet_amount=Decimal('10.00'), payout=Decimal('0.00'), result={})
         self.assertIn('Spin', str(spin))
 
     def test_slot_machine_service_insufficient_balance(self):
@@ -95,3 +171,1367 @@ class SlotMachineTests(TestCase):
         self.player.refresh_from_db()
         expected_balance = start_balance - Decimal('10.00') + Decimal(str(response.data['payout']))
         self.assertEqual(self.player.balance, expected_balance)
+
+    @staticmethod
+    def _statement(sql):
+        """(verb, table) of a captured query, e.g. ('INSERT', 'slots_spin')."""
+        table = re.search(r'(?:FROM|INTO|UPDATE) "(\w+)"', sql)
+        return sql.split(None, 1)[0], table and table.group(1)
+
+    def test_batch_spin_api_single_balance_update(self):
+        """Test batch endpoint plays all spins with one balance update and bulk spin inserts."""
+        self.client.force_authenticate(user=self.user)
+        get_paytable()  # loaded once per paytable version, not per request
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.post('/api/spins/batch/', {'bet_size': '1.00', 'count': 100}, format='json')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(len(response.data['spins']), 100)
+        statements = [self._statement(query['sql']) for query in queries]
+        # Спіни беруться з буфера RNG без запитів; таблиця лідерів перевіряється окремо
+        leaderboard_rows = [statement for statement in statements if statement[1] == 'slots_leaderboardentry']
+        self.assertEqual(leaderboard_rows, [
+            ('INSERT', 'slots_leaderboardentry'), ('UPDATE', 'slots_leaderboardentry'),
+            ('SELECT', 'slots_leaderboardentry'),
+        ])
+        spin_inserts = math.ceil(100 / connection.ops.bulk_batch_size(Spin._meta.concrete_fields, [None] * 100))
+        self.assertEqual([statement for statement in statements if statement[1] != 'slots_leaderboardentry'], [
+            ('SELECT', 'slots_player'),  # request_player
+            ('SELECT', 'slots_player'),  # balance check before drawing the spins
+            ('SAVEPOINT', None),
+            ('UPDATE', 'slots_player'),  # the single balance update
+            ('SELECT', 'slots_player'),  # settled fields read back
+            ('INSERT', 'slots_game'),  # the first spin starts a game session
+            ('UPDATE', 'slots_player'),
+            *[('INSERT', 'slots_spin')] * spin_inserts,
+            ('UPDATE', 'slots_game'),  # the game's running totals
+            ('RELEASE', None),
+        ])
+        self.player.refresh_from_db()
+        total_won = sum(Decimal(str(spin['payout'])) for spin in response.data['spins'])
+        self.assertEqual(self.player.balance, Decimal('1000.00') - Decimal('100.00') + total_won)
+        self.assertEqual(self.player.total_wager, Decimal('100.00'))
+        self.assertEqual(Spin.objects.filter(game__player=self.player).count(), 100)
+
+    def test_batch_spin_stops_on_stop_loss(self):
+        """Test autoplay stops once the net loss reaches stop_loss."""
+        Symbol.objects.update(payout_multiplier=Decimal('0.00'))
+        invalidate_paytable()
+        result = SlotMachineService().play_batch(self.player, Decimal('1.00'), 50, stop_loss=Decimal('3.00'))
+        self.assertTrue(result['success'])
+        self.assertEqual(result['stop_reason'], 'stop_loss')
+        self.assertEqual(len(result['spins']), 3)
+        self.player.refresh_from_db()
+        self.assertEqual(self.player.balance, Decimal('997.00'))
+
+    def test_history_cursor_pagination_and_filters(self):
+        """Test history pages follow the cursor without gaps and honour filters."""
+        game = Game.objects.create(player=self.player)
+        for i in range(5):
+            Spin.objects.create(game=game, player=self.player, bet_amount=Decimal('1.00'), payout=Decimal(i % 2), result={})
+        self.client.force_authenticate(user=self.user)
+        seen = []
+        url = '/api/spins/history/?page_size=2'
+        while url:
+            response = self.client.get(url)
+            self.assertEqual(response.status_code, status.HTTP_200_OK)
+            self.assertLessEqual(len(response.data['results']), 2)
+            seen.extend(spin['id'] for spin in response.data['results'])
+            url = response.data['next']
+        expected = list(Spin.objects.order_by('-timestamp', '-id').values_list('id', flat=True))
+        self.assertEqual(seen, [str(pk) for pk in expected])
+
+        response = self.client.get('/api/spins/history/?winning_only=true')
+        self.assertEqual(len(response.data['results']), 2)
+        response = self.client.get('/api/spins/history/?since=2000-01-01T00:00:00Z&until=2000-01-02T00:00:00Z')
+        self.assertEqual(response.data['results'], [])
+        response = self.client.get('/api/spins/history/?cursor=not-a-cursor')
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+
+    def test_history_reads_the_player_indexes(self):
+        """Test history across games and winning_only are served by the per-player spin indexes."""
+        self.client.force_authenticate(user=self.user)
+        for url, index in (('/api/spins/history/', 'slots_spin_player_ts_idx'),
+                           ('/api/spins/history/?winning_only=true', 'slots_spin_player_win_idx')):
+            with CaptureQueriesContext(connection) as queries:
+                self.client.get(url)
+            self.assertIn(index, self.query_plan(queries, 'slots_spin'))
+
+    def test_games_list_returns_aggregates_not_spins(self):
+        """Test games list reports per-game totals and spins move to a sub-resource."""
+        game = Game.objects.create(player=self.player)
+        for bet, payout in (('2.00', '5.00'), ('3.00', '0.00')):
+            spin = Spin.objects.create(game=game, player=self.player, bet_amount=Decimal(bet), payout=Decimal(payout), result={})
+            GameSessionService.count_spins(game.pk, 1, spin.bet_amount, spin.payout, spin.timestamp)
+        Game.objects.create(player=self.player)
+        self.client.force_authenticate(user=self.user)
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get('/api/games/')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(len(queries), 1)
+        games = {row['id']: row for row in response.data}
+        summary = games[str(game.id)]
+        self.assertNotIn('spins', summary)
+        self.assertEqual(summary['spin_count'], 2)
+        self.assertEqual(Decimal(summary['total_wagered']), Decimal('5.00'))
+        self.assertEqual(Decimal(summary['total_paid']), Decimal('5.00'))
+        self.assertIsNotNone(summary['last_spin_at'])
+
+        response = self.client.get(f'/api/games/{game.id}/spins/?page_size=1')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(len(response.data['results']), 1)
+        self.assertIsNotNone(response.data['next'])
+
+
+class PaytableCacheTests(SlotsFixtureMixin, TestCase):
+    username = 'cacheuser'
+
+    def test_paytable_is_cached_between_spins(self):
+        """Test a warm paytable costs no Symbol queries for spin and payout."""
+        get_paytable()
+        with self.assertNumQueries(0):
+            reel_service = SlotMachineService().reel_service
+            win_data = reel_service.check_wins({i: ['Cherry', 'Lemon', 'Diamond'] for i in range(5)})
+            payout = reel_service.calculate_payout(win_data, Decimal('1.00'))
+        self.assertEqual(payout, Decimal('35.00'))
+
+    def test_symbol_save_and_delete_invalidate_paytable(self):
+        """Test saving or deleting a Symbol publishes a new snapshot."""
+        before = get_paytable()
+        symbol = Symbol.objects.get(name='Cherry')
+        symbol.payout_multiplier = Decimal('10.00')
+        symbol.save()
+        after = get_paytable()
+        self.assertNotEqual(before.version, after.version)
+        self.assertEqual(after.by_name['Cherry'].payout_multiplier, Decimal('10.00'))
+        self.assertEqual(after.by_id[symbol.id].name, 'Cherry')
+        symbol.delete()
+        self.assertNotIn('Cherry', get_paytable().by_name)
+
+    def test_paytable_is_invalidated_again_on_commit(self):
+        """Test a snapshot loaded before the change commits is replaced once it does."""
+        with self.captureOnCommitCallbacks(execute=True):
+            Symbol.objects.get(name='Lemon').save()
+            during = get_paytable()
+        self.assertNotEqual(get_paytable().version, during.version)
+
+
+class BatchEngineTests(SlotsFixtureMixin, TestCase):
+    symbols = SlotsFixtureMixin.symbols + (SlotsFixtureMixin.SEVEN,)
+
+    def setUp(self):
+        super().setUp()
+        self.reel_service = ReelService(Symbol.objects.all())
+
+    def test_generate_spins_shape_and_distinct_reels(self):
+        """Test a batch has shape (N, reels, rows) with distinct symbols per reel."""
+        spins = self.reel_service.generate_spins(1000, rng=np.random.default_rng(7))
+        self.assertEqual(spins.shape, (1000, 5, 3))
+        sorted_reels = np.sort(spins, axis=-1)
+        self.assertTrue((sorted_reels[..., 1:] != sorted_reels[..., :-1]).all())
+
+    def test_vectorized_wins_match_row_scan(self):
+        """Test vectorized run detection agrees with _row_wins on every 5-symbol row."""
+        names = ['Cherry', 'Lemon', 'Diamond']
+        rows = list(product(names, repeat=5))
+        lines = np.array([[self.reel_service.paytable.codes[n] for n in row] for row in rows])
+        symbols, starts, lengths = ReelService.find_runs(lines)
+        for row, code, start, length in zip(rows, symbols, starts, lengths):
+            expected = self.reel_service._row_wins(list(row))
+            if not expected:
+                self.assertEqual(length, 0)
+                continue
+            sym, indices = expected[0]
+            self.assertEqual(self.reel_service.paytable.names[code], sym)
+            self.assertEqual(list(range(start, start + length)), indices)
+
+    def test_check_wins_matches_legacy_row_scan(self):
+        """Test the per-spin wrapper matches flip_horizontal plus _row_wins."""
+        spins = self.reel_service.generate_spins(200, rng=np.random.default_rng(11))
+        for spin in spins:
+            result = self.reel_service.decode_spin(spin)
+            expected = {}
+            for idx, row in enumerate(ReelService.flip_horizontal(result)):
+                row_wins = self.reel_service._row_wins(row)
+                if row_wins:
+                    expected[idx + 1] = row_wins[0]
+            self.assertEqual(self.reel_service.check_wins(result), expected or None)
+
+    def test_row_outcome_table_matches_row_scan_on_every_row(self):
+        """Property test: the lookup table agrees with _row_wins for all symbols ** reels rows."""
+        paytable = self.reel_service.paytable
+        weights, symbols, starts, lengths = self.reel_service.row_outcome_table(5)
+        self.assertEqual(len(lengths), len(paytable) ** 5)
+        for row in product(range(len(paytable)), repeat=5):
+            index = int(np.dot(row, weights))
+            expected = self.reel_service._row_wins([paytable.names[code] for code in row])
+            if not expected:
+                self.assertEqual(lengths[index], 0)
+                continue
+            sym, indices = expected[0]
+            self.assertEqual(paytable.names[symbols[index]], sym)
+            self.assertEqual(list(range(starts[index], starts[index] + lengths[index])), indices)
+
+    def test_row_outcome_table_rebuilt_per_paytable_version(self):
+        """Test the table is cached on the snapshot and rebuilt after a symbol change."""
+        reel_service = ReelService(get_paytable())
+        table = reel_service.row_outcome_table(5)
+        self.assertIs(ReelService(get_paytable()).row_outcome_table(5), table)
+        Symbol.objects.create(name='Bell', image_path='bell.png', payout_multiplier=Decimal('4.0'))
+        rebuilt = ReelService(get_paytable()).row_outcome_table(5)
+        self.assertEqual(len(rebuilt[3]), 5 ** 5)
+
+    def test_evaluate_wins_falls_back_without_table(self):
+        """Test rows too large for the table use the run scan with the same result."""
+        spins = self.reel_service.generate_spins(300, num_reels=11, rng=np.random.default_rng(3))
+        self.assertIsNone(self.reel_service.row_outcome_table(11))
+        for got, expected in zip(self.reel_service.evaluate_wins(spins),
+                                 ReelService.find_runs(spins.transpose(0, 2, 1))):
+            self.assertTrue((got == expected).all())
+
+
+class SimulationTests(SlotsFixtureMixin, TestCase):
+    def test_simulation_is_reproducible_and_offline(self):
+        """Test a seeded simulation repeats exactly and never queries the database."""
+        paytable = get_paytable()
+        with self.assertNumQueries(0):
+            first = simulate_rtp(paytable, 20000, seed=42)
+            second = simulate_rtp(paytable, 20000, seed=42)
+        self.assertEqual(first.histogram, second.histogram)
+        self.assertEqual(first.spins, 20000)
+        self.assertAlmostEqual(sum(rtp for rtp, _ in first.symbol_contributions().values()), first.rtp)
+        low, high = first.rtp_interval()
+        self.assertLess(low, first.rtp)
+        self.assertGreater(high, first.rtp)
+
+    def test_exact_rtp_matches_brute_force_enumeration(self):
+        """Test the exact engine against payouts of every grid on a small machine."""
+        paytable = get_paytable()
+        reel_service = ReelService(paytable)
+        outcomes = Counter()
+        hits = 0
+        columns = list(permutations(paytable.names, 2))
+        for grid in product(columns, repeat=4):
+            win_data = reel_service.check_wins({reel: list(column) for reel, column in enumerate(grid)})
+            outcomes[reel_service.calculate_payout(win_data, 1)] += 1
+            hits += win_data is not None
+        total = len(columns) ** 4
+        result = exact_rtp(paytable, num_reels=4, visible_rows=2)
+        expected = {Fraction(payout): Fraction(count, total) for payout, count in outcomes.items()}
+        self.assertEqual(result.distribution, expected)
+        self.assertEqual(result.hit_probability, Fraction(hits, total))
+        self.assertEqual(sum(result.symbol_contributions().values()), result.rtp)
+
+
+class ConcurrentBalanceTests(SlotsFixtureMixin, TransactionTestCase):
+    username = 'racer'
+
+    def test_stale_player_objects_do_not_lose_updates(self):
+        """Test spins settled from stale in-memory players all reach the database."""
+        first = Player.objects.get(pk=self.player.pk)
+        second = Player.objects.get(pk=self.player.pk)
+        service = SlotMachineService()
+        payouts = [
+            service.play_spin(first, Decimal('10.00'))['payout'],
+            service.play_spin(second, Decimal('10.00'))['payout'],
+        ]
+        self.player.refresh_from_db()
+        self.assertEqual(self.player.balance, Decimal('980.00') + sum(payouts))
+        self.assertEqual(self.player.total_wager, Decimal('20.00'))
+
+    def test_concurrent_spins_keep_ledger_consistent(self):
+        """Stress test: threads spinning for one player never lose or overdraw balance."""
+        self.player.balance = Decimal('200.00')
+        self.player.save()
+        errors = []
+
+        def retry_locked(func, *args):
+            # The shared in-memory SQLite test database reports contention
+            # immediately instead of waiting; play_spin is atomic, so a failed
+            # attempt rolls back and can simply be retried.
+            while True:
+                try:
+                    return func(*args)
+                except OperationalError as exc:
+                    if 'locked' not in str(exc):
+                        raise
+
+        def worker():
+            from django.db import connection as thread_connection
+            try:
+                service = retry_locked(SlotMachineService)
+                player = retry_locked(lambda: Player.objects.get(pk=self.player.pk))
+                for _ in range(25):
+                    retry_locked(service.play_spin, player, Decimal('5.00'))
+            except Exception as exc:  # pragma: no cover - surfaced via assertion below
+                errors.append(exc)
+            finally:
+                thread_connection.close()
+
+        threads = [threading.Thread(target=worker) for _ in range(8)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        self.assertEqual(errors, [])
+
+        self.player.refresh_from_db()
+        spins = Spin.objects.filter(game__player=self.player)
+        wagered = sum((spin.bet_amount for spin in spins), Decimal('0.00'))
+        won = sum((spin.payout for spin in spins), Decimal('0.00'))
+        self.assertEqual(self.player.total_wager, wagered)
+        self.assertEqual(self.player.total_won, won)
+        self.assertEqual(self.player.balance, Decimal('200.00') - wagered + won)
+        self.assertGreaterEqual(self.player.balance, Decimal('0.00'))
+
+
+class CompactSpinStorageTests(SlotsFixtureMixin, TestCase):
+    username = 'packer'
+
+    def setUp(self):
+        super().setUp()
+        self.game = Game.objects.create(player=self.player)
+
+    def test_pack_round_trip_is_much_smaller(self):
+        """Test the packed format decodes to the stored JSON shape at a fraction of the size."""
+        result = {i: ['Cherry', 'Lemon', 'Diamond'] for i in range(5)}
+        win_data = ReelService(get_paytable()).check_wins(result)
+        packed = pack_spin(result, win_data)
+        spin = Spin.objects.create(game=self.game, player=self.player, bet_amount=Decimal('1.00'), result=result, win_data=win_data)
+        spin.refresh_from_db()
+        self.assertEqual(unpack_spin(packed), (spin.result, spin.win_data))
+        self.assertLess(len(packed) * 4, len(json.dumps(spin.result)) + len(json.dumps(spin.win_data)))
+
+    @override_settings(SLOTS_COMPACT_SPIN_STORAGE=True)
+    def test_compact_spins_serialize_like_json_spins(self):
+        """Test packed spins render the same API shape and the backfill command converts both ways."""
+        response = SlotMachineService().play_spin(self.player, Decimal('1.00'))
+        spin = Spin.objects.get(pk=response['spin_id'])
+        self.assertIsNone(spin.result)
+        packed_data = SpinSerializer(spin).data
+        call_command('compact_spins', '--expand', stdout=StringIO())
+        spin.refresh_from_db()
+        self.assertIsNone(spin.packed)
+        self.assertEqual(SpinSerializer(spin).data, packed_data)
+        call_command('compact_spins', stdout=StringIO())
+        spin.refresh_from_db()
+        self.assertIsNone(spin.result)
+        self.assertEqual(SpinSerializer(spin).data, packed_data)
+
+    def test_compact_spins_skips_spins_with_deleted_symbols(self):
+        """Test the backfill leaves spins showing a renamed or deleted symbol in their current format."""
+        grid = {'0': ['Cherry', 'Lemon', 'Diamond']}
+        ghost = Symbol.objects.create(name='Ghost', image_path='Ghost.png', payout_multiplier=Decimal('1.0'))
+        fields = {'game': self.game, 'player': self.player, 'bet_amount': Decimal('1.00')}
+        packed = Spin.objects.create(packed=pack_spin({'0': ['Ghost', 'Lemon', 'Diamond']}, {}, get_paytable()), **fields)
+        stale = Spin.objects.create(result={'0': ['Ghost', 'Lemon', 'Diamond']}, win_data={}, **fields)
+        plain = Spin.objects.create(result=grid, win_data={}, **fields)
+        ghost.delete()
+
+        output = StringIO()
+        call_command('compact_spins', stdout=output)
+        call_command('compact_spins', '--expand', stdout=output)
+        self.assertIn('Left 1 spins unchanged', output.getvalue())
+        packed.refresh_from_db()
+        stale.refresh_from_db()
+        plain.refresh_from_db()
+        self.assertIsNone(packed.result)
+        self.assertIsNotNone(packed.packed)
+        self.assertEqual(stale.result, {'0': ['Ghost', 'Lemon', 'Diamond']})
+        self.assertIsNone(stale.packed)
+        self.assertEqual(plain.result, grid)
+
+
+class AsyncSpinTests(SlotsFixtureMixin, TestCase):
+    username = 'asyncuser'
+
+    def setUp(self):
+        super().setUp()
+        self.token = Token.objects.create(user=self.user)
+        self.headers = {'Authorization': f'Token {self.token.key}'}
+
+    async def test_aplay_spin_updates_balance(self):
+        """Test the async service settles the spin like play_spin."""
+        service = await SlotMachineService.acreate()
+        result = await service.aplay_spin(self.player, Decimal('10.00'))
+        self.assertTrue(result['success'])
+        await self.player.arefresh_from_db()
+        self.assertEqual(self.player.balance, Decimal('990.00') + result['payout'])
+        self.assertTrue(await Spin.objects.filter(pk=result['spin_id']).aexists())
+
+    async def test_async_spin_and_player_endpoints(self):
+        """Test the async endpoints authenticate by token and return the DRF shapes."""
+        response = await self.async_client.post(
+            '/api/async/spins/spin/', {'bet_size': '10.00'},
+            content_type='application/json', headers=self.headers,
+        )
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        payout = Decimal(response.json()['payout'])
+        response = await self.async_client.get('/api/async/players/me/', headers=self.headers)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.json()['user']['username'], 'asyncuser')
+        self.assertEqual(Decimal(response.json()['balance']), Decimal('990.00') + payout)
+
+    async def test_async_spin_rejects_anonymous_and_invalid_bets(self):
+        """Test the async spin endpoint requires credentials and validates the bet."""
+        response = await self.async_client.post('/api/async/spins/spin/', {'bet_size': '1.00'},
+                                                 content_type='application/json')
+        self.assertEqual(response.status_code, status.HTTP_401_UNAUTHORIZED)
+        response = await self.async_client.post('/api/async/spins/spin/', {'bet_size': '0'},
+                                                 content_type='application/json', headers=self.headers)
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertIn('bet_size', response.json())
+
+
+class WriteBehindSpinLogTests(SlotsFixtureMixin, TransactionTestCase):
+    username = 'writer'
+
+    def setUp(self):
+        super().setUp()
+        self.game = Game.objects.create(player=self.player)
+
+    def _spin(self):
+        return Spin(game=self.game, player=self.player, bet_amount=Decimal('1.00'), result={})
+
+    def test_writer_flushes_in_batches(self):
+        """Test queued spins are bulk inserted and flush waits for them."""
+        writer = SpinWriter(batch_size=10, flush_interval=0.01)
+        spins = [self._spin() for _ in range(25)]
+        for spin in spins:
+            writer.submit(spin)
+        self.assertTrue(writer.flush(timeout=5))
+        writer.stop(timeout=5)
+        self.assertEqual(Spin.objects.count(), 25)
+        metrics = writer.metrics()
+        self.assertEqual(metrics['written'], 25)
+        self.assertEqual(metrics['queue_depth'], 0)
+        self.assertGreaterEqual(metrics['flushes'], 3)
+
+    def test_full_queue_applies_overflow_policy(self):
+        """Test a full queue drops or writes inline according to the policy."""
+        dropping = SpinWriter(max_queue=1, overflow='drop')
+        dropping.start = lambda: None  # keep the queue full: no background consumer
+        dropping.submit(self._spin())
+        dropping.submit(self._spin())
+        self.assertEqual(dropping.metrics()['dropped'], 1)
+
+        inline = SpinWriter(max_queue=1, overflow='sync')
+        inline.start = lambda: None
+        inline.submit(self._spin())
+        inline.submit(self._spin())
+        self.assertEqual(inline.metrics()['written_inline'], 1)
+        self.assertEqual(Spin.objects.count(), 1)
+
+    def test_play_spin_queues_record_but_settles_balance_synchronously(self):
+        """Test write-behind mode defers the Spin insert, not the balance update."""
+        config = {'ENABLED': True, 'BATCH_SIZE': 5, 'FLUSH_INTERVAL_MS': 10}
+        with override_settings(SLOTS_SPIN_WRITE_BEHIND=config):
+            result = SlotMachineService().play_spin(self.player, Decimal('10.00'))
+            self.player.refresh_from_db()
+            self.assertEqual(self.player.balance, Decimal('990.00') + result['payout'])
+            self.assertTrue(get_spin_writer().flush(timeout=5))
+        self.assertTrue(Spin.objects.filter(pk=result['spin_id']).exists())
+
+    def test_spins_are_queued_on_commit_with_their_play_time(self):
+        """Test a rolled-back spin is never written and a queued spin keeps the time it was played."""
+        config = {'ENABLED': True, 'BATCH_SIZE': 5, 'FLUSH_INTERVAL_MS': 10}
+        with override_settings(SLOTS_SPIN_WRITE_BEHIND=config):
+            with self.assertRaises(RuntimeError), transaction.atomic():
+                rolled_back = SlotMachineService().play_spin(self.player, Decimal('10.00'))
+                raise RuntimeError
+            played_at = timezone.now()
+            with transaction.atomic():
+                result = SlotMachineService().play_spin(self.player, Decimal('10.00'))
+                time.sleep(0.2)  # the spin is only queued once this commits
+            self.assertTrue(get_spin_writer().flush(timeout=5))
+        self.assertFalse(Spin.objects.filter(pk=rolled_back['spin_id']).exists())
+        self.assertLess(Spin.objects.get(pk=result['spin_id']).timestamp - played_at, timedelta(seconds=0.1))
+
+    def test_failed_batch_is_retried_and_only_bad_rows_are_lost(self):
+        """Test a transient error retries the batch and a rejected row doesn't take its batch with it."""
+        writer = SpinWriter(batch_size=10, flush_interval=0.01)
+        bulk_create = Spin.objects.bulk_create
+        calls = []
+
+        def locked_once(objs):
+            calls.append(len(objs))
+            if len(calls) == 1:
+                raise OperationalError('database is locked')
+            return bulk_create(objs)
+
+        with mock.patch('slots.spinlog.RETRY_BACKOFF', 0), mock.patch.object(Spin.objects, 'bulk_create', locked_once):
+            for spin in [self._spin() for _ in range(3)]:
+                writer.submit(spin)
+            self.assertTrue(writer.flush(timeout=5))
+            orphan = Spin(game_id=uuid.uuid4(), player=self.player, bet_amount=Decimal('1.00'), result={})
+            with self.assertLogs('slots.spinlog', 'ERROR'):
+                for spin in (self._spin(), orphan, self._spin()):
+                    writer.submit(spin)
+                self.assertTrue(writer.flush(timeout=5))
+        writer.stop(timeout=5)
+        self.assertEqual(Spin.objects.count(), 5)
+        self.assertEqual({key: writer.metrics()[key] for key in ('written', 'failed', 'retries')},
+                         {'written': 5, 'failed': 1, 'retries': 1})
+
+    def test_queued_spins_of_an_ended_game_count_in_its_summary(self):
+        """Test write-behind spins still queued when their game ends already count in its totals."""
+        writer = SpinWriter(batch_size=5, flush_interval=0.01)
+        writer.start = lambda: None  # hold the queue until the game has ended
+        with mock.patch('slots.services.get_spin_writer', return_value=writer):
+            results = [SlotMachineService().play_spin(self.player, Decimal('2.00')) for _ in range(3)]
+            game_id = GameSessionService.end(self.player)
+        self.assertEqual(Spin.objects.filter(game_id=game_id).count(), 0)
+        game = Game.objects.get(pk=game_id)
+        self.assertEqual((game.spin_count, game.total_wagered), (3, Decimal('6.00')))
+        self.assertEqual(game.total_won, sum(result['payout'] for result in results))
+        del writer.start
+        writer.start()
+        self.assertTrue(writer.flush(timeout=5))
+        writer.stop(timeout=5)
+        self.assertEqual(Spin.objects.filter(game_id=game_id).count(), 3)
+        self.assertEqual(Game.objects.values_list('spin_count', flat=True).get(pk=game_id), 3)
+
+
+class RngStreamTests(SlotsFixtureMixin, TestCase):
+    username = 'replayer'
+    symbols = SlotsFixtureMixin.symbols + (SlotsFixtureMixin.SEVEN,)
+
+    def setUp(self):
+        super().setUp()
+        self.reel_service = ReelService(get_paytable())
+
+    def test_stream_is_deterministic_across_block_boundaries(self):
+        """Test a seed yields the same spins however they are taken, and each replays."""
+        one_by_one = SpinStream(seed=99)
+        singles = [one_by_one.next_spins(self.reel_service, 1, 5, 3)[0][0] for _ in range(RNG_BLOCK_SIZE + 5)]
+        batched, seed, start = SpinStream(seed=99).next_spins(self.reel_service, RNG_BLOCK_SIZE + 5, 5, 3)
+        self.assertEqual((seed, start), (99, 0))
+        self.assertTrue((np.array(singles) == batched).all())
+        for position in (0, RNG_BLOCK_SIZE - 1, RNG_BLOCK_SIZE + 4):
+            replayed = replay_spin(self.reel_service, 99, position, 5, 3)
+            self.assertTrue((replayed == batched[position]).all())
+
+    def test_recorded_spin_replays_for_dispute_resolution(self):
+        """Test each Spin records seed and position, and replay_spin reproduces it."""
+        service = SlotMachineService(stream=SpinStream(seed=1234))
+        first = service.play_spin(self.player, Decimal('1.00'))
+        second = service.play_spin(self.player, Decimal('1.00'))
+        spin = Spin.objects.get(pk=second['spin_id'])
+        self.assertEqual((spin.rng_seed, spin.rng_position), (1234, 1))
+        self.assertNotIn('rng_seed', SpinSerializer(spin).data)
+        output = StringIO()
+        call_command('replay_spin', str(spin.id), stdout=output)
+        self.assertIn('matches', output.getvalue())
+        self.assertEqual(Spin.objects.get(pk=first['spin_id']).rng_position, 0)
+
+
+class MetricsTests(SlotsFixtureMixin, TestCase):
+    username = 'observer'
+
+    def setUp(self):
+        super().setUp()
+        self.token = Token.objects.create(user=self.user)
+
+    def _client(self):
+        client = APIClient()
+        client.credentials(HTTP_AUTHORIZATION=f'Token {self.token.key}')
+        return client
+
+    def test_disabled_metrics_are_hidden_and_stages_are_noops(self):
+        """Test the endpoint 404s and no timing header is added when metrics are off."""
+        client = self._client()
+        response = client.post('/api/spins/spin/', {'bet_size': '1.00'}, format='json')
+        self.assertNotIn('Server-Timing', response)
+        self.assertIs(metrics.stage('rng'), metrics.stage('wins'))
+        self.assertEqual(client.get('/api/metrics/').status_code, 404)
+
+    @override_settings(SLOTS_METRICS={'ENABLED': True})
+    def test_spin_records_stages_and_query_counts(self):
+        """Test a spin request feeds the stage, latency and query histograms."""
+        client = self._client()
+        response = client.post('/api/spins/spin/', {'bet_size': '1.00'}, format='json')
+        self.assertEqual(response.status_code, 200)
+        for name in ('auth', 'player_lookup', 'rng', 'wins', 'payout', 'settle', 'spin_insert'):
+            self.assertIn(f'{name};dur=', response['Server-Timing'])
+
+        body = client.get('/api/metrics/').content.decode()
+        self.assertIn('slots_stage_duration_seconds_count{stage="rng"}', body)
+        self.assertIn('slots_request_duration_seconds_count{view="spin-spin",method="POST",status="200"}', body)
+        queries = next(line for line in body.splitlines()
+                       if line.startswith('slots_request_db_queries_count{view="spin-spin"}'))
+        self.assertGreaterEqual(int(queries.split()[-1]), 1)
+        self.assertIn('slots_request_db_queries_bucket{view="spin-spin",le="+Inf"}', body)
+
+    def test_slow_requests_are_profiled(self):
+        """Test sampled requests over the threshold dump cProfile stats."""
+        with tempfile.TemporaryDirectory() as profile_dir:
+            config = {'ENABLED': True, 'PROFILE_SLOW_MS': 0, 'PROFILE_SAMPLE_RATE': 1.0,
+                      'PROFILE_DIR': profile_dir, 'TOKEN': 'scrape'}
+            with override_settings(SLOTS_METRICS=config):
+                client = self._client()
+                client.post('/api/spins/spin/', {'bet_size': '1.00'}, format='json')
+                self.assertEqual(client.get('/api/metrics/').status_code, 403)
+                response = APIClient().get('/api/metrics/', HTTP_AUTHORIZATION='Bearer scrape')
+                self.assertEqual(response.status_code, 200)
+            self.assertTrue(any(name.endswith('.prof') for name in os.listdir(profile_dir)))
+
+
+class LeaderboardTests(SlotsFixtureMixin, TestCase):
+    def setUp(self):
+        super().setUp()
+        self.players = [self.create_player(name) for name in ('alice', 'bob', 'carol')]
+        self.board = leaderboard.Leaderboard(size=2, refresh_interval=60)
+
+    def _record(self, player, amount, now=None):
+        with self.captureOnCommitCallbacks(execute=True):
+            self.board.record(player.pk, Decimal(amount), now=now)
+
+    def test_top_k_is_maintained_incrementally(self):
+        """Test wins accumulate per window and only the top K are kept, without reading Spin."""
+        alice, bob, carol = self.players
+        self._record(alice, '5.00')
+        self._record(bob, '3.00')
+        self._record(carol, '4.00')
+        self._record(bob, '10.00')
+        with self.assertNumQueries(1):  # first read merges the rollup table once
+            _, entries = self.board.top('daily')
+        self.assertEqual(entries, [(bob.pk, Decimal('13.00')), (alice.pk, Decimal('5.00'))])
+        with self.assertNumQueries(0):
+            self.board.top('daily', limit=1)
+        self.assertEqual(
+            LeaderboardEntry.objects.get(window='hourly', player=carol).total_won, Decimal('4.00'))
+
+    def test_periods_roll_over_and_boards_recover_from_rollups(self):
+        """Test a new hour starts empty and a fresh process rebuilds from the rollup rows."""
+        alice, bob, _ = self.players
+        morning = timezone.now().replace(hour=9, minute=30)
+        self._record(alice, '7.00', now=morning)
+        self._record(bob, '2.00', now=morning + timedelta(hours=1))
+        _, hourly = self.board.top('hourly', now=morning + timedelta(hours=1))
+        self.assertEqual(hourly, [(bob.pk, Decimal('2.00'))])
+
+        restarted = leaderboard.Leaderboard()
+        _, daily = restarted.top('daily', now=morning)
+        self.assertEqual(daily, [(alice.pk, Decimal('7.00')), (bob.pk, Decimal('2.00'))])
+
+    def test_missing_rollup_rows_are_recreated_with_the_win(self):
+        """Test a win landing on a deleted rollup row re-creates the row instead of being dropped."""
+        alice = self.players[0]
+        self._record(alice, '5.00')
+        LeaderboardEntry.objects.filter(player=alice, window='hourly').delete()
+        with self.assertLogs('slots.leaderboard', 'WARNING'):
+            self._record(alice, '2.00')
+        scores = dict(LeaderboardEntry.objects.filter(player=alice).values_list('window', 'total_won'))
+        self.assertEqual(scores, {'all': Decimal('7.00'), 'daily': Decimal('7.00'), 'hourly': Decimal('2.00')})
+        self.assertEqual(self.board.top('hourly')[1], [(alice.pk, Decimal('2.00'))])
+        self.assertEqual(self.board.top('all')[1], [(alice.pk, Decimal('7.00'))])
+
+    def test_spin_updates_leaderboard_endpoint(self):
+        """Test winning spins show up on /api/leaderboard/."""
+        alice = self.players[0]
+        with self.captureOnCommitCallbacks(execute=True):
+            result = SlotMachineService().play_batch(alice, Decimal('1.00'), 50)
+        client = APIClient()
+        client.force_authenticate(user=alice.user)
+        response = client.get('/api/leaderboard/', {'window': 'all', 'limit': 5})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data['results'][0]['username'], 'alice')
+        self.assertEqual(Decimal(response.data['results'][0]['total_won']), result['total_won'])
+        self.assertEqual(client.get('/api/leaderboard/', {'window': 'weekly'}).status_code, 400)
+
+
+class SpinExportTests(SlotsFixtureMixin, TestCase):
+    username = 'auditor'
+
+    def setUp(self):
+        super().setUp()
+        service = SlotMachineService()
+        service.play_batch(self.player, Decimal('1.00'), 5)
+        with override_settings(SLOTS_COMPACT_SPIN_STORAGE=True):
+            service.play_batch(self.player, Decimal('1.00'), 5)
+        self.client = APIClient()
+        self.client.force_authenticate(user=self.user)
+
+    def test_csv_export_streams_every_spin(self):
+        """Test CSV export streams all spins, packed ones decoded, oldest first."""
+        response = self.client.get('/api/spins/export/', {'format': 'csv'})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertTrue(response.streaming)
+        self.assertEqual(response['Content-Type'], 'text/csv')
+        rows = list(csv.DictReader(b''.join(response.streaming_content).decode().splitlines()))
+        self.assertEqual(len(rows), 10)
+        self.assertEqual(len(json.loads(rows[-1]['result'])), 5)
+        self.assertEqual([row['timestamp'] for row in rows], sorted(row['timestamp'] for row in rows))
+
+    def test_ndjson_export_applies_filters(self):
+        """Test NDJSON export honours winning_only and rejects bad timestamps."""
+        response = self.client.get('/api/spins/export/', {'format': 'ndjson', 'winning_only': 'true'})
+        lines = b''.join(response.streaming_content).decode().splitlines()
+        winners = Spin.objects.filter(game__player=self.player, payout__gt=0).count()
+        self.assertEqual(len(lines), winners)
+        self.assertTrue(all(Decimal(json.loads(line)['payout']) > 0 for line in lines))
+        response = self.client.get('/api/spins/export/', {'format': 'ndjson', 'since': 'yesterday'})
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_export_command_writes_gzip(self):
+        """Test export_spins writes a gzip file readable line by line."""
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, 'spins.ndjson.gz')
+            call_command('export_spins', path, format='ndjson', player='auditor', stdout=StringIO())
+            with gzip.open(path, 'rt') as exported:
+                spins = [json.loads(line) for line in exported]
+        self.assertEqual(len(spins), 10)
+        self.assertEqual({spin['player'] for spin in spins}, {self.player.pk})
+
+
+class WeightedReelTests(SlotsFixtureMixin, TestCase):
+    symbols = (('Cherry', '2.5'), SlotsFixtureMixin.SEVEN)
+
+    def setUp(self):
+        super().setUp()
+        self.cherry, self.seven = Symbol.objects.order_by('id')
+
+    def test_alias_sampling_follows_reel_weights(self):
+        """Test cells are drawn with the configured per-reel frequencies."""
+        ReelWeight.objects.create(reel=0, symbol=self.cherry, weight=3)
+        ReelWeight.objects.create(reel=0, symbol=self.seven, weight=1)
+        ReelWeight.objects.create(reel=1, symbol=self.seven, weight=1)
+        for reel in range(2, DEFAULT_NUM_REELS):
+            for symbol in (self.cherry, self.seven):
+                ReelWeight.objects.create(reel=reel, symbol=symbol)
+        reel_service = ReelService(get_paytable())
+        spins = reel_service.generate_spins(20000, num_reels=3, visible_rows=3, rng=np.random.default_rng(5))
+        seven = reel_service.paytable.codes['Seven']
+        self.assertAlmostEqual((spins[:, 0] == seven).mean(), 0.25, delta=0.01)
+        self.assertTrue((spins[:, 1] == seven).all())  # Cherry has no weight on reel 1
+        self.assertAlmostEqual((spins[:, 2] == seven).mean(), 0.5, delta=0.01)
+        # Менше символів, ніж видимих рядків, тепер допустимо
+        self.assertEqual(len(reel_service.generate_spin()[0]), 3)
+
+    def test_weight_changes_rebuild_tables(self):
+        """Test weights apply once every reel has one, rebuilding the paytable and its alias tables."""
+        unweighted = get_paytable()
+        self.assertFalse(unweighted.weighted)
+        weight = ReelWeight.objects.create(reel=2, symbol=self.seven, weight=4)
+        with self.assertLogs('slots.paytable', 'WARNING'):
+            self.assertFalse(get_paytable().weighted)  # the other reels stay shuffles
+        for reel in set(range(DEFAULT_NUM_REELS)) - {2}:
+            ReelWeight.objects.create(reel=reel, symbol=self.cherry)
+        weighted = get_paytable()
+        self.assertIsNot(weighted, unweighted)
+        self.assertEqual(weighted.reel_weight_vectors(3), [(1, 0), (1, 0), (0, 4)])
+        self.assertIs(weighted.alias_tables(3, 3), weighted.alias_tables(3, 3))
+        weight.delete()
+        with self.assertLogs('slots.paytable', 'WARNING'):
+            self.assertFalse(get_paytable().weighted)
+        with self.assertRaisesMessage(ValueError, 'Reel 1 has no weights'):
+            Paytable(get_paytable().symbols, reel_weights={0: {self.seven.pk: 1}}).reel_weight_vectors(2)
+
+    def test_exact_weighted_rtp_matches_enumeration(self):
+        """Test the weighted exact RTP against brute force over every grid."""
+        symbols = [PaytableSymbol(1, 'A', 'a.png', Decimal('2.0')), PaytableSymbol(2, 'B', 'b.png', Decimal('0.5')),
+                   PaytableSymbol(3, 'C', 'c.png', Decimal('1.0'))]
+        paytable = Paytable(symbols, reel_weights={0: {1: 2, 2: 1, 3: 1}, 1: {1: 1, 2: 1, 3: 1}, 2: {1: 1, 3: 3}})
+        reel_service = ReelService(paytable)
+        num_reels, visible_rows = 3, 2
+        vectors = paytable.reel_weight_vectors(num_reels)
+        expected_rtp = expected_hits = Fraction(0)
+        for grid in product(range(3), repeat=num_reels * visible_rows):
+            probability = Fraction(1)
+            for cell, code in enumerate(grid):
+                vector = vectors[cell // visible_rows]
+                probability *= Fraction(vector[code], sum(vector))
+            if not probability:
+                continue
+            spin = np.array(grid, dtype=paytable.code_dtype).reshape(1, num_reels, visible_rows)
+            win_data = reel_service.decode_wins(*(part[0] for part in reel_service.evaluate_wins(spin)))
+            expected_rtp += probability * Fraction(reel_service.calculate_payout(win_data, Decimal('1.00')))
+            expected_hits += probability * bool(win_data)
+        exact = exact_rtp(paytable, num_reels=num_reels, visible_rows=visible_rows)
+        self.assertEqual(exact.rtp, expected_rtp)
+        self.assertEqual(exact.hit_probability, expected_hits)
+        simulated = simulate_rtp(paytable, 200_000, seed=3, num_reels=num_reels, visible_rows=visible_rows)
+        low, high = simulated.rtp_interval(0.999)
+        self.assertTrue(low <= exact.rtp <= high)
+
+
+class PaylineTests(SlotsFixtureMixin, TestCase):
+    V_SHAPE = (0, 1, 2, 1, 0)
+    ZIGZAG = (2, 0, 2, 0, 2)
+    username = 'liner'
+    symbols = SlotsFixtureMixin.symbols + (SlotsFixtureMixin.SEVEN,)
+
+    def setUp(self):
+        super().setUp()
+        self.reel_service = ReelService(get_paytable())
+
+    def test_paylines_compile_to_flat_grid_indices(self):
+        """Test lines map to reel * rows + row and bad lines are rejected."""
+        index = compile_paylines((self.V_SHAPE,), 5, 3)
+        self.assertEqual(index.tolist(), [[0, 4, 8, 10, 12]])
+        with self.assertRaises(ValueError):
+            compile_paylines(((0, 1, 3, 1, 0),), 5, 3)
+        with self.assertRaises(ValueError):
+            compile_paylines(((0, 1, 2),), 5, 3)
+
+    def test_every_line_evaluated_against_row_scan(self):
+        """Test 50 lines evaluated in one pass agree with _row_wins on each extracted line."""
+        paylines = [line for line in product(range(3), repeat=5)][:50]
+        spins = self.reel_service.generate_spins(200, rng=np.random.default_rng(17))
+        symbols, starts, lengths = self.reel_service.evaluate_wins(spins, paylines)
+        self.assertEqual(lengths.shape, (200, 50))
+        names = self.reel_service.paytable.names
+        for spin, spin_symbols, spin_starts, spin_lengths in zip(spins, symbols, starts, lengths):
+            for line, code, start, length in zip(paylines, spin_symbols, spin_starts, spin_lengths):
+                expected = self.reel_service._row_wins([names[spin[reel, row]] for reel, row in enumerate(line)])
+                if not expected:
+                    self.assertEqual(length, 0)
+                    continue
+                self.assertEqual((names[code], list(range(start, start + length))), expected[0])
+
+    def test_configured_paylines_drive_spins_and_payouts(self):
+        """Test SLOTS_PAYLINES numbers win_data by line and pays every winning line."""
+        paylines = [(1, 1, 1, 1, 1), self.V_SHAPE, self.ZIGZAG]
+        result = {
+            0: ['Seven', 'Lemon', 'Cherry'], 1: ['Lemon', 'Seven', 'Cherry'], 2: ['Lemon', 'Cherry', 'Seven'],
+            3: ['Cherry', 'Seven', 'Diamond'], 4: ['Seven', 'Diamond', 'Cherry'],
+        }
+        with override_settings(SLOTS_PAYLINES=paylines):
+            win_data = self.reel_service.check_wins(result)
+            self.assertEqual(win_data, {2: ('Seven', [0, 1, 2, 3, 4])})
+            self.assertEqual(self.reel_service.calculate_payout(win_data, Decimal('1.00')), Decimal('25.00'))
+            client = APIClient()
+            client.force_authenticate(user=self.user)
+            response = client.get('/api/paylines/')
+            self.assertEqual([line['rows'] for line in response.data], [list(line) for line in paylines])
+            with self.assertRaises(ValueError):
+                exact_rtp(self.reel_service.paytable)
+        self.assertEqual(self.reel_service.check_wins(result), None)
+        self.assertEqual(compile_paylines(straight_rows(5, 3), 5, 3).tolist()[0], [0, 3, 6, 9, 12])
+
+
+class TokenAuthCacheTests(SlotsFixtureMixin, TestCase):
+    username = 'cached'
+
+    def setUp(self):
+        get_token_cache().clear()
+        super().setUp()
+        self.token = Token.objects.create(user=self.user)
+
+    def _client(self, key=None):
+        client = APIClient()
+        client.credentials(HTTP_AUTHORIZATION=f'Token {key or self.token.key}')
+        return client
+
+    def _spin_queries(self, client):
+        with CaptureQueriesContext(connection) as queries:
+            response = client.post('/api/spins/spin/', {'bet_size': '1.00'}, format='json')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        # Рядки таблиці лідерів залежать від виграшу, тож у порівнянні їх не враховуємо
+        return [query['sql'] for query in queries.captured_queries if 'slots_leaderboardentry' not in query['sql']]
+
+    def test_cached_token_skips_token_and_player_lookups(self):
+        """Test a repeat token request resolves the user and player without queries."""
+        uncached = APIClient()
+        uncached.force_authenticate(user=self.user)
+        self._spin_queries(uncached)  # loads the paytable and creates the game
+        by_user = self._spin_queries(uncached)
+        client = self._client()
+        missed = self._spin_queries(client)
+        cached = self._spin_queries(client)
+        self.assertEqual(sum('authtoken_token' in sql for sql in missed), 1)
+        self.assertFalse(any('authtoken_token' in sql for sql in cached))
+        self.assertEqual(len(missed), len(by_user))  # one query for token, user and player
+        self.assertEqual(len(cached), len(by_user) - 1)
+
+        with self.assertNumQueries(1):
+            response = client.get('/api/players/me/')
+        self.player.refresh_from_db()
+        self.assertEqual(Decimal(response.data['balance']), self.player.balance)
+        self.assertEqual(response.data['user']['username'], 'cached')
+
+    def test_logout_and_rotation_revoke_cached_tokens(self):
+        """Test deleting or rotating a token and deactivating the user take effect at once."""
+        client = self._client()
+        self.assertEqual(client.get('/api/players/me/').status_code, status.HTTP_200_OK)
+        self.assertEqual(client.post('/api/logout/').status_code, status.HTTP_204_NO_CONTENT)
+        self.assertFalse(Token.objects.filter(key=self.token.key).exists())
+        self.assertEqual(client.get('/api/players/me/').data['detail'], 'Invalid token.')
+
+        rotated = Token.objects.create(user=self.user)
+        client = self._client(rotated.key)
+        self.assertEqual(client.get('/api/players/me/').status_code, status.HTTP_200_OK)
+        self.user.is_active = False
+        self.user.save()
+        self.assertEqual(client.get('/api/players/me/').data['detail'], 'User inactive or deleted.')
+
+    def test_token_cache_evicts_and_expires(self):
+        """Test the LRU bound, the TTL and that loads racing an invalidation are not cached."""
+        token_cache = TokenCache(max_entries=2, ttl=60)
+        entry = CachedToken(self.token, self.user, self.player.pk)
+        for key in ('a', 'b'):
+            token_cache.put(key, entry, token_cache.generation)
+        token_cache.get('a')
+        token_cache.put('c', entry, token_cache.generation)
+        self.assertIsNone(token_cache.get('b'))
+        self.assertIs(token_cache.get('a'), entry)
+
+        generation = token_cache.generation
+        token_cache.invalidate(user_id=self.user.pk)
+        self.assertEqual(len(token_cache), 0)
+        token_cache.put('a', entry, generation)
+        self.assertIsNone(token_cache.get('a'))
+
+        expired = TokenCache(ttl=0)
+        expired.put('a', entry, expired.generation)
+        self.assertIsNone(expired.get('a'))
+
+
+class DatabaseTuningTests(SlotsFixtureMixin, TestCase):
+    username = 'routed'
+
+    def setUp(self):
+        super().setUp()
+        cache.clear()
+        self.directory = tempfile.TemporaryDirectory()
+        self.addCleanup(self.directory.cleanup)
+
+    def _file_connection(self, alias, name='spins.sqlite3'):
+        """A separate connection to an on-disk database, as WAL needs a real file."""
+        wrapper = DatabaseWrapper({
+            **connection.settings_dict, 'NAME': os.path.join(self.directory.name, name), 'OPTIONS': {},
+        }, alias=alias)
+        self.addCleanup(wrapper.close)
+        return wrapper
+
+    def _pragma(self, wrapper, name):
+        with wrapper.cursor() as cursor:
+            cursor.execute(f'PRAGMA {name}')
+            return cursor.fetchone()[0]
+
+    def test_sqlite_pragmas_are_applied_on_connect(self):
+        """Test every new SQLite connection gets WAL, synchronous=NORMAL and the busy timeout."""
+        wrapper = self._file_connection('pragmas')
+        self.assertEqual(self._pragma(wrapper, 'journal_mode'), 'wal')
+        self.assertEqual(self._pragma(wrapper, 'synchronous'), 1)
+        self.assertEqual(self._pragma(wrapper, 'busy_timeout'), 5000)
+
+    def _use_connection(self, alias, wrapper):
+        """Serve alias from wrapper for the rest of the test."""
+        original = connections[alias] if alias in connections else None
+        connections[alias] = wrapper
+        if original is None:
+            self.addCleanup(delattr, connections._connections, alias)
+        else:
+            self.addCleanup(connections.__setitem__, alias, original)
+
+    def _spin_during_export(self, journal_mode):
+        """Play a spin while /api/spins/export/ streams the player's history from another connection."""
+        pragmas = {**DEFAULT_DATABASE['SQLITE_PRAGMAS'], 'journal_mode': journal_mode, 'busy_timeout': 100}
+        with override_settings(SLOTS_DATABASE={'SQLITE_PRAGMAS': pragmas}):
+            writer = self._file_connection('default', f'{journal_mode}.sqlite3')
+            reader = self._file_connection(f'export_{journal_mode}', f'{journal_mode}.sqlite3')
+            with writer.schema_editor() as editor:
+                for model in apps.get_models():
+                    if model._meta.managed and not model._meta.proxy:
+                        editor.create_model(model)
+            self._use_connection('default', writer)
+            self._use_connection(reader.alias, reader)
+            self.addCleanup(invalidate_paytable)
+            user = User.objects.create_user(username='exporter', password='testpass')
+            player = Player.objects.create(user=user, balance=Decimal('10000.00'))
+            for name, multiplier in (('Cherry', '2.5'), ('Lemon', '1.5'), ('Diamond', '3.0')):
+                Symbol.objects.create(name=name, image_path=f'{name}.png', payout_multiplier=Decimal(multiplier))
+            service = SlotMachineService()
+            for _ in range(3):
+                service.play_batch(player, Decimal('1.00'), MAX_BATCH_SPINS)
+            client = APIClient()
+            client.force_authenticate(user=user)
+            with replica_reads(reader.alias):
+                response = client.get('/api/spins/export/?format=ndjson')
+                # Експорт посеред читання: запит читача ще не дочитано
+                lines = iter(response.streaming_content)
+                exported = sum(1 for _ in islice(lines, 100))
+            try:
+                self.assertTrue(SlotMachineService().play_spin(player, Decimal('1.00'))['success'])
+                exported += sum(1 for _ in lines)
+                self.assertEqual(exported, 3 * MAX_BATCH_SPINS)  # the export keeps its snapshot
+            finally:
+                response.close()
+
+    def test_wal_lets_spins_commit_during_a_long_export(self):
+        """Test a spin commits while an export streams, which the rollback journal refuses."""
+        self._spin_during_export('WAL')
+        with self.assertRaisesMessage(OperationalError, 'database is locked'):
+            self._spin_during_export('DELETE')
+
+    @override_settings(SLOTS_DATABASE={'READ_ALIAS': 'default'})
+    def test_router_reads_from_replica_until_the_user_writes(self):
+        """Test replica routing, the primary_reads() override and read-your-writes pinning."""
+        router = ReadReplicaRouter()
+        self.assertIsNone(router.db_for_read(Spin))
+        with replica_reads('replica'):
+            self.assertEqual(router.db_for_read(Spin), 'replica')
+            with primary_reads():
+                self.assertIsNone(router.db_for_read(Spin))
+            self.assertEqual(router.db_for_write(Spin), 'default')
+            self.assertIsNone(router.db_for_read(Spin))
+        self.assertIsNone(router.db_for_read(Spin))
+
+        client = APIClient()
+        client.force_authenticate(user=self.user)
+        self.assertEqual(read_alias_for(self.user.pk), 'default')
+        self.assertEqual(client.get('/api/spins/history/').status_code, status.HTTP_200_OK)
+        self.assertEqual(client.post('/api/spins/spin/', {'bet_size': '1.00'}, format='json').status_code, 200)
+        self.assertIsNone(read_alias_for(self.user.pk))
+        self.assertEqual(len(client.get('/api/spins/history/').data['results']), 1)
+
+    def test_replica_reads_need_a_shared_cache(self):
+        """Test the check warns when the primary pin would live in a per-process cache."""
+        self.assertEqual(check_pin_cache(None), [])
+        with override_settings(SLOTS_DATABASE={'READ_ALIAS': 'default'}):
+            self.assertEqual([warning.id for warning in check_pin_cache(None)], ['slots.W001'])
+
+
+class SpinArchiveTests(SlotsFixtureMixin, TestCase):
+    username = 'archivist'
+
+    def setUp(self):
+        super().setUp()
+        service = SlotMachineService()
+        service.play_batch(self.player, Decimal('1.00'), 4)
+        with override_settings(SLOTS_COMPACT_SPIN_STORAGE=True):
+            service.play_batch(self.player, Decimal('1.00'), 3)
+        service.play_batch(self.player, Decimal('1.00'), 3)
+        # Сім найстаріших спінів стають старшими за 90 днів
+        spins = list(Spin.objects.order_by('timestamp', 'id'))
+        old = timezone.now() - timedelta(days=120)
+        for offset, spin in enumerate(spins[:7]):
+            Spin.objects.filter(pk=spin.pk).update(timestamp=old + timedelta(minutes=offset))
+        self.expected = {spin.pk: SpinSerializer(Spin.objects.get(pk=spin.pk)).data for spin in spins}
+        self.client = APIClient()
+        self.client.force_authenticate(user=self.user)
+
+    def _archive(self):
+        call_command('archive_spins', older_than='90d', batch_size=3, stdout=StringIO())
+
+    def test_archive_moves_old_spins_in_batches(self):
+        """Test old spins move to the packed archive table and recent ones stay."""
+        self._archive()
+        self.assertEqual(Spin.objects.count(), 3)
+        self.assertEqual(ArchivedSpin.objects.count(), 7)
+        self.assertFalse(ArchivedSpin.objects.filter(packed__isnull=True).exists())
+        for archived in ArchivedSpin.objects.all():
+            self.assertEqual(SpinSerializer(archived).data, self.expected[archived.pk])
+        self._archive()
+        self.assertEqual(ArchivedSpin.objects.count(), 7)
+        with self.assertRaises(CommandError):
+            call_command('archive_spins', older_than='soon', stdout=StringIO())
+
+    def test_archive_batches_walk_the_timestamp_index(self):
+        """Test each archive batch reads the oldest spins through an index instead of sorting the table."""
+        with CaptureQueriesContext(connection) as queries:
+            self._archive()
+        plan = self.query_plan(queries, 'slots_spin')
+        self.assertIn('slots_spin_ts_idx', plan)
+        self.assertNotIn('TEMP B-TREE', plan)
+
+    def test_history_reads_the_archive_when_asked(self):
+        """Test history pages through hot and archived spins as one timeline with include_archived."""
+        self._archive()
+        self.assertEqual(len(self.client.get('/api/spins/history/').data['results']), 3)
+        ids, url = [], '/api/spins/history/?include_archived=true&page_size=4'
+        while url:
+            page = self.client.get(url).data
+            ids += [spin['id'] for spin in page['results']]
+            url = page['next']
+        newest_first = sorted(self.expected.values(), key=lambda spin: (spin['timestamp'], spin['id']), reverse=True)
+        self.assertEqual(ids, [spin['id'] for spin in newest_first])
+
+    def test_export_merges_archived_spins_oldest_first(self):
+        """Test the export endpoint and command include archived spins in timestamp order."""
+        self._archive()
+        response = self.client.get('/api/spins/export/', {'format': 'ndjson', 'include_archived': '1'})
+        rows = [json.loads(line) for line in b''.join(response.streaming_content).decode().splitlines()]
+        self.assertEqual(len(rows), 10)
+        self.assertEqual([row['timestamp'] for row in rows], sorted(row['timestamp'] for row in rows))
+        self.assertEqual({row['id']: row['result'] for row in rows},
+                         {str(pk): data['result'] for pk, data in self.expected.items()})
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, 'spins.csv.gz')
+            output = StringIO()
+            call_command('export_spins', path, include_archived=True, stdout=output)
+        self.assertIn('Exported 10 spins', output.getvalue())
+
+    def test_game_spins_and_replay_reach_archived_spins(self):
+        """Test a game's spin list reads the archive with include_archived and archived spins replay."""
+        self._archive()
+        url = f'/api/games/{self.player.active_game_id}/spins/'
+        self.assertEqual(len(self.client.get(url).data['results']), 3)
+        self.assertEqual(len(self.client.get(url, {'include_archived': 'true'}).data['results']), 10)
+        output = StringIO()
+        call_command('replay_spin', str(ArchivedSpin.objects.first().pk), stdout=output)
+        self.assertIn('Replayed spin matches the stored result', output.getvalue())
+        with self.assertRaisesMessage(CommandError, 'does not exist'):
+            call_command('replay_spin', str(uuid.uuid4()), stdout=StringIO())
+
+
+class JackpotTests(SlotsFixtureMixin, TestCase):
+    username = 'lucky'
+
+    def test_spins_contribute_to_sharded_counters(self):
+        """Test each spin adds to one shard per counter and reads sum the shards."""
+        jackpot = Jackpot(shards=4, contribution_rate='0.10', trigger_probability=0)
+        service = SlotMachineService(jackpot=jackpot)
+        payouts = Decimal('0.00')
+        for _ in range(20):
+            result = service.play_spin(self.player, Decimal('1.00'))
+            self.assertEqual(result['jackpot'], Decimal('0.00'))
+            payouts += result['payout']
+        self.assertEqual(jackpot.pool.value(), Decimal('2.00'))
+        self.assertEqual(jackpot.balances()['house'], Decimal('20.00') - payouts - Decimal('2.00'))
+        shards = CounterShard.objects.filter(name=JACKPOT_POOL)
+        self.assertEqual(shards.count(), 4)
+        self.assertGreater(shards.filter(value__gt=0).count(), 1)
+        self.assertNotIn('jackpot', SlotMachineService().play_spin(self.player, Decimal('1.00')))
+
+    def test_triggered_jackpot_pays_out_the_whole_pool(self):
+        """Test a triggered spin empties every shard into the player's balance."""
+        jackpot = Jackpot(shards=4, contribution_rate='0.10', trigger_probability=1)
+        for key in range(8):
+            jackpot.pool.add(Decimal('5.00'), key)
+        result = SlotMachineService(jackpot=jackpot).play_spin(self.player, Decimal('1.00'))
+        self.assertEqual(result['jackpot'], Decimal('40.00'))
+        self.player.refresh_from_db()
+        self.assertEqual(self.player.balance, Decimal('1039.00') + result['payout'])
+        self.assertEqual(result['current_balance'], self.player.balance)
+        self.assertEqual(jackpot.pool.value(), Decimal('0.10'))  # the winning spin seeds the next pool
+
+        award = JackpotAward.objects.get()
+        self.assertEqual((award.spin_id, award.player_id, award.amount),
+                         (result['spin_id'], self.player.pk, Decimal('40.00')))
+        scores = dict(LeaderboardEntry.objects.filter(player=self.player).values_list('window', 'total_won'))
+        self.assertEqual(scores['all'], Decimal('40.00') + result['payout'])
+        GameSessionService.end(self.player)
+        game = Game.objects.get(pk=award.game_id)
+        self.assertEqual(game.total_won, Decimal('40.00') + result['payout'])
+
+    def test_compaction_folds_shards(self):
+        """Test compaction keeps the total while folding shards and dropping the ones out of range."""
+        counter = ShardedCounter(JACKPOT_POOL, 8)
+        for key in range(20):
+            counter.add(Decimal('1.50'), key)
+        self.assertEqual(ShardedCounter(JACKPOT_POOL, 2).compact(), Decimal('30.00'))
+        rows = dict(CounterShard.objects.filter(name=JACKPOT_POOL).values_list('shard', 'value'))
+        self.assertEqual(rows, {0: Decimal('30.00'), 1: Decimal('0.00')})
+        output = StringIO()
+        call_command('compact_counters', stdout=output)
+        self.assertIn('jackpot_pool: 30.00', output.getvalue())
+
+
+class GameSessionTests(SlotsFixtureMixin, TestCase):
+    username = 'session'
+
+    def setUp(self):
+        super().setUp()
+        self.client = APIClient()
+        self.client.force_authenticate(user=self.user)
+
+    def test_spins_use_the_active_game_without_looking_it_up(self):
+        """Test the first spin starts a game and later spins only add to its totals."""
+        Game.objects.create(player=self.player)
+        Game.objects.create(player=self.player)  # get_or_create used to fail here
+        service = SlotMachineService()
+        first = service.play_spin(self.player, Decimal('1.00'))
+        self.assertIsNotNone(self.player.active_game_id)
+        with CaptureQueriesContext(connection) as queries:
+            second = service.play_spin(self.player, Decimal('1.00'))
+        game_queries = [query['sql'].split(None, 1)[0] for query in queries.captured_queries
+                        if '"slots_game"' in query['sql']]
+        self.assertEqual(game_queries, ['UPDATE'])
+        spins = Spin.objects.filter(pk__in=[first['spin_id'], second['spin_id']])
+        self.assertEqual(set(spins.values_list('game_id', flat=True)), {self.player.active_game_id})
+        service.play_batch(self.player, Decimal('1.00'), 3)
+        self.assertEqual(Spin.objects.filter(game_id=self.player.active_game_id).count(), 5)
+
+    def test_async_spins_use_the_active_game_without_looking_it_up(self):
+        """Test async spins only add to the active game's totals, and a failed insert takes them back."""
+        service = SlotMachineService()
+        async_to_sync(service.aplay_spin)(self.player, Decimal('1.00'))
+        with CaptureQueriesContext(connection) as queries:
+            async_to_sync(service.aplay_spin)(self.player, Decimal('1.00'))
+        game_queries = [query['sql'].split(None, 1)[0] for query in queries.captured_queries
+                        if '"slots_game"' in query['sql']]
+        self.assertEqual(game_queries, ['UPDATE'])
+        game = Game.objects.get(pk=self.player.active_game_id)
+        self.assertEqual((game.spin_count, game.total_wagered), (2, Decimal('2.00')))
+
+        with mock.patch.object(Spin, 'asave', side_effect=OperationalError('disk I/O error')):
+            with self.assertRaises(OperationalError):
+                async_to_sync(service.aplay_spin)(self.player, Decimal('1.00'))
+        game.refresh_from_db()
+        self.assertEqual((game.spin_count, game.total_wagered), (2, Decimal('2.00')))
+
+    def test_start_and_end_write_session_summaries(self):
+        """Test the session endpoints move the active pointer and store the totals on end."""
+        response = self.client.post('/api/games/start/')
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        game_id = response.data['id']
+        self.assertEqual(self.client.get('/api/players/me/').data['active_game'], uuid.UUID(game_id))
+        payouts = sum(self.client.post('/api/spins/spin/', {'bet_size': '2.00'}, format='json').data['payout']
+                      for _ in range(3))
+
+        response = self.client.post('/api/games/end/')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data['spin_count'], 3)
+        game = Game.objects.get(pk=game_id)
+        self.assertIsNotNone(game.ended_at)
+        self.assertEqual((game.spin_count, game.total_wagered, game.total_won), (3, Decimal('6.00'), payouts))
+        self.player.refresh_from_db()
+        self.assertIsNone(self.player.active_game_id)
+        self.assertEqual(self.client.post('/api/games/end/').status_code, status.HTTP_400_BAD_REQUEST)
+
+        # Підсумки завершеної гри читаються з рядка гри, навіть якщо спіни вже видалено
+        Spin.objects.filter(game_id=game_id).delete()
+        listed = {row['id']: row for row in self.client.get('/api/games/').data}
+        self.assertEqual(Decimal(listed[game_id]['total_wagered']), Decimal('6.00'))
+
+    def test_start_replaces_the_active_session(self):
+        """Test starting a session ends the previous one and spins follow the new game."""
+        first = GameSessionService.start(self.player)
+        SlotMachineService().play_spin(self.player, Decimal('1.00'))
+        second = GameSessionService.start(self.player)
+        self.assertNotEqual(first, second)
+        self.assertEqual(Game.objects.get(pk=first).spin_count, 1)
+        result = SlotMachineService().play_spin(self.player, Decimal('1.00'))
+        self.assertEqual(Spin.objects.get(pk=result['spin_id']).game_id, second)
+
+    def test_active_game_totals_include_archived_spins(self):
+        """Test archiving the spins of an active game leaves its live totals unchanged."""
+        result = SlotMachineService().play_batch(self.player, Decimal('1.00'), 4)
+        listed = self.client.get('/api/games/').data[0]
+        self.assertEqual((listed['spin_count'], Decimal(listed['total_wagered'])), (4, Decimal('4.00')))
+        Spin.objects.filter(pk=result['spins'][0]['spin_id']).update(timestamp=timezone.now() - timedelta(days=100))
+        call_command('archive_spins', older_than='90d', stdout=StringIO())
+        self.assertEqual(ArchivedSpin.objects.count(), 1)
+        self.assertEqual(self.client.get('/api/games/').data[0], listed)
+
+    def test_spin_inserted_after_end_counts_in_the_summary(self):
+        """Test a spin that read the active game before it ended still counts in its summary."""
+        service = SlotMachineService()
+        service.play_spin(self.player, Decimal('1.00'))
+        stale = Player.objects.get(pk=self.player.pk)  # an async spin that settled before the end
+        game_id = GameSessionService.end(self.player)
+        self.assertEqual(Game.objects.get(pk=game_id).spin_count, 1)
+
+        spin = async_to_sync(service._acreate_spin_record)(
+            stale, Decimal('3.00'), Decimal('0.00'), None, None, None, None,
+        )
+        self.assertEqual(spin.game_id, game_id)
+        game = Game.objects.get(pk=game_id)
+        self.assertEqual((game.spin_count, game.total_wagered), (2, Decimal('4.00')))
+
+
+def _throttle_rates(**rates):
+    return override_settings(REST_FRAMEWORK={**settings.REST_FRAMEWORK, 'DEFAULT_THROTTLE_RATES': rates})
+
+
+class ThrottlingTests(SlotsFixtureMixin, TestCase):
+    def setUp(self):
+        super().setUp()
+        self.clients = []
+        for name in ('bot', 'human'):
+            user = self.create_player(name).user
+            client = APIClient()
+            client.credentials(HTTP_AUTHORIZATION=f'Token {Token.objects.create(user=user).key}')
+            self.clients.append(client)
+
+    def _spin(self, client):
+        return client.post('/api/spins/spin/', {'bet_size': '1.00'}, format='json')
+
+    def test_token_bucket_bursts_refills_and_evicts_idle_keys(self):
+        """Test a bucket admits its burst, then one request per refill, and forgets idle keys."""
+        buckets = TokenBuckets(capacity=2, period=1.0)
+        self.assertEqual([buckets.take('p', now=0.0) for _ in range(2)], [0.0, 0.0])
+        self.assertAlmostEqual(buckets.take('p', now=0.0), 0.5)
+        self.assertEqual(buckets.take('p', now=0.5), 0.0)
+        self.assertEqual(buckets.take('other', now=0.5), 0.0)
+        self.assertEqual(len(buckets), 2)
+
+        self.assertEqual(buckets.take('batch', cost=5, now=0.5), 0.0)  # over the burst: admitted into debt
+        self.assertAlmostEqual(buckets.take('batch', now=0.5), 2.0)
+        buckets._sweep(now=2.0)
+        self.assertEqual(len(buckets), 1)  # only the bucket still paying back its debt is kept
+        buckets._sweep(now=10.0)
+        self.assertEqual(len(buckets), 0)
+
+    def test_player_rate_limits_only_that_player(self):
+        """Test a player over their rate gets 429 with Retry-After while others keep spinning."""
+        bot, human = self.clients
+        with _throttle_rates(spin_player='2/m', spin_global='100/s'):
+            self.assertEqual([self._spin(bot).status_code for _ in range(2)], [200, 200])
+            response = self._spin(bot)
+            self.assertEqual(response.status_code, 429)
+            self.assertEqual(response['Retry-After'], '30')
+            self.assertEqual(self._spin(human).status_code, 200)
+            self.assertIn('slots_throttled_requests_total{scope="spin_player"}', metrics.render_metrics())
+        self.assertEqual(self._spin(bot).status_code, 200)
+
+    def test_concurrency_limit_sheds_load_and_releases_slots(self):
+        """Test requests beyond the in-flight limit are shed and finished ones free their slot."""
+        bot, human = self.clients
+        with _throttle_rates(spin_concurrency='1'):
+            limiter = get_concurrency_limiter()
+            self.assertEqual(self._spin(bot).status_code, 200)
+            self.assertEqual(limiter.in_flight, 0)
+
+            self.assertTrue(limiter.acquire())
+            response = self._spin(human)
+            self.assertEqual(response.status_code, 429)
+            self.assertEqual(response['Retry-After'], '1')
+            limiter.release()
+            self.assertEqual(self._spin(human).status_code, 200)
+            self.assertEqual(limiter.in_flight, 0)
+
+    def test_batch_pays_per_spin_and_async_spins_share_the_buckets(self):
+        """Test a batch spends a token per spin and the async endpoint is limited like the DRF one."""
+        bot, human = self.clients
+        with _throttle_rates(spin_player='5/m'):
+            response = bot.post('/api/spins/batch/', {'bet_size': '1.00', 'count': 5}, format='json')
+            self.assertEqual(response.status_code, 200)
+            self.assertEqual(self._spin(bot).status_code, 429)
+            response = bot.post('/api/async/spins/spin/', {'bet_size': '1.00'}, format='json')
+            self.assertEqual(response.status_code, 429)
+            self.assertEqual(response['Retry-After'], '12')
+
+            response = human.post('/api/spins/batch/', {'bet_size': '1.00', 'count': 50}, format='json')
+            self.assertEqual(response.status_code, 200)
+            response = human.post('/api/async/spins/spin/', {'bet_size': '1.00'}, format='json')
+            self.assertEqual(response['Retry-After'], '552')  # 45 spins of debt plus the next one
+
+
+class BenchmarkSmokeTests(SlotsFixtureMixin, TestCase):
+    """Runs each benchmark once per timed call, so schema or default changes can't break them unnoticed."""
+
+    @staticmethod
+    def _measure(name, func, **kwargs):
+        func()
+        return {'name': name}
+
+    def test_http_layer_seeds_and_runs(self):
+        """Test the HTTP benchmark seeds spins and its requests succeed."""
+        from benchmarks import http
+        with mock.patch('benchmarks.http.measure', self._measure), redirect_stdout(StringIO()):
+            results = http.run(players=2, spins=20)
+        self.assertEqual(Spin.objects.filter(player__user__username__startswith='bench').count(), 21)
+        self.assertEqual([result['name'] for result in results],
+                         ['http.spin', 'http.history_first_page', 'http.history_deep_page', 'http.games'])
+
+
+class AsgiBenchmarkSmokeTests(SlotsFixtureMixin, TransactionTestCase):
+    def test_asgi_vs_wsgi_runs_past_the_throttle_burst(self):
+        """Test the ASGI-vs-WSGI load runs more spins per player than the default rate allows."""
+        from benchmarks import asgi_vs_wsgi
+        from benchmarks.environment import seed_players
+        # Одна задача за раз: спільна in-memory база тестів блокує таблиці замість очікування
+        results = asgi_vs_wsgi.run(seed_players(2), requests=60, concurrency=1)
+        self.assertEqual([result['requests'] for result in results], [60, 60])
@@ -0,0 +1,281 @@
+"""Admission control for the spin endpoints: token buckets and a concurrency limit.
+
+Rates come from REST_FRAMEWORK['DEFAULT_THROTTLE_RATES'] in DRF's "N/period"
+form and are read as token buckets holding N tokens that refill at N per
+period, so a player may burst N spins and then keeps the average rate.
+'spin_player' is per user, 'spin_global' shared by every player, and
+'spin_concurrency' is the number of spin requests a process runs at once;
+a missing scope disables that check. A request costs one token per spin it
+plays, so a batch pays for its whole autoplay; a cost above the burst is
+admitted from a full bucket and paid back by waiting. State lives in this
+process only, so with several workers the global limits apply per worker.
+A bucket that has refilled completely is the same as no bucket and is
+dropped, so memory grows with the players active in the last period only.
+The async spin endpoint applies the same limits through admit().
+"""
+import threading
+import time
+
+from django.core.exceptions import ImproperlyConfigured
+from django.core.signals import setting_changed
+from django.dispatch import receiver
+from rest_framework.settings import api_settings
+from rest_framework.throttling import BaseThrottle
+
+from .metrics import THROTTLED_REQUESTS
+
+# --- Налаштування обмеження запитів ---
+PLAYER_SCOPE = 'spin_player'
+GLOBAL_SCOPE = 'spin_global'
+CONCURRENCY_SCOPE = 'spin_concurrency'
+CONCURRENCY_RETRY_AFTER = 1  # seconds a client shed by the concurrency limit is asked to wait
+PERIODS = {'s': 1, 'm': 60, 'h': 3600, 'd': 86400}
+
+
+def throttle_rate(scope):
+    return api_settings.DEFAULT_THROTTLE_RATES.get(scope)
+
+
+def parse_rate(rate):
+    """'10/s' -> (10, 1.0): bucket capacity and seconds over which it refills."""
+    num, _, period = rate.partition('/')
+    try:
+        return int(num), float(PERIODS[period[:1]])
+    except (KeyError, ValueError):
+        raise ImproperlyConfigured(f'Invalid throttle rate {rate!r}, expected e.g. "10/s" or "600/m"')
+
+
+class TokenBuckets:
+    """Thread-safe token buckets keyed by player (or a single global key), refilled on access."""
+
+    def __init__(self, capacity, period):
+        if capacity < 1:
+            raise ImproperlyConfigured('A throttle rate needs at least one request per period')
+        self.capacity = capacity
+        self.refill_rate = capacity / period  # tokens per second
+        self.idle_seconds = period  # an empty bucket is full again after this long; also the sweep interval
+        self._lock = threading.Lock()
+        self._buckets = {}  # key -> [tokens, updated_at]
+        self._next_sweep = time.monotonic() + self.idle_seconds
+
+    def take(self, key, cost=1, now=None):
+        """Spend cost tokens of key; returns 0 when admitted, else seconds until enough are due."""
+        now = time.monotonic() if now is None else now
+        with self._lock:
+            bucket = self._buckets.get(key)
+            if bucket is None:
+                bucket = self._buckets[key] = [float(self.capacity), now]
+            else:
+                bucket[0] = min(self.capacity, bucket[0] + (now - bucket[1]) * self.refill_rate)
+                bucket[1] = now
+            # Запит дорожчий за сплеск проходить з повного відра і йде в борг
+            needed = min(cost, self.capacity)
+            if bucket[0] >= needed:
+                bucket[0] -= cost
+                wait = 0.0
+            else:
+                wait = (needed - bucket[0]) / self.refill_rate
+            if now >= self._next_sweep:
+                self._sweep(now)
+        return wait
+
+    def _sweep(self, now):
+        # Повне відро поводиться так само, як відсутнє, тож його можна забути
+        self._buckets = {
+            key: bucket for key, bucket in self._buckets.items()
+            if bucket[0] + (now - bucket[1]) * self.refill_rate < self.capacity
+        }
+        self._next_sweep = now + self.idle_seconds
+
+    def __len__(self):
+        return len(self._buckets)
+
+
+class ConcurrencyLimiter:
+    """Counts requests in flight and refuses new ones beyond limit."""
+
+    def __init__(self, limit):
+        self.limit = limit
+        self.in_flight = 0
+        self._lock = threading.Lock()
+
+    def acquire(self):
+        with self._lock:
+            if self.in_flight >= self.limit:
+                return False
+            self.in_flight += 1
+            return True
+
+    def release(self):
+        with self._lock:
+            self.in_flight -= 1
+
+
+_buckets = {}  # scope -> (rate, TokenBuckets)
+_limiter = None  # (limit, ConcurrencyLimiter)
+_state_lock = threading.Lock()
+
+
+def get_buckets(scope):
+    """Process-wide TokenBuckets of scope, or None when the scope has no rate."""
+    rate = throttle_rate(scope)
+    if rate is None:
+        return None
+    entry = _buckets.get(scope)
+    if entry is None or entry[0] != rate:
+        with _state_lock:
+            entry = _buckets.get(scope)
+            if entry is None or entry[0] != rate:
+                entry = _buckets[scope] = (rate, TokenBuckets(*parse_rate(rate)))
+    return entry[1]
+
+
+def get_concurrency_limiter():
+    """Process-wide ConcurrencyLimiter, or None when 'spin_concurrency' is not set."""
+    global _limiter
+    limit = throttle_rate(CONCURRENCY_SCOPE)
+    if limit is None:
+        return None
+    if _limiter is None or _limiter[0] != limit:
+        with _state_lock:
+            if _limiter is None or _limiter[0] != limit:
+                _limiter = (limit, ConcurrencyLimiter(int(limit)))
+    return _limiter[1]
+
+
+def reset_throttles():
+    """Forget every bucket and the concurrency limiter of this process."""
+    global _buckets, _limiter
+    _buckets, _limiter = {}, None
+
+
+@receiver(setting_changed)
+def _reset_throttles(setting, **kwargs):
+    if setting == 'REST_FRAMEWORK':
+        reset_throttles()
+
+
+def admission_metrics():
+    """Gauges for /api/metrics/: requests in flight and buckets tracked per scope."""
+    limiter = _limiter[1] if _limiter else None
+    return {
+        'in_flight': limiter.in_flight if limiter else 0,
+        'concurrency_limit': limiter.limit if limiter else 0,
+        'buckets': {scope: len(buckets) for scope, (_, buckets) in _buckets.items()},
+    }
+
+
+def take_tokens(scope, key, cost=1):
+    """Spend cost tokens of key in scope's bucket; returns the seconds to wait, 0 when admitted."""
+    buckets = get_buckets(scope)
+    if buckets is None:
+        return 0.0
+    wait = buckets.take(key, cost)
+    if wait:
+        THROTTLED_REQUESTS.inc(labels=(scope,))
+    return wait
+
+
+def acquire_slot():
+    """Take a concurrency slot; returns (admitted, limiter to release or None)."""
+    limiter = get_concurrency_limiter()
+    if limiter is None:
+        return True, None
+    if not limiter.acquire():
+        THROTTLED_REQUESTS.inc(labels=(CONCURRENCY_SCOPE,))
+        return False, None
+    return True, limiter
+
+
+def admit(player_key, cost=1):
+    """The checks of SPIN_THROTTLES, in order, for views outside DRF.
+
+    Returns (0, limiter) when admitted, where limiter, unless None, must be
+    released once the request is done, or (seconds to wait, None) when refused.
+    """
+    wait = take_tokens(PLAYER_SCOPE, player_key, cost) or take_tokens(GLOBAL_SCOPE, None, cost)
+    if wait:
+        return wait, None
+    admitted, limiter = acquire_slot()
+    return (0, limiter) if admitted else (CONCURRENCY_RETRY_AFTER, None)
+
+
+class TokenBucketThrottle(BaseThrottle):
+    """Throttle spending the request's cost from the scope's bucket.
+
+    The cost is view.get_throttle_cost(request) when the view has it, else 1.
+    """
+    scope = None
+
+    def __init__(self):
+        self._wait = None
+
+    def get_key(self, request):
+        raise NotImplementedError('.get_key() must be overridden')
+
+    def allow_request(self, request, view):
+        get_cost = getattr(view, 'get_throttle_cost', None)
+        self._wait = take_tokens(self.scope, self.get_key(request), get_cost(request) if get_cost else 1)
+        return not self._wait
+
+    def wait(self):
+        return self._wait
+
+
+class PlayerSpinThrottle(TokenBucketThrottle):
+    scope = PLAYER_SCOPE
+
+    def get_key(self, request):
+        return request.user.pk if request.user.is_authenticated else self.get_ident(request)
+
+
+class GlobalSpinThrottle(TokenBucketThrottle):
+    scope = GLOBAL_SCOPE
+
+    def get_key(self, request):
+        return None
+
+
+class SpinConcurrencyThrottle(BaseThrottle):
+    """Sheds requests while 'spin_concurrency' of them are already running.
+
+    The slot is released by AdmissionControlMixin when the view returns, so
+    it only works on views that include the mixin; list it last so requests
+    refused by a rate never take a slot.
+    """
+    scope = CONCURRENCY_SCOPE
+
+    def allow_request(self, request, view):
+        if not isinstance(view, AdmissionControlMixin):
+            raise ImproperlyConfigured(f'{type(view).__name__} must include AdmissionControlMixin')
+        admitted, view._admission_slot = acquire_slot()
+        return admitted
+
+    def wait(self):
+        return CONCURRENCY_RETRY_AFTER
+
+
+SPIN_THROTTLES = [PlayerSpinThrottle, GlobalSpinThrottle, SpinConcurrencyThrottle]
+
+
+class AdmissionControlMixin:
+    """Stops at the first throttle that refuses and frees the concurrency slot after the view."""
+    _admission_slot = None
+
+    def get_throttle_cost(self, request):
+        """Tokens the request spends from the rate buckets."""
+        return 1
+
+    def check_throttles(self, request):
+        # Відхилений запит не витрачає токени інших обмежень і не займає слот
+        for throttle in self.get_throttles():
+            if not throttle.allow_request(request, self):
+                self.throttled(request, throttle.wait())
+
+    def dispatch(self, request, *args, **kwargs):
+        try:
+            return super().dispatch(request, *args, **kwargs)
+        finally:
+            if self._admission_slot is not None:
+                self._admission_slot.release()
+                self._admission_slot = None
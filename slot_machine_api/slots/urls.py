@@ -2,9 +2,10 @@ from django.urls import path, include
 from rest_framework.routers import DefaultRouter
 from drf_spectacular.views import SpectacularAPIView, SpectacularSwaggerView
 from .views import (
-    RegistrationView, PlayerViewSet, GameViewSet,
-    SpinViewSet, SymbolViewSet
+    RegistrationView, LogoutView, PlayerViewSet, GameViewSet,
+    SpinViewSet, SymbolViewSet, LeaderboardView, PaylineView
 )
+from . import async_views, metrics
 
 router = DefaultRouter()
 router.register(r'players', PlayerViewSet, basename='player')
@@ -15,6 +16,12 @@ router.register(r'symbols', SymbolViewSet, basename='symbol')
 urlpatterns = [
     path('', include(router.urls)),
     path('register/', RegistrationView.as_view(), name='register'),
+    path('logout/', LogoutView.as_view(), name='logout'),
+    path('paylines/', PaylineView.as_view(), name='paylines'),
+    path('leaderboard/', LeaderboardView.as_view(), name='leaderboard'),
+    path('async/spins/spin/', async_views.spin, name='async-spin'),
+    path('async/players/me/', async_views.player_me, name='async-player-me'),
+    path('metrics/', metrics.metrics_view, name='metrics'),
     path('schema/', SpectacularAPIView.as_view(), name='schema'),
     path('docs/', SpectacularSwaggerView.as_view(url_name='schema'), name='swagger-ui'),
 ]
\ No newline at end of file
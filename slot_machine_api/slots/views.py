@@ -1,14 +1,41 @@
-from rest_framework import viewsets, status, generics
+from django.contrib.auth import logout
+from django.http import StreamingHttpResponse
+from rest_framework import viewsets, status, generics, views
+from rest_framework.authtoken.models import Token
 from rest_framework.decorators import action
+from rest_framework.exceptions import ValidationError
 from rest_framework.response import Response
 from rest_framework.permissions import IsAuthenticated, AllowAny
 from drf_spectacular.utils import extend_schema, OpenApiParameter, OpenApiExample
-from .models import Player, Game, Spin, Symbol
+from .models import Player, Game, Symbol
 from .serializers import (
     PlayerSerializer, GameSerializer, SpinSerializer,
-    SymbolSerializer, SpinRequestSerializer, RegistrationSerializer
+    SymbolSerializer, SpinRequestSerializer, BatchSpinRequestSerializer,
+    LeaderboardSerializer, PaylineSerializer, RegistrationSerializer
 )
-from .services import SlotMachineService
+from .archive import game_spin_sources, player_spin_sources
+from .authentication import request_player
+from .database import ReplicaReadMixin
+from .leaderboard import LEADERBOARD_SIZE, WINDOWS, get_leaderboard
+from .metrics import stage
+from .paylines import get_paylines
+from .throttling import SPIN_THROTTLES, AdmissionControlMixin
+from .services import (
+    DEFAULT_NUM_REELS, DEFAULT_VISIBLE_ROWS, MAX_BATCH_SPINS, GameSessionService, SlotMachineService,
+)
+from .pagination import SpinCursorPagination
+from .export import EXPORT_FORMATS, CSVRenderer, NDJSONRenderer, export_rows
+from .filters import filter_spins, query_flag
+
+
+SPIN_FILTER_PARAMETERS = [
+    OpenApiParameter('since', str, description='Only spins at or after this ISO 8601 timestamp'),
+    OpenApiParameter('until', str, description='Only spins before this ISO 8601 timestamp'),
+    OpenApiParameter('winning_only', bool, description='Only spins with a payout'),
+]
+SPIN_LIST_PARAMETERS = SPIN_FILTER_PARAMETERS + [
+    OpenApiParameter('include_archived', bool, description='Also return spins moved to the archive'),
+]
 
 
 class RegistrationView(generics.CreateAPIView):
@@ -32,7 +59,7 @@ class RegistrationView(generics.CreateAPIView):
         )
 
 
-class PlayerViewSet(viewsets.ReadOnlyModelViewSet):
+class PlayerViewSet(ReplicaReadMixin, viewsets.ReadOnlyModelViewSet):
     serializer_class = PlayerSerializer
     permission_classes = [IsAuthenticated]
 
@@ -45,35 +72,105 @@ class PlayerViewSet(viewsets.ReadOnlyModelViewSet):
     )
     @action(detail=False, methods=['get'])
     def me(self, request):
-        player = Player.objects.get(user=request.user)
+        player = request_player(request, load=True)
         serializer = self.get_serializer(player)
         return Response(serializer.data)
 
 
-class GameViewSet(viewsets.ReadOnlyModelViewSet):
+class LogoutView(views.APIView):
+    permission_classes = [IsAuthenticated]
+
+    @extend_schema(
+        description="Revoke the request's auth token and end the session",
+        request=None,
+        responses={204: None}
+    )
+    def post(self, request):
+        if isinstance(request.auth, Token):
+            # Видалення токена інвалідує кеш автентифікації через сигнал
+            request.auth.delete()
+        logout(request._request)
+        return Response(status=status.HTTP_204_NO_CONTENT)
+
+
+class GameViewSet(ReplicaReadMixin, viewsets.ReadOnlyModelViewSet):
     serializer_class = GameSerializer
     permission_classes = [IsAuthenticated]
 
     def get_queryset(self):
-        return Game.objects.filter(player__user=self.request.user)
+        return Game.objects.filter(player__user=self.request.user).order_by('-created_at')
+
+    def _game_response(self, game_id, status_code):
+        return Response(self.get_serializer(self.get_queryset().get(pk=game_id)).data, status=status_code)
+
+    @extend_schema(
+        description="End the active game session, if any, and start a new one",
+        request=None,
+        responses={201: GameSerializer}
+    )
+    @action(detail=False, methods=['post'])
+    def start(self, request):
+        game_id = GameSessionService.start(request_player(request))
+        return self._game_response(game_id, status.HTTP_201_CREATED)
+
+    @extend_schema(
+        description="End the active game session and return its summary",
+        request=None,
+        responses={200: GameSerializer}
+    )
+    @action(detail=False, methods=['post'])
+    def end(self, request):
+        game_id = GameSessionService.end(request_player(request))
+        if game_id is None:
+            return Response({'detail': 'No active game session.'}, status=status.HTTP_400_BAD_REQUEST)
+        return self._game_response(game_id, status.HTTP_200_OK)
+
+    @extend_schema(
+        description="Get the spins of one game, newest first, one cursor page at a time",
+        parameters=SPIN_LIST_PARAMETERS,
+        responses={200: SpinSerializer(many=True)}
+    )
+    @action(detail=True, methods=['get'], serializer_class=SpinSerializer,
+            pagination_class=SpinCursorPagination)
+    def spins(self, request, pk=None):
+        game = self.get_object()
+        sources = game_spin_sources(game, query_flag(request.query_params, 'include_archived'))
+        spins = [filter_spins(queryset, request.query_params) for queryset in sources]
+        page = self.paginate_queryset(spins)
+        serializer = self.get_serializer(page, many=True)
+        return self.get_paginated_response(serializer.data)
 
 
-class SpinViewSet(viewsets.GenericViewSet):
+class SpinViewSet(AdmissionControlMixin, ReplicaReadMixin, viewsets.GenericViewSet):
     serializer_class = SpinSerializer
     permission_classes = [IsAuthenticated]
 
+    def perform_authentication(self, request):
+        with stage('auth'):
+            super().perform_authentication(request)
+
+    def get_throttle_cost(self, request):
+        # Пакет платить за кожен спін автоплею; невалідний count відхилить серіалізатор
+        if self.action != 'batch' or not hasattr(request.data, 'get'):
+            return 1
+        try:
+            return min(max(int(request.data.get('count', 1)), 1), MAX_BATCH_SPINS)
+        except (TypeError, ValueError):
+            return 1
+
     @extend_schema(
         description="Spin the slot machine",
         request=SpinRequestSerializer,
         responses={200: SpinSerializer}
     )
-    @action(detail=False, methods=['post'])
+    @action(detail=False, methods=['post'], throttle_classes=SPIN_THROTTLES)
     def spin(self, request):
         serializer = SpinRequestSerializer(data=request.data)
         serializer.is_valid(raise_exception=True)
 
         bet_size = serializer.validated_data['bet_size']
-        player = Player.objects.get(user=request.user)
+        with stage('player_lookup'):
+            player = request_player(request)
 
         slot_machine = SlotMachineService()
         result = slot_machine.play_spin(player, bet_size)
@@ -88,21 +185,112 @@ class SpinViewSet(viewsets.GenericViewSet):
         return Response(result)
 
     @extend_schema(
-        description="Get player's spin history",
+        description="Play several spins (autoplay) in a single request",
+        request=BatchSpinRequestSerializer,
+    )
+    @action(detail=False, methods=['post'], throttle_classes=SPIN_THROTTLES)
+    def batch(self, request):
+        serializer = BatchSpinRequestSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+
+        with stage('player_lookup'):
+            player = request_player(request)
+
+        slot_machine = SlotMachineService()
+        result = slot_machine.play_batch(player, **serializer.validated_data)
+
+        if not result['success']:
+            return Response(
+                {'detail': result['message']},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+
+        return Response(result)
+
+    def _player_spins(self, request):
+        sources = player_spin_sources(request_player(request), query_flag(request.query_params, 'include_archived'))
+        return [filter_spins(queryset, request.query_params) for queryset in sources]
+
+    @extend_schema(
+        description="Get player's spin history, newest first, one cursor page at a time",
+        parameters=SPIN_LIST_PARAMETERS,
         responses={200: SpinSerializer(many=True)}
     )
-    @action(detail=False, methods=['get'])
+    @action(detail=False, methods=['get'], pagination_class=SpinCursorPagination)
     def history(self, request):
-        player = Player.objects.get(user=request.user)
-        games = Game.objects.filter(player=player)
-        spins = Spin.objects.filter(game__in=games).order_by('-timestamp')
+        spins = self._player_spins(request)
+        page = self.paginate_queryset(spins)
+        serializer = self.get_serializer(page, many=True)
+        return self.get_paginated_response(serializer.data)
 
-        # Optional pagination could be added here
-        serializer = self.get_serializer(spins, many=True)
-        return Response(serializer.data)
+    @extend_schema(
+        description="Stream the player's full spin history, oldest first, as CSV or NDJSON",
+        parameters=SPIN_LIST_PARAMETERS + [
+            OpenApiParameter('format', str, enum=list(EXPORT_FORMATS), description='Export format (default: csv)'),
+        ],
+        responses={(200, 'text/csv'): str, (200, 'application/x-ndjson'): str}
+    )
+    @action(detail=False, methods=['get'], renderer_classes=[CSVRenderer, NDJSONRenderer])
+    def export(self, request):
+        spins = self._player_spins(request)
+        export_format = request.accepted_renderer.format
+        lines, content_type = EXPORT_FORMATS[export_format]
+        # Тіло стримиться вже після виходу з view, тому база фіксується тут
+        spins = [queryset.using(queryset.db) for queryset in spins]
+        response = StreamingHttpResponse(lines(export_rows(spins)), content_type=content_type)
+        response['Content-Disposition'] = f'attachment; filename="spins.{export_format}"'
+        return response
 
 
-class SymbolViewSet(viewsets.ReadOnlyModelViewSet):
+class SymbolViewSet(ReplicaReadMixin, viewsets.ReadOnlyModelViewSet):
     queryset = Symbol.objects.all()
     serializer_class = SymbolSerializer
-    permission_classes = [IsAuthenticated]
\ No newline at end of file
+    permission_classes = [IsAuthenticated]
+
+
+class PaylineView(views.APIView):
+    permission_classes = [IsAuthenticated]
+
+    @extend_schema(
+        description="Active paylines: the row crossed on each reel; win_data keys are these line numbers",
+        responses={200: PaylineSerializer(many=True)}
+    )
+    def get(self, request):
+        paylines = get_paylines(DEFAULT_NUM_REELS, DEFAULT_VISIBLE_ROWS)
+        return Response(PaylineSerializer(
+            [{'line': number, 'rows': rows} for number, rows in enumerate(paylines, start=1)], many=True
+        ).data)
+
+
+class LeaderboardView(views.APIView):
+    permission_classes = [IsAuthenticated]
+
+    @extend_schema(
+        description="Top winners of the current all-time, daily or hourly period",
+        parameters=[
+            OpenApiParameter('window', str, enum=WINDOWS, description='Leaderboard window (default: daily)'),
+            OpenApiParameter('limit', int, description=f'Number of entries, at most {LEADERBOARD_SIZE} (default: 10)'),
+        ],
+        responses={200: LeaderboardSerializer}
+    )
+    def get(self, request):
+        window = request.query_params.get('window', 'daily')
+        if window not in WINDOWS:
+            raise ValidationError({'window': f'Expected one of {", ".join(WINDOWS)}.'})
+        try:
+            limit = max(1, min(int(request.query_params.get('limit', 10)), LEADERBOARD_SIZE))
+        except ValueError:
+            raise ValidationError({'limit': 'Expected an integer.'})
+
+        period_start, entries = get_leaderboard().top(window, limit)
+        usernames = dict(
+            Player.objects.filter(pk__in=[player_id for player_id, _ in entries])
+            .values_list('id', 'user__username')
+        )
+        results = [
+            {'rank': rank, 'player_id': player_id, 'username': usernames.get(player_id, ''), 'total_won': score}
+            for rank, (player_id, score) in enumerate(entries, start=1)
+        ]
+        return Response(LeaderboardSerializer({
+            'window': window, 'period_start': period_start, 'results': results,
+        }).data)